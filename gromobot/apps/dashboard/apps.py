@@ -14,6 +14,8 @@ class DashboardMainConfig(DashboardConfig):
 
     # pylint: disable=attribute-defined-outside-init
     def ready(self):
+        from . import receivers  # pylint: disable=unused-import
+
         self.index_view = get_class("dashboard.views", "IndexView")
         self.navbarcash_view = get_class("dashboard.views", "NavbarCash")
         self.login_view = get_class("dashboard.views", "LoginView")
@@ -1,24 +1,38 @@
+import copy
 import logging
+from datetime import timedelta
 
+from apps.evotor.tasks import refresh_evotor_snapshot, refresh_evotor_snapshot_task
+from core.loading import get_model
 from django.conf import settings
 from django.contrib import messages
+from django.core.cache import cache
 from django.db.models import BooleanField, Case, Q, When
 from django.shortcuts import redirect
+from django.utils import timezone
 from django.utils.encoding import smart_str
 from django.views.generic import TemplateView
 from django_tables2 import MultiTableMixin
 
 logger = logging.getLogger("apps.dashboard.evotor")
 
+EvotorSnapshot = get_model("evotor", "EvotorSnapshot")
+
 
 class EvotorTablesMixin(MultiTableMixin, TemplateView):
     form_class = None
+    snapshot_type = None
+    snapshot = None
 
     def dispatch(self, request, *args, **kwargs):
         self.queryset = self.get_queryset()
         return super().dispatch(request, *args, **kwargs)
 
     def post(self, request, *args, **kwargs):
+        refresh_snapshot = request.POST.get("refresh_snapshot", "False")
+        if refresh_snapshot == "True":
+            return self._refresh_snapshot()
+
         delete_invalid = request.POST.get("delete_invalid", "False")
         if delete_invalid == "True":
             return self.delete_models(delete_invalid=True)
@@ -49,6 +63,8 @@ class EvotorTablesMixin(MultiTableMixin, TemplateView):
 
     def get_items_json(self):
         data_json = self.get_json()
+        if not data_json:
+            return []
 
         if error := data_json.get("error"):
             return self._handle_error(error)
@@ -69,8 +85,64 @@ class EvotorTablesMixin(MultiTableMixin, TemplateView):
         )
         return self.queryset
 
-    def get_json(self, data_items, is_filtered):
-        raise NotImplementedError("A EvotorTablesMixin must define a 'get_json' method")
+    def get_json(self):
+        """Возвращает сохраненный снимок данных Эвотор вместо запроса к API"""
+        store_evotor_id = ""
+        if self.form_class:
+            store_evotor_id = self.get_store_evotor_id()
+            if not store_evotor_id:
+                return {}
+
+        if self.snapshot is None:
+            self.snapshot = self.get_snapshot(store_evotor_id)
+            if self.snapshot.error:
+                messages.warning(
+                    self.request,
+                    "Не удалось обновить данные Эвотор: %s. Показаны данные от %s."
+                    % (
+                        self.snapshot.error,
+                        timezone.localtime(self.snapshot.date_updated).strftime(
+                            "%d.%m.%Y %H:%M"
+                        ),
+                    ),
+                )
+        # process_items дополняет элементы объектами сайта
+        return copy.deepcopy(self.snapshot.data)
+
+    def get_snapshot(self, store_evotor_id):
+        snapshot = EvotorSnapshot.objects.filter(
+            object_type=self.snapshot_type, store_evotor_id=store_evotor_id
+        ).first()
+        if snapshot is None:
+            # Первое обращение - загружаем данные сразу
+            return refresh_evotor_snapshot(self.snapshot_type, store_evotor_id)
+
+        max_age = timedelta(seconds=settings.EVOTOR_SNAPSHOT_TIMEOUT)
+        if settings.CELERY and snapshot.date_updated < timezone.now() - max_age:
+            # Показываем устаревший снимок и обновляем его в фоне
+            lock_key = "evotor_snapshot_refresh_%s_%s" % (
+                self.snapshot_type,
+                store_evotor_id,
+            )
+            if cache.add(lock_key, True, settings.EVOTOR_SNAPSHOT_TIMEOUT):
+                refresh_evotor_snapshot_task.delay(self.snapshot_type, store_evotor_id)
+        return snapshot
+
+    def _refresh_snapshot(self):
+        store_evotor_id = self.snapshot.store_evotor_id if self.snapshot else ""
+        if self.form_class and not store_evotor_id:
+            return self.redirect_with_get_params(self.url_redirect, self.request)
+
+        if settings.CELERY:
+            refresh_evotor_snapshot_task.delay(self.snapshot_type, store_evotor_id)
+            messages.info(
+                self.request,
+                "Данные Эвотор обновляются! Это может занять некоторое время.",
+            )
+        else:
+            refresh_evotor_snapshot_task(self.snapshot_type, store_evotor_id)
+            messages.success(self.request, "Данные Эвотор обновлены.")
+        return self.redirect_with_get_params(self.url_redirect, self.request)
 
     def process_items(self, data_items, is_filtered):
         raise NotImplementedError(
@@ -190,6 +262,7 @@ class EvotorTablesMixin(MultiTableMixin, TemplateView):
         ctx["wrong_evotor_id"] = stauses["wrong_evotor_id"]
         if self.form_class:
             ctx["form"] = self.form
+        ctx["snapshot"] = self.snapshot
         return ctx
 
     def get_evotor_statuses(self):
@@ -3,11 +3,9 @@ from datetime import datetime
 from itertools import chain
 
 from apps.dashboard.evotor.mixins import EvotorTablesMixin
-from apps.evotor.api.cloud import EvatorCloud
 from apps.evotor.signals import (
     send_evotor_additionals,
     send_evotor_categories,
-    send_evotor_products,
     update_site_additionals,
     update_site_groups,
     update_site_products,
@@ -15,6 +13,7 @@ from apps.evotor.signals import (
     update_site_stores,
     update_site_terminals,
 )
+from apps.evotor.tasks import send_evotor_products_task
 from apps.webshop.catalogue.serializers import (
     AdditionalsSerializer,
     ProductGroupsSerializer,
@@ -23,8 +22,19 @@ from apps.webshop.catalogue.serializers import (
 from apps.webshop.store.serializers import StoresSerializer, TerminalsSerializer
 from apps.webshop.user.serializers import StaffsSerializer
 from core.loading import get_class, get_classes, get_model
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import BooleanField, Case, Count, DecimalField, Max, Min, Q, When
+from django.db.models import (
+    BooleanField,
+    Case,
+    Count,
+    DecimalField,
+    F,
+    Max,
+    Min,
+    Q,
+    When,
+)
 from django.urls import reverse_lazy
 from django_tables2 import SingleTableView
 
@@ -71,11 +81,15 @@ Product = get_model("catalogue", "Product")
 Category = get_model("catalogue", "Category")
 Additional = get_model("catalogue", "Additional")
 AttributeOptionGroup = get_model("catalogue", "AttributeOptionGroup")
+StockRecord = get_model("store", "StockRecord")
+EvotorSnapshot = get_model("evotor", "EvotorSnapshot")
+EvotorBulk = get_model("evotor", "EvotorBulk")
 
 
 class EvotorStoreListView(EvotorTablesMixin):
     template_name = "dashboard/evotor/stores/store_list.html"
     model = Store
+    snapshot_type = EvotorSnapshot.STORES
     serializer = StoresSerializer
     context_table_name = "tables"
     table_prefix = "store_{}-"
@@ -83,10 +97,6 @@ class EvotorStoreListView(EvotorTablesMixin):
     table_site = EvotorStoreSiteTable
     url_redirect = reverse_lazy("dashboard:evotor-stores")
 
-    def get_json(self):
-        """Получает JSON-данные от EvatorCloud"""
-        return EvatorCloud().get_stores()
-
     def process_items(self, data_items):
         """Обрабатывает список магазинов, включая преобразование даты и проверку существования"""
         evotor_ids = set()
@@ -131,6 +141,7 @@ class EvotorStoreListView(EvotorTablesMixin):
 class EvotorTerminalListView(EvotorTablesMixin):
     template_name = "dashboard/evotor/terminals/terminal_list.html"
     model = Terminal
+    snapshot_type = EvotorSnapshot.TERMINALS
     serializer = TerminalsSerializer
     context_table_name = "tables"
     table_prefix = "terminal_{}-"
@@ -138,9 +149,6 @@ class EvotorTerminalListView(EvotorTablesMixin):
     table_site = EvotorTerminalSiteTable
     url_redirect = reverse_lazy("dashboard:evotor-terminals")
 
-    def get_json(self):
-        return EvatorCloud().get_terminals()
-
     def process_items(self, data_items):
         """Обрабатывает список терминалов, включая преобразование даты и проверку существования"""
         evotor_ids = set()
@@ -194,6 +202,7 @@ class EvotorTerminalListView(EvotorTablesMixin):
 class EvotorStaffListView(EvotorTablesMixin):
     template_name = "dashboard/evotor/staffs/staff_list.html"
     model = Staff
+    snapshot_type = EvotorSnapshot.STAFFS
     serializer = StaffsSerializer
     context_table_name = "tables"
     table_prefix = "staff_{}-"
@@ -201,9 +210,6 @@ class EvotorStaffListView(EvotorTablesMixin):
     table_site = EvotorStaffSiteTable
     url_redirect = reverse_lazy("dashboard:evotor-staffs")
 
-    def get_json(self):
-        return EvatorCloud().get_staffs()
-
     def process_items(self, data_items):
         """Обрабатывает данные магазинов, проверяя их на создание и корректность"""
         evotor_ids = set()
@@ -211,7 +217,10 @@ class EvotorStaffListView(EvotorTablesMixin):
             evotor_ids.add(data_item["id"])
 
         staffs = {
-            obj.evotor_id: obj for obj in Staff.objects.filter(evotor_id__in=evotor_ids)
+            obj.evotor_id: obj
+            for obj in Staff.objects.filter(evotor_id__in=evotor_ids)
+            .select_related("user")
+            .prefetch_related("user__stores")
         }
 
         for data_item in data_items:
@@ -267,6 +276,7 @@ class EvotorStaffListView(EvotorTablesMixin):
 class EvotorGroupsListView(EvotorTablesMixin):
     template_name = "dashboard/evotor/groups/group_list.html"
     model = Category
+    snapshot_type = EvotorSnapshot.GROUPS
     form_class = EvotorStoreForm
     serializer = ProductGroupsSerializer
     context_table_name = "tables"
@@ -275,17 +285,6 @@ class EvotorGroupsListView(EvotorTablesMixin):
     table_site = EvotorGroupSiteTable
     url_redirect = reverse_lazy("dashboard:evotor-groups")
 
-    def get_json(self):
-        store_evotor_id = self.get_store_evotor_id()
-        if store_evotor_id:
-            return EvatorCloud().get_groups(store_evotor_id)
-        else:
-            messages.error(
-                self.request,
-                "Ошибка при формировании запроса к Эвотор. Не передан Эвотор ID Магазина. Обновите список магазинов.",
-            )
-            return []
-
     def process_items(self, data_items):
         parent_ids = set()
         store_ids = set()
@@ -380,6 +379,7 @@ class EvotorGroupsListView(EvotorTablesMixin):
 class EvotorProductListView(EvotorTablesMixin):
     template_name = "dashboard/evotor/products/product_list.html"
     model = Product
+    snapshot_type = EvotorSnapshot.PRODUCTS
     form_class = EvotorStoreForm
     serializer = ProductsSerializer
     context_table_name = "tables"
@@ -388,17 +388,6 @@ class EvotorProductListView(EvotorTablesMixin):
     table_site = EvotorProductSiteTable
     url_redirect = reverse_lazy("dashboard:evotor-products")
 
-    def get_json(self):
-        store_evotor_id = self.get_store_evotor_id()
-        if store_evotor_id:
-            return EvatorCloud().get_primary_products(store_evotor_id)
-        else:
-            messages.error(
-                self.request,
-                "Ошибка при формировании запроса к Эвотор. Не передан Эвотор ID Магазина. Обновите список магазинов.",
-            )
-            return []
-
     def process_items(self, data_items):
         # Собираем все уникальные ID для каждого типа модели
         evotor_ids = set()
@@ -425,6 +414,16 @@ class EvotorProductListView(EvotorTablesMixin):
         model_instances = {
             obj.evotor_id: obj
             for obj in Product.objects.filter(evotor_id__in=evotor_ids)
+            .select_related("product_class", "parent", "parent__product_class")
+            .prefetch_related("categories")
+        }
+        stockrecords = {
+            (obj.product_id, obj.store_evotor_id): obj
+            for obj in StockRecord.objects.filter(
+                product__evotor_id__in=evotor_ids, store__evotor_id__in=store_ids
+            )
+            .annotate(store_evotor_id=F("store__evotor_id"))
+            .order_by("-id")
         }
 
         # Обрабатываем каждый data_item
@@ -450,9 +449,7 @@ class EvotorProductListView(EvotorTablesMixin):
             else:
                 data_item["is_created"] = True
                 if store:
-                    stockrecord = model_instance.stockrecords.filter(
-                        store__evotor_id=store_id
-                    ).first()
+                    stockrecord = stockrecords.get((model_instance.id, store_id))
                     stockrecord_match = (
                         stockrecord
                         and self._is_equal(stockrecord.price, data_item.get("price"))
@@ -511,16 +508,37 @@ class EvotorProductListView(EvotorTablesMixin):
         )
 
     def send_models(self, ids):
-        send_evotor_products.send(
-            sender=self,
-            product_ids=ids,
-            user_id=self.request.user.id,
-        )
+        product_ids = [int(product_id) for product_id in ids]
+        store_evotor_id = self.snapshot.store_evotor_id if self.snapshot else None
+        if settings.CELERY:
+            send_evotor_products_task.delay(product_ids, store_evotor_id)
+        else:
+            send_evotor_products_task(product_ids, store_evotor_id)
         messages.info(
             self.request,
             "Список товаров отправляется в Эвотор! Это может занять некоторое время.",
         )
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["bulks"] = self.get_bulks()
+        return ctx
+
+    def get_bulks(self):
+        """Части последних выгрузок товаров для отображения прогресса"""
+        batch_ids = list(
+            EvotorBulk.objects.filter(
+                object_type=EvotorBulk.PRODUCT, batch_id__isnull=False
+            )
+            .values("batch_id")
+            .annotate(last_created=Max("date_created"))
+            .order_by("-last_created")
+            .values_list("batch_id", flat=True)[: settings.EVOTOR_BULK_HISTORY]
+        )
+        return EvotorBulk.objects.filter(batch_id__in=batch_ids).order_by(
+            "-date_created", "chunk"
+        )
+
     def get_site_table(self):
         evotor_ids = [model_qs["id"] for model_qs in self.queryset]
         correct_ids = [
@@ -581,6 +599,7 @@ class EvotorProductListView(EvotorTablesMixin):
 class EvotorAdditionalListView(EvotorTablesMixin):
     template_name = "dashboard/evotor/additionals/additional_list.html"
     model = Additional
+    snapshot_type = EvotorSnapshot.ADDITIONALS
     form_class = EvotorStoreForm
     serializer = AdditionalsSerializer
     context_table_name = "tables"
@@ -589,17 +608,6 @@ class EvotorAdditionalListView(EvotorTablesMixin):
     table_site = EvotorAdditionalSiteTable
     url_redirect = reverse_lazy("dashboard:evotor-additionals")
 
-    def get_json(self):
-        store_evotor_id = self.get_store_evotor_id()
-        if store_evotor_id:
-            return EvatorCloud().get_additionals_products(store_evotor_id)
-        else:
-            messages.error(
-                self.request,
-                "Ошибка при формировании запроса к Эвотор. Не передан Эвотор ID Магазина. Обновите список магазинов.",
-            )
-            return []
-
     def process_items(self, data_items):
         # Собираем все уникальные ID для каждого типа модели
         store_ids = set()
@@ -615,7 +623,9 @@ class EvotorAdditionalListView(EvotorTablesMixin):
         }
         model_instances = {
             obj.evotor_id: obj
-            for obj in self.model.objects.filter(evotor_id__in=evotor_ids)
+            for obj in self.model.objects.filter(
+                evotor_id__in=evotor_ids
+            ).prefetch_related("stores")
         }
 
         # Обрабатываем каждый data_item
@@ -637,9 +647,10 @@ class EvotorAdditionalListView(EvotorTablesMixin):
             else:
                 data_item["is_created"] = True
                 if store:
-                    model_stores = set(
-                        model_instance.stores.values_list("evotor_id", flat=True)
-                    )
+                    model_stores = {
+                        model_store.evotor_id
+                        for model_store in model_instance.stores.all()
+                    }
                     data_item["is_valid"] = (
                         self._is_equal(
                             model_instance.get_name(),
@@ -0,0 +1,33 @@
+import datetime
+import logging
+
+from core.loading import get_class
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+OrderRollups = get_class("webshop.analytics.rollups", "OrderRollups")
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Rebuild hourly and daily order rollups from the orders table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Rebuild only the last N days (default: all orders)",
+        )
+
+    def handle(self, *args, **options):
+        rollups = OrderRollups()
+        start = None
+        if options["days"]:
+            start = timezone.now() - datetime.timedelta(days=options["days"])
+        for period in rollups.periods:
+            period_start = rollups.truncate(start, period) if start else None
+            num_rows = rollups.rebuild(period, period_start)
+            logger.info("Rebuilt %s order rollups: %d rows", period, num_rows)
+            self.stdout.write(f"{period}: {num_rows}")
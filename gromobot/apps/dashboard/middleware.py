@@ -1,14 +1,8 @@
-import datetime as datetime_min
-
+from apps.dashboard.staff import StaffContext, StoreCounters
 from core.loading import get_model
-from core.utils import datetime_combine
-from django.conf import settings
 from django.contrib import messages
 from django.core.cache import cache
-from django.db.models import Sum
-from django.utils.timezone import now
 
-Store = get_model("store", "Store")
 Order = get_model("order", "Order")
 
 
@@ -26,62 +20,30 @@ class DashboardMiddleware:
             messages.info(request, message)
             cache.delete(cache_key)
 
-        stores = cache.get("stores")
-        if stores is None:
-            stores = Store.objects.prefetch_related("address", "users").all()
-            cache.set("stores", stores, 21600)
-
         # Определяем магазины, с которыми работаем
-        if request.user.has_perm("user.full_access") or request.user.is_superuser:
-            request.staff_stores = stores
-        else:
-            request.staff_stores = stores.filter(users=request.user)
+        staff_context = StaffContext.for_user(request.user)
+        request.staff_context = staff_context
+        request.staff_stores = staff_context.get_queryset()
+
+        counters = StoreCounters()
+        store_ids = staff_context.store_ids
 
         # Получаем выручку для всех магазинов
-        request.revenue_today = self.get_revenue_for_stores(request.staff_stores)
+        request.revenue_today = sum(
+            values["revenue"] for values in counters.get_today(store_ids).values()
+        )
 
         # Получаем заказы
-        request.no_finish_orders = self.get_orders_for_stores(request.staff_stores)
-        request.active_orders = self.get_active_orders_for_stores(request.staff_stores)
+        request.no_finish_orders = self.get_orders_for_stores(store_ids)
+        request.active_orders = sum(counters.get_active(store_ids).values())
 
         return self.get_response(request)
 
-    def get_revenue_for_stores(self, stores):
-        """
-        Получает выручку для всех магазинов и кэширует её.
-        """
-        revenue_today = 0
-        current_time = now()
-        for store in stores:
-            store_revenue_today = cache.get(f"revenue_today_{store.id}")
-            if store_revenue_today is None:
-                store_revenue_today = (
-                    Order.objects.filter(
-                        date_placed__gt=datetime_combine(current_time, datetime_min.time.min),
-                        store=store,
-                    ).aggregate(total_revenue=Sum("total"))["total_revenue"]
-                    or 0
-                )
-                cache.set(f"revenue_today_{store.id}", store_revenue_today, 180)
-
-            revenue_today += store_revenue_today
-        return revenue_today
-
-    def get_orders_for_stores(self, stores):
+    def get_orders_for_stores(self, store_ids):
         """
         Получает заказы с учётом того, что они не завершены.
         """
-        return Order.objects.filter(date_finish__isnull=True, store__in=stores)
-
-    def get_active_orders_for_stores(self, stores):
-        """
-        Получает активные заказы для указанных магазинов.
-        """
-        return Order.objects.filter(
-            date_finish__isnull=True,
-            status__in=settings.ORDER_ACTIVE_STATUSES,
-            store__in=stores,
-        ).count()
+        return Order.objects.filter(date_finish__isnull=True, store_id__in=store_ids)
 
     def process_template_response(self, request, response):
         if not request.path.startswith("/dashboard") or not hasattr(
@@ -24,6 +24,11 @@ class OrdersDashboardConfig(DashboardConfig):
             "order.full_access",
             "order.read",
         ),
+        "order-active-events": (
+            "user.full_access",
+            "order.full_access",
+            "order.read",
+        ),
         "order-detail": ("user.full_access", "order.full_access", "order.read"),
         "order-line-detail": (
             "user.full_access",
@@ -46,10 +51,17 @@ class OrdersDashboardConfig(DashboardConfig):
             "order.update_order",
         ),
         "order-stats": (["user.full_access"], ["order.full_access"], ["order.read"]),
+        "order-export-download": (
+            "user.full_access",
+            "order.full_access",
+            "order.read",
+        ),
     }
 
-    # pylint: disable=attribute-defined-outside-init
+    # pylint: disable=attribute-defined-outside-init, unused-import
     def ready(self):
+        from . import receivers
+
         self.order_list_view = get_class("dashboard.orders.views", "OrderListView")
         self.order_active_list_view = get_class(
             "dashboard.orders.views", "OrderActiveListView"
@@ -62,10 +74,16 @@ class OrdersDashboardConfig(DashboardConfig):
         self.order_delete_view = get_class("dashboard.orders.views", "OrderDeleteView")
 
         self.order_stats_view = get_class("dashboard.orders.views", "OrderStatsView")
+        self.order_export_download_view = get_class(
+            "dashboard.orders.views", "OrderExportDownloadView"
+        )
 
         self.order_active_list_lookup_view = get_class(
             "dashboard.orders.views", "OrderActiveListLookupView"
         )
+        self.order_active_events_view = get_class(
+            "dashboard.orders.views", "OrderActiveEventsView"
+        )
         self.order_modal_view = get_class("dashboard.orders.views", "OrderModalView")
         self.order_next_status_view = get_class(
             "dashboard.orders.views", "OrderNextStatusView"
@@ -83,6 +101,11 @@ class OrdersDashboardConfig(DashboardConfig):
                 self.order_active_list_lookup_view.as_view(),
                 name="order-active-list-lookup",
             ),
+            path(
+                "active-events/",
+                self.order_active_events_view.as_view(),
+                name="order-active-events",
+            ),
             path("order-modal/", self.order_modal_view.as_view(), name="order-modal"),
             path(
                 "order-next-status/",
@@ -96,6 +119,11 @@ class OrdersDashboardConfig(DashboardConfig):
             ),
             path("all/", self.order_list_view.as_view(), name="order-list"),
             path("statistics/", self.order_stats_view.as_view(), name="order-stats"),
+            path(
+                "exports/<str:filename>/",
+                self.order_export_download_view.as_view(),
+                name="order-export-download",
+            ),
             path(
                 "all/<str:number>/",
                 self.order_detail_view.as_view(),
@@ -0,0 +1,82 @@
+import json
+import logging
+import time
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger("apps.dashboard.orders")
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.DASHBOARD_ORDER_EVENTS_REDIS_URL)
+    return _client
+
+
+def order_event(order, event):
+    return {
+        "event": event,
+        "number": order.number,
+        "store_id": order.store_id,
+        "status": order.status,
+        "active": order.date_finish is None
+        and order.status in settings.ORDER_ACTIVE_STATUSES,
+    }
+
+
+def publish_order_event(order, event):
+    """
+    Publish an order change to every worker serving the dashboard event
+    stream, once the current transaction commits.
+    """
+    if not settings.DASHBOARD_ORDER_EVENTS:
+        return
+    message = json.dumps(order_event(order, event))
+
+    def publish():
+        try:
+            get_redis().publish(settings.DASHBOARD_ORDER_EVENTS_CHANNEL, message)
+        except redis.RedisError as e:
+            logger.error(f"{e} при публикации события заказа")
+
+    transaction.on_commit(publish)
+
+
+async def iter_order_events(keepalive=None, max_age=None):
+    """
+    Yield order events from the Redis channel, or ``None`` after
+    *keepalive* seconds without events so the caller can ping the client.
+
+    The stream ends after *max_age* seconds and the client reconnects, so
+    the Redis connection of a client that went away is released even
+    though the server doesn't notice the disconnect.
+    """
+    keepalive = keepalive or settings.DASHBOARD_ORDER_EVENTS_KEEPALIVE
+    max_age = max_age or settings.DASHBOARD_ORDER_EVENTS_MAX_AGE
+    deadline = time.monotonic() + max_age
+    client = aioredis.Redis.from_url(settings.DASHBOARD_ORDER_EVENTS_REDIS_URL)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(settings.DASHBOARD_ORDER_EVENTS_CHANNEL)
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            message = await pubsub.get_message(timeout=min(keepalive, remaining))
+            if message is None:
+                yield None
+                continue
+            try:
+                yield json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+        await client.aclose()
@@ -0,0 +1,156 @@
+import csv
+import io
+import os
+import tempfile
+import uuid
+
+from apps.dashboard.storage import export_storage
+from core.loading import get_model
+from core.utils import format_datetime
+from django.conf import settings
+from django.core.files import File
+from django.utils.timezone import now
+
+Order = get_model("order", "Order")
+Line = get_model("order", "Line")
+
+
+class Echo:
+    """A file-like object which returns the written value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+class OrderCSVExporter:
+    """
+    CSV export of dashboard orders.
+
+    Orders are read in chunks with ``iterator()``, without the prefetches of
+    the order list. The items of a chunk are loaded with one query over the
+    order lines, so memory use doesn't grow with the number of orders.
+    """
+
+    columns = {
+        "number": "Номер заказа",
+        "total": "Стоимость заказа",
+        "shipping_charge": "Стоимость доставки",
+        "shipping_method": "Метод доставки",
+        "status": "Последний статус",
+        "date_placed": "Дата создания заказа",
+        "date_finish": "Дата завершения заказа",
+        "order_time": "Дата заказа",
+        "num_items": "Количество товаров",
+        "items": "Товары",
+        "customer": "Клиент",
+        "shipping_address_name": "Адрес доставки",
+    }
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or settings.ORDERS_EXPORT_CHUNK_SIZE
+
+    def get_queryset(self, orders):
+        """
+        Plain orders queryset for *orders*, which may be an annotated list
+        queryset or a list of ids.
+        """
+        if not isinstance(orders, (list, tuple)):
+            orders = orders.order_by().values("pk")
+        return (
+            Order._default_manager.filter(pk__in=orders)
+            .select_related("user", "shipping_address")
+            .order_by("-date_placed")
+        )
+
+    def get_lines(self, orders):
+        """
+        Return a dict mapping order ids to lists of (name, quantity).
+        """
+        lines = {}
+        rows = (
+            Line.objects.filter(order_id__in=[order.pk for order in orders])
+            .order_by("order_id", "pk")
+            .values_list("order_id", "name", "quantity")
+        )
+        for order_id, name, quantity in rows:
+            lines.setdefault(order_id, []).append((name, quantity))
+        return lines
+
+    def iter_chunks(self, queryset):
+        chunk = []
+        for order in queryset.iterator(chunk_size=self.chunk_size):
+            chunk.append(order)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def get_row_values(self, order, lines):
+        row = {
+            "number": order.number,
+            "total": order.total,
+            "shipping_charge": order.shipping,
+            "shipping_method": order.shipping_method,
+            "status": order.status,
+            "date_placed": format_datetime(order.date_placed, "DATETIME_FORMAT"),
+            "date_finish": (
+                format_datetime(order.date_finish, "DATETIME_FORMAT")
+                if order.date_finish
+                else ""
+            ),
+            "order_time": format_datetime(order.order_time, "DATETIME_FORMAT"),
+            "num_items": sum(quantity for _, quantity in lines),
+            "items": " ".join(f"{name}({quantity})" for name, quantity in lines),
+            "customer": order.user.username if order.user else "",
+            "shipping_address_name": (
+                order.shipping_address.line1 if order.shipping_address else ""
+            ),
+        }
+        return row
+
+    def rows(self, orders):
+        yield list(self.columns.values())
+        for chunk in self.iter_chunks(self.get_queryset(orders)):
+            lines = self.get_lines(chunk)
+            for order in chunk:
+                values = self.get_row_values(order, lines.get(order.pk, []))
+                yield [values.get(column, "") for column in self.columns]
+
+    def stream(self, orders):
+        """
+        Yield the CSV output line by line, starting with a BOM so the file
+        opens correctly in Excel.
+        """
+        writer = csv.writer(
+            Echo(), delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
+        )
+        yield "\ufeff"
+        for row in self.rows(orders):
+            yield writer.writerow(row)
+
+    @staticmethod
+    def get_user_dir(user_id):
+        return os.path.join(settings.ORDERS_EXPORT_DIR, str(user_id))
+
+    def save(self, orders, user_id, filename=None):
+        """
+        Write the export to a file in the private export storage, in the
+        directory of the user, and return its name.
+        """
+        filename = filename or "orders-%s-%s.csv" % (
+            now().strftime("%Y%m%d-%H%M%S"),
+            uuid.uuid4().hex[:8],
+        )
+        with tempfile.TemporaryFile() as tmp:
+            output = io.TextIOWrapper(tmp, encoding="utf-8-sig", newline="")
+            writer = csv.writer(
+                output, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
+            )
+            for row in self.rows(orders):
+                writer.writerow(row)
+            output.flush()
+            tmp.seek(0)
+            return export_storage.save(
+                os.path.join(self.get_user_dir(user_id), filename), File(tmp)
+            )
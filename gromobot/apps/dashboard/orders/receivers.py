@@ -0,0 +1,25 @@
+from apps.dashboard.orders.events import publish_order_event
+from apps.webshop.order.signals import (bulk_order_status_changed, order_placed,
+                                        order_status_changed)
+from django.dispatch import receiver
+
+
+# pylint: disable=unused-argument
+@receiver(order_placed)
+def publish_order_placed(sender, order, **kwargs):
+    if kwargs.get("raw", False):
+        return
+    publish_order_event(order, "placed")
+
+
+# pylint: disable=unused-argument
+@receiver(order_status_changed)
+def publish_order_status_changed(sender, order, **kwargs):
+    publish_order_event(order, "status")
+
+
+# pylint: disable=unused-argument
+@receiver(bulk_order_status_changed)
+def publish_bulk_order_status_changed(sender, orders, **kwargs):
+    for order in orders:
+        publish_order_event(order, "status")
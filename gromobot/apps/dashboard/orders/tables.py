@@ -113,6 +113,9 @@ class OrderTable(DashboardTable):
         attrs = {
             "class": "table table-striped table-bordered table-hover",
         }
-        row_attrs = {"class": lambda record: "new-record" if not record.is_open else ""}
+        row_attrs = {
+            "class": lambda record: "new-record" if not record.is_open else "",
+            "data-number": lambda record: record.number,
+        }
         order_by = "date_placed"
         empty_text = "Нет созданых заказов"
@@ -0,0 +1,46 @@
+import logging
+import os
+
+from celery import shared_task
+from core.compat import get_user_model
+from core.loading import get_class
+from django.urls import reverse
+
+OrderCSVExporter = get_class("dashboard.orders.exports", "OrderCSVExporter")
+Dispatcher = get_class("webshop.communication.utils", "Dispatcher")
+
+logger = logging.getLogger("apps.dashboard.orders")
+
+User = get_user_model()
+
+
+@shared_task
+def export_orders_task(order_ids, user_id):
+    """
+    Сохраняет заказы в CSV файл и отправляет ссылку на него уведомлением.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    try:
+        name = OrderCSVExporter().save(order_ids, user_id)
+    except Exception as e:
+        logger.error(f"{e} при выгрузке заказов (user_id={user_id})")
+        if user is not None:
+            Dispatcher().notify_user(
+                user,
+                subject="Не удалось выгрузить заказы",
+                body=str(e),
+                status="Warning",
+            )
+        return
+
+    if user is not None:
+        url = reverse(
+            "dashboard:order-export-download",
+            kwargs={"filename": os.path.basename(name)},
+        )
+        Dispatcher().notify_user(
+            user,
+            subject="Выгрузка заказов готова",
+            body=f'<a href="{url}">Скачать CSV ({len(order_ids)} заказов)</a>',
+            status="Success",
+        )
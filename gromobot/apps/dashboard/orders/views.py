@@ -1,32 +1,37 @@
 # pylint: disable=attribute-defined-outside-init
-import csv
 import datetime
-import io
+import json
 import logging
+import os
 from decimal import Decimal as D
 from decimal import InvalidOperation
 
+from apps.dashboard.orders.events import iter_order_events
+from apps.dashboard.orders.tasks import export_orders_task
+from apps.dashboard.storage import serve_export
 from apps.webshop.order import exceptions as order_exceptions
 from apps.webshop.payment.exceptions import PaymentError
+from asgiref.sync import sync_to_async
 from core.compat import get_user_model
-from core.loading import get_class, get_model
-from core.utils import datetime_combine, format_datetime
+from core.loading import get_class, get_classes, get_model
+from core.utils import datetime_combine
 from core.views import sort_queryset
 from core.views.generic import BulkEditMixin
 from dateutil.relativedelta import relativedelta
 from django.conf import settings
 from django.contrib import messages
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import (Avg, Case, Count, DurationField, Exists,
+from django.db.models import (Case, Count, DurationField, Exists,
                               ExpressionWrapper, F, Max, OuterRef, Q, Sum,
                               Value, When, fields)
-from django.http import (Http404, HttpResponse, HttpResponseRedirect,
-                         JsonResponse)
+from django.http import (Http404, HttpResponseRedirect, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.timezone import now
-from django.views.generic import DeleteView, DetailView, FormView, UpdateView
+from django.views.generic import (DeleteView, DetailView, FormView, UpdateView,
+                                  View)
 from django_tables2 import RequestConfig, SingleTableView
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticated
@@ -40,6 +45,10 @@ OrderNoteForm = get_class("dashboard.orders.forms", "OrderNoteForm")
 ShippingAddressForm = get_class("dashboard.orders.forms", "ShippingAddressForm")
 OrderStatusForm = get_class("dashboard.orders.forms", "OrderStatusForm")
 OrderTable = get_class("dashboard.orders.tables", "OrderTable")
+OrderCSVExporter = get_class("dashboard.orders.exports", "OrderCSVExporter")
+OrderRollups, sum_rows, average = get_classes(
+    "webshop.analytics.rollups", ["OrderRollups", "sum_rows", "average"]
+)
 
 User = get_user_model()
 Order = get_model("order", "Order")
@@ -85,6 +94,26 @@ def queryset_orders(request, product=None, category=None):
         return queryset.filter(store__in=request.staff_stores).distinct()
 
 
+def annotate_orders(queryset):
+    """
+    Annotate orders with the payment and timing values shown in order tables.
+    """
+    return queryset.annotate(
+        source=Max("sources__reference"),
+        amount_paid=Sum("sources__amount_debited") - Sum("sources__amount_refunded"),
+        before_order=Case(
+            When(
+                date_finish__isnull=True,
+                then=ExpressionWrapper(
+                    F("order_time") - now(), output_field=DurationField()
+                ),
+            ),
+            default=Value(None),
+            output_field=DurationField(),
+        ),
+    )
+
+
 def get_order_or_404(request, number):
     try:
         return queryset_orders(request=request).get(number=number)
@@ -100,6 +129,14 @@ class OrderStatsView(FormView):
 
     template_name = "dashboard/orders/statistics.html"
     form_class = OrderStatsForm
+    # Фильтры, которые можно посчитать по предрассчитанной статистике
+    rollup_filters = (
+        "date_placed__range",
+        "date_placed__gte",
+        "date_placed__lte",
+        "status",
+        "site__in",
+    )
 
     def get(self, request, *args, **kwargs):
         return self.post(request, *args, **kwargs)
@@ -133,7 +170,12 @@ class OrderStatsView(FormView):
         ctx["active_tab"] = "day"
         return ctx
 
-    def get_report(self, orders, start, end, range_type):
+    def get_report(self, orders, start, end, range_type, rows=None):
+        """
+        Chart data of order totals and counts for *range_type* chunks. If
+        daily rollup *rows* are given, chunks are summed from them instead
+        of querying *orders*.
+        """
 
         start_time = start
         if range_type == "days":
@@ -173,11 +215,17 @@ class OrderStatsView(FormView):
             else:
                 end_time = start_time
 
-            report_orders = orders.filter(
-                date_placed__gte=start_time, date_placed__lt=end_time
-            )
-            total = report_orders.aggregate(Sum("total"))["total__sum"] or D("0.0")
-            count = report_orders.count()
+            if rows is not None:
+                totals = sum_rows(rows, start_time, end_time)
+                total, count = totals["revenue"], totals["num_orders"]
+            else:
+                report_orders = orders.filter(
+                    date_placed__gte=start_time, date_placed__lt=end_time
+                )
+                total = report_orders.aggregate(Sum("total"))["total__sum"] or D(
+                    "0.0"
+                )
+                count = report_orders.count()
             order_count.append(count)
             order_total.append(int(total))
             if range_type == "days":
@@ -289,17 +337,87 @@ class OrderStatsView(FormView):
 
         return data
 
+    def get_rollup_lookups(self, filters, excludes):
+        """
+        Translate the form filters to order rollup lookups. Returns ``None``
+        if the filters need the orders themselves, e.g. a product or a
+        customer filter.
+        """
+        if set(filters) - set(self.rollup_filters) or set(excludes) - {"site__in"}:
+            return None
+        lookups = {}
+        if "status" in filters:
+            lookups["status"] = filters["status"]
+        if "site__in" in filters:
+            lookups["is_online"] = False
+        if "site__in" in excludes:
+            lookups["is_online"] = True
+        return lookups
+
+    def get_orders_totals(self, orders, lines):
+        totals = orders.aggregate(num_orders=Count("id"), revenue=Sum("total"))
+        totals["num_discount_orders"] = (
+            orders.filter(
+                ~Q(lines__line_price_before_discounts=F("lines__line_price"))
+            )
+            .distinct()
+            .count()
+        )
+        totals.update(
+            lines.aggregate(
+                num_lines=Count("id"),
+                num_discount_lines=Count(
+                    "id", filter=~Q(line_price_before_discounts=F("line_price"))
+                ),
+                num_items=Sum("quantity"),
+                revenue_before_discounts=Sum("line_price_before_discounts"),
+            )
+        )
+        totals["revenue"] = totals["revenue"] or D("0.00")
+        totals["revenue_before_discounts"] = totals["revenue_before_discounts"] or D(
+            "0.00"
+        )
+        totals["num_items"] = totals["num_items"] or 0
+        return totals
+
+    def get_channel_stats(self, channels):
+        """
+        Order stats for the whole period (empty channel name) and for the
+        offline and online channels.
+        """
+        stats = {}
+        for channel, totals in channels.items():
+            suffix = f"_{channel}" if channel else ""
+            stats.update(
+                {
+                    f"orders{suffix}": totals["num_orders"],
+                    f"revenue{suffix}": totals["revenue"],
+                    f"discount{suffix}": totals["revenue_before_discounts"]
+                    - totals["revenue"],
+                    f"average{suffix}_costs": average(
+                        totals["revenue"], totals["num_orders"]
+                    ),
+                    f"items{suffix}": totals["num_items"],
+                    f"lines{suffix}": totals["num_lines"],
+                    f"orders{suffix}_discount": totals["num_discount_orders"],
+                    f"lines{suffix}_discount": totals["num_discount_lines"],
+                }
+            )
+        return stats
+
     def get_stats(self, filters, excludes):
         # Установка начальной и конечной даты
         start_date, end_date = None, now()
+        orders_end = None
 
         # Определение диапазонов дат
         if "date_placed__range" in filters:
             start_date, end_date = filters["date_placed__range"]
+            orders_end = end_date
         elif "date_placed__gte" in filters:
             start_date = filters["date_placed__gte"]
         elif "date_placed__lte" in filters:
-            end_date = filters["date_placed__lte"]
+            end_date = orders_end = filters["date_placed__lte"]
 
         # Получение данных
         data = self.get_data(filters, excludes)
@@ -311,16 +429,34 @@ class OrderStatsView(FormView):
         lines = data["lines"]
         products = data["products"]
 
+        # Статистика без фильтров по товарам и клиентам считается по
+        # предрассчитанным дневным данным
+        lookups = self.get_rollup_lookups(filters, excludes)
+        rollups = OrderRollups()
+        stores = None if self.request.user.is_superuser else self.request.staff_stores
+
         # Определение начальной даты при отсутствии
         if start_date is None:
-            ord = orders.order_by("date_placed").first()
-            if ord is not None:
-                start_date = ord.date_placed
+            if lookups is not None:
+                first = (
+                    rollups.get_queryset("day", stores=stores, **lookups)
+                    .order_by("period_start")
+                    .first()
+                )
+                first_date = first.period_start if first is not None else None
+            else:
+                ord = orders.order_by("date_placed").first()
+                first_date = ord.date_placed if ord is not None else None
+            if first_date is not None:
+                start_date = first_date
             else:
                 start_date = end_date - datetime.timedelta(days=90)
 
         start_date = datetime_combine(start_date, datetime.time.min)
         end_date = datetime_combine(end_date, datetime.time.max)
+        if orders_end is not None:
+            # Фильтр по датам включает заказы до начала последнего дня
+            orders_end = datetime_combine(orders_end, datetime.time.min)
 
         # Установка стартовых дат для различных интервалов
         start_dates = {
@@ -344,151 +480,108 @@ class OrderStatsView(FormView):
             "top_products_sums": [],
         }
 
-        def aggregate_orders(queryset, field, operation, default=D("0.00")):
-            result = queryset.aggregate(result=operation(field))["result"]
-            return result or default
-
-        def count_customers_with_orders(customers, min_orders):
-            return (
-                customers.annotate(order_count=Count("orders"))
-                .filter(
-                    order_count__gte=min_orders,
-                    date_joined__range=(start_date, end_date),
-                )
-                .count()
+        orders_period = orders.filter(date_placed__range=(start_date, end_date))
+        lines_period = lines.filter(order__in=orders_period)
+
+        if lookups is not None:
+            rows = rollups.get_rows(
+                "day",
+                "status",
+                "is_online",
+                stores=stores,
+                start=start_date,
+                end=min(end_date, orders_end or end_date),
+                **lookups,
             )
-
-        for period, start in start_dates.items():
-            orders_period = orders.filter(date_placed__range=(start_date, end_date))
-            lines_period = lines.filter(order__in=orders_period)
-
-            top_products = (
-                lines_period.values("product", "name")
-                .annotate(total_quantity=Sum("quantity"), total_sum=Sum("line_price"))
-                .order_by("-total_quantity")[:5]
-            )
-
-            revenue = aggregate_orders(orders_period, "total", Sum)
-            revenue_offline = aggregate_orders(
-                orders_period.filter(site="Эвотор"), "total", Sum
+            summary = self.get_channel_stats(
+                {
+                    "": sum_rows(rows),
+                    "offline": sum_rows(rows, is_online=False),
+                    "online": sum_rows(rows, is_online=True),
+                }
             )
-            revenue_online = revenue - revenue_offline
-
-            discount = (
-                aggregate_orders(
-                    orders_period, "lines__line_price_before_discounts", Sum
+            status_totals = {}
+            for row in rows:
+                status_totals[row["status"]] = (
+                    status_totals.get(row["status"], 0) + row["num_orders"]
                 )
-                - revenue
+            summary["order_status_breakdown"] = [
+                {"status": status, "freq": freq}
+                for status, freq in sorted(status_totals.items())
+                if freq
+            ]
+            report_start = min(
+                start_dates["years"].replace(month=1, day=1),
+                start_dates["weeks"]
+                - datetime.timedelta(days=start_dates["weeks"].weekday()),
             )
-            discount_offline = (
-                aggregate_orders(
-                    orders_period.filter(site="Эвотор"),
-                    "lines__line_price_before_discounts",
-                    Sum,
-                )
-                - revenue_offline
+            report_rows = rollups.get_rows(
+                "day",
+                "period_start",
+                stores=stores,
+                start=max(report_start, start_date),
+                end=orders_end,
+                **lookups,
             )
-            discount_online = discount - discount_offline
-
-            stats.update(
+        else:
+            offline_orders = orders_period.filter(site__in=settings.OFFLINE_ORDERS)
+            online_orders = orders_period.exclude(site__in=settings.OFFLINE_ORDERS)
+            summary = self.get_channel_stats(
                 {
-                    f"orders_{period}": orders_period.count(),
-                    f"orders_offline_{period}": orders_period.filter(
-                        site="Эвотор"
-                    ).count(),
-                    f"orders_online_{period}": orders_period.exclude(
-                        site="Эвотор"
-                    ).count(),
-                    f"revenue_{period}": revenue,
-                    f"revenue_offline_{period}": revenue_offline,
-                    f"revenue_online_{period}": revenue_online,
-                    f"discount_{period}": discount,
-                    f"discount_offline_{period}": discount_offline,
-                    f"discount_online_{period}": discount_online,
-                    f"average_costs_{period}": aggregate_orders(
-                        orders_period, "total", Avg
+                    "": self.get_orders_totals(orders_period, lines_period),
+                    "offline": self.get_orders_totals(
+                        offline_orders, lines_period.filter(order__in=offline_orders)
                     ),
-                    f"average_offline_costs_{period}": aggregate_orders(
-                        orders_period.filter(site="Эвотор"), "total", Avg
+                    "online": self.get_orders_totals(
+                        online_orders, lines_period.filter(order__in=online_orders)
                     ),
-                    f"average_online_costs_{period}": aggregate_orders(
-                        orders_period.exclude(site="Эвотор"), "total", Avg
-                    ),
-                    f"alerts_{period}": alerts.filter(
-                        date_created__range=(start_date, end_date)
-                    ).count(),
-                    f"baskets_{period}": baskets.filter(
-                        date_created__range=(start_date, end_date)
-                    ).count(),
-                    f"users_{period}": users.filter(
-                        date_joined__range=(start_date, end_date)
-                    ).count(),
-                    f"customers_{period}": customers.filter(
-                        date_joined__range=(start_date, end_date)
-                    ).count(),
-                    f"customers_2orders_{period}": count_customers_with_orders(
-                        customers, 2
-                    ),
-                    f"customers_5orders_{period}": count_customers_with_orders(
-                        customers, 5
-                    ),
-                    f"items_{period}": lines_period.aggregate(items=Sum("quantity"))[
-                        "items"
-                    ]
-                    or 0,
-                    f"items_offline_{period}": lines_period.filter(
-                        order__site="Эвотор"
-                    ).aggregate(items=Sum("quantity"))["items"]
-                    or 0,
-                    f"items_online_{period}": lines_period.exclude(
-                        order__site="Эвотор"
-                    ).aggregate(items=Sum("quantity"))["items"]
-                    or 0,
-                    f"lines_{period}": lines_period.count(),
-                    f"lines_offline_{period}": lines_period.filter(
-                        order__site="Эвотор"
-                    ).count(),
-                    f"lines_online_{period}": lines_period.exclude(
-                        order__site="Эвотор"
-                    ).count(),
-                    f"orders_discount_{period}": orders_period.filter(
-                        ~Q(lines__line_price_before_discounts=F("lines__line_price"))
-                    )
-                    .distinct()
-                    .count(),
-                    f"orders_offline_discount_{period}": orders_period.filter(
-                        ~Q(lines__line_price_before_discounts=F("lines__line_price")),
-                        site="Эвотор",
-                    )
-                    .distinct()
-                    .count(),
-                    f"orders_online_discount_{period}": orders_period.filter(
-                        ~Q(lines__line_price_before_discounts=F("lines__line_price"))
-                    )
-                    .exclude(site="Эвотор")
-                    .distinct()
-                    .count(),
-                    f"lines_discount_{period}": lines_period.filter(
-                        ~Q(line_price_before_discounts=F("line_price"))
-                    ).count(),
-                    f"lines_offline_discount_{period}": lines_period.filter(
-                        ~Q(line_price_before_discounts=F("line_price")),
-                        order__site="Эвотор",
-                    ).count(),
-                    f"lines_online_discount_{period}": lines_period.filter(
-                        ~Q(line_price_before_discounts=F("line_price"))
-                    )
-                    .exclude(order__site="Эвотор")
-                    .count(),
-                    f"products_{period}": products.filter(
-                        date_created__range=(start_date, end_date)
-                    ).count(),
-                    f"top_products_{period}": top_products,
-                    f"order_status_breakdown_{period}": orders_period.order_by("status")
-                    .values("status")
-                    .annotate(freq=Count("id")),
                 }
             )
+            summary["order_status_breakdown"] = (
+                orders_period.order_by("status")
+                .values("status")
+                .annotate(freq=Count("id"))
+            )
+            report_rows = None
+
+        top_products = list(
+            lines_period.values("product", "name")
+            .annotate(total_quantity=Sum("quantity"), total_sum=Sum("line_price"))
+            .order_by("-total_quantity")[:5]
+        )
+        customer_orders = (
+            customers.filter(date_joined__range=(start_date, end_date))
+            .annotate(order_count=Count("orders"))
+            .aggregate(
+                orders2=Count("id", filter=Q(order_count__gte=2)),
+                orders5=Count("id", filter=Q(order_count__gte=5)),
+            )
+        )
+        summary.update(
+            {
+                "alerts": alerts.filter(
+                    date_created__range=(start_date, end_date)
+                ).count(),
+                "baskets": baskets.filter(
+                    date_created__range=(start_date, end_date)
+                ).count(),
+                "users": users.filter(date_joined__range=(start_date, end_date)).count(),
+                "customers": customers.filter(
+                    date_joined__range=(start_date, end_date)
+                ).count(),
+                "customers_2orders": customer_orders["orders2"],
+                "customers_5orders": customer_orders["orders5"],
+                "products": products.filter(
+                    date_created__range=(start_date, end_date)
+                ).count(),
+                "top_products": top_products,
+            }
+        )
+
+        # Все интервалы считаются по одному и тому же диапазону дат,
+        # отличаются только графики
+        for period, start in start_dates.items():
+            stats.update({f"{key}_{period}": value for key, value in summary.items()})
 
             stats["top_products_names"].append(
                 [product["name"] for product in top_products]
@@ -501,7 +594,7 @@ class OrderStatsView(FormView):
             )
 
             report, stats[f"report_exist_{period}"] = self.get_report(
-                orders, start, end_date, period
+                orders, start, end_date, period, rows=report_rows
             )
             stats["report_datas"].append(report)
 
@@ -519,43 +612,18 @@ class OrderListView(EventHandlerMixin, BulkEditMixin, SingleTableView):
     form_class = OrderSearchForm
     table_class = OrderTable
     context_table_name = "orders"
-    actions = ("download_selected_orders", "change_order_statuses")
-
-    CSV_COLUMNS = {
-        "number": "Номер заказа",
-        "total": "Стоимость заказа",
-        "shipping_charge": "Стоимость доставки",
-        "shipping_method": "Метод доставки",
-        "status": "Последний статус",
-        "date_placed": "Дата создания заказа",
-        "date_finish": "Дата завершения заказа",
-        "order_time": "Дата заказа",
-        "num_items": "Количество товаров",
-        "items": "Товары",
-        "customer": "Клиент",
-        "shipping_address_name": "Адрес доставки",
-    }
+    actions = (
+        "download_selected_orders",
+        "export_selected_orders",
+        "change_order_statuses",
+    )
 
     def get_table_pagination(self, table):
         return dict(per_page=settings.ORDERS_PER_PAGE)
 
     def dispatch(self, request, *args, **kwargs):
         # base_queryset is equal to all orders the user is allowed to access
-        self.base_queryset = queryset_orders(request=request).annotate(
-            source=Max("sources__reference"),
-            amount_paid=Sum("sources__amount_debited")
-            - Sum("sources__amount_refunded"),
-            before_order=Case(
-                When(
-                    date_finish__isnull=True,
-                    then=ExpressionWrapper(
-                        F("order_time") - now(), output_field=DurationField()
-                    ),
-                ),
-                default=Value(None),
-                output_field=DurationField(),
-            ),
-        )
+        self.base_queryset = annotate_orders(queryset_orders(request=request))
         return super().dispatch(request, *args, **kwargs)
 
     def get(self, request, *args, **kwargs):
@@ -640,21 +708,7 @@ class OrderListView(EventHandlerMixin, BulkEditMixin, SingleTableView):
         if data["status"]:
             queryset = queryset.filter(status=data["status"])
 
-        return queryset.annotate(
-            source=Max("sources__reference"),
-            amount_paid=Sum("sources__amount_debited")
-            - Sum("sources__amount_refunded"),
-            before_order=Case(
-                When(
-                    date_finish__isnull=True,
-                    then=ExpressionWrapper(
-                        F("order_time") - now(), output_field=DurationField()
-                    ),
-                ),
-                default=Value(None),
-                output_field=DurationField(),
-            ),
-        )
+        return annotate_orders(queryset)
 
     def get_table(self, **kwargs):
         table = super().get_table(**kwargs)
@@ -840,107 +894,92 @@ class OrderListView(EventHandlerMixin, BulkEditMixin, SingleTableView):
         return ctx
 
     def is_csv_download(self):
-        return self.request.GET.get("response_format", None) == "csv"
+        return self.request.GET.get("response_format", None) in ("csv", "csv_file")
 
     def get_paginate_by(self, queryset):
         return None if self.is_csv_download() else self.paginate_by
 
     def render_to_response(self, context, **response_kwargs):
         if self.is_csv_download():
-            return self.download_selected_orders(self.request, context["object_list"])
+            orders = context["object_list"]
+            if self.request.GET["response_format"] == "csv_file":
+                return self.export_selected_orders(self.request, orders)
+            return self.download_selected_orders(self.request, orders)
         return super().render_to_response(context, **response_kwargs)
 
+    def get_objects(self, ids):
+        # Bulk actions iterate the orders once, there is no need to load
+        # them all up front
+        return self.base_queryset.filter(pk__in=ids)
+
     def get_download_filename(self, request):
         return "orders.csv"
 
-    def get_row_values(self, order):
-        formatted_items = [
-            f"{item.name}({item.quantity})" for item in order.lines.all()
-        ]
-        row = {
-            "number": order.number,
-            "total": order.total,
-            "shipping_charge": order.shipping,
-            "shipping_method": order.shipping_method,
-            "status": order.status,
-            "date_placed": format_datetime(order.date_placed, "DATETIME_FORMAT"),
-            "date_finish": (
-                format_datetime(order.date_finish, "DATETIME_FORMAT")
-                if order.date_finish
-                else ""
-            ),
-            "order_time": format_datetime(order.order_time, "DATETIME_FORMAT"),
-            "num_items": order.num_items,
-            "items": " ".join(formatted_items),
-            "customer": order.user.username,
-            "shipping_address_name": (
-                order.shipping_address.line1 if order.shipping_address else ""
-            ),
-        }
-        return row
-
     def download_selected_orders(self, request, orders):
-        # Используем StringIO для работы с текстовыми данными в памяти
-        output = io.StringIO()
-        writer = csv.writer(
-            output, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
-        )
-
-        # Записываем заголовки столбцов в CSV файл
-        writer.writerow([header for header in self.CSV_COLUMNS.values()])
-
-        # Записываем данные в CSV файл
-        for order in orders:
-            row_values = self.get_row_values(order)
-            writer.writerow([row_values.get(column, "") for column in self.CSV_COLUMNS])
-
-        # Преобразуем содержимое StringIO в байты с кодировкой utf-8
-        response = HttpResponse(
-            output.getvalue().encode("utf-8-sig"),
+        response = StreamingHttpResponse(
+            OrderCSVExporter().stream(orders),
             content_type="text/csv; charset=utf-8",
         )
         response["Content-Disposition"] = (
             f"attachment; filename={self.get_download_filename(request)}"
         )
-        output.close()
-
         return response
 
+    def export_selected_orders(self, request, orders):
+        """
+        Build the CSV file in the background and send a link to it as a
+        notification. Meant for exports too large to stream in a request.
+        """
+        order_ids = list(orders.order_by().values_list("pk", flat=True).distinct())
+        if settings.CELERY:
+            export_orders_task.delay(order_ids, request.user.id)
+            messages.info(
+                request,
+                "Выгрузка %s заказов запущена, ссылка на файл придет в уведомлениях"
+                % len(order_ids),
+            )
+        else:
+            export_orders_task(order_ids, request.user.id)
+            messages.info(request, "Ссылка на файл выгрузки отправлена в уведомления")
+        return redirect("dashboard:order-list")
+
     def change_order_statuses(self, request, orders):
-        for order in orders:
-            self.change_order_status(request, order)
+        self.bulk_change_order_status(request, orders)
         return redirect("dashboard:order-list")
 
-    def change_order_status(self, request, order):
-        # This method is pretty similar to what
-        # OrderDetailView.change_order_status does. Ripe for refactoring.
+    def bulk_change_order_status(self, request, orders):
         new_status = request.POST["new_status"].strip()
         if not new_status:
             messages.error(request, "Новый статус '%s' недействительный." % new_status)
-        elif new_status not in order.available_statuses():
+            return
+
+        orders = list(orders)
+        old_statuses = {order.pk: order.status for order in orders}
+        handler = self.get_handler(user=request.user)
+        try:
+            changed, errors = handler.handle_order_status_changes(orders, new_status)
+        except PaymentError as e:
             messages.error(
                 request,
-                "Новый статус '%s' недействительный для этого заказа." % new_status,
+                "Невозможно изменить статус заказа из-за ошибки оплаты: %s" % e,
             )
-        else:
-            handler = self.get_handler(user=request.user)
-            old_status = order.status
-            try:
-                handler.handle_order_status_change(order, new_status)
-            except PaymentError as e:
-                messages.error(
-                    request,
-                    "Невозможно изменить статус заказа из-за ошибки оплаты: %s" % e,
-                )
-            else:
-                msg = (
-                    "Статус заказа №%(number)s изменился с '%(old_status)s' на '%(new_status)s'"
-                ) % {
-                    "old_status": old_status,
-                    "new_status": new_status,
-                    "number": order.number,
-                }
-                messages.info(request, msg)
+            return
+
+        for order, error in errors.items():
+            messages.error(
+                request,
+                "Новый статус '%s' недействительный для заказа №%s: %s"
+                % (new_status, order.number, error),
+            )
+        for order in changed:
+            msg = (
+                "Статус заказа №%(number)s изменился с '%(old_status)s' на '%(new_status)s'"
+            ) % {
+                "old_status": old_statuses[order.pk],
+                "new_status": new_status,
+                "number": order.number,
+            }
+            messages.info(request, msg)
 
 
 class OrderActiveListView(OrderListView):
@@ -974,11 +1013,11 @@ class OrderActiveListView(OrderListView):
         ctx["form"] = self.form
         ctx["order_statuses"] = Order.all_statuses()
         ctx["title"] = "Активные заказы"
+        ctx["order_events"] = settings.DASHBOARD_ORDER_EVENTS
         return ctx
 
     def change_order_statuses(self, request, orders):
-        for order in orders:
-            self.change_order_status(request, order)
+        self.bulk_change_order_status(request, orders)
         return redirect("dashboard:order-active-list")
 
 
@@ -1017,21 +1056,7 @@ class OrderActiveListLookupView(APIView):
             return JsonResponse({"update": False, "num_orders": num_orders})
 
         # Аннотируем и сортируем queryset
-        queryset = queryset.order_by("order_time").annotate(
-            source=Max("sources__reference"),
-            amount_paid=Sum("sources__amount_debited")
-            - Sum("sources__amount_refunded"),
-            before_order=Case(
-                When(
-                    date_finish__isnull=True,
-                    then=ExpressionWrapper(
-                        F("order_time") - now(), output_field=DurationField()
-                    ),
-                ),
-                default=Value(None),
-                output_field=DurationField(),
-            ),
-        )
+        queryset = annotate_orders(queryset.order_by("order_time"))
 
         # Сортировка в зависимости от запроса
         queryset = sort_queryset(queryset, request, ["number", "total"])
@@ -1046,6 +1071,81 @@ class OrderActiveListLookupView(APIView):
         return JsonResponse({"html": html, "update": True, "num_orders": num_orders})
 
 
+class OrderExportDownloadView(View):
+    """
+    Serves an order export file. Files are looked up in the directory of
+    the current user only, so users can't download each other's exports.
+    """
+
+    def get(self, request, *args, **kwargs):
+        filename = kwargs["filename"]
+        if os.path.basename(filename) != filename or filename.startswith("."):
+            raise Http404()
+        return serve_export(
+            os.path.join(OrderCSVExporter.get_user_dir(request.user.id), filename)
+        )
+
+
+class OrderActiveEventsView(View):
+    """
+    Server-sent events with changes of the active orders.
+
+    Order signals publish changes to a Redis channel which every worker
+    subscribes to, so the stream works with several ASGI workers. Each
+    event carries the rendered table row of the order, or only its number
+    if the order left the active list, scoped to the staff stores. The
+    stream ends after ``DASHBOARD_ORDER_EVENTS_MAX_AGE`` seconds and the
+    browser reconnects after ``DASHBOARD_ORDER_EVENTS_RETRY`` milliseconds.
+    """
+
+    table_class = OrderTable
+    row_template_name = "dashboard/partials/table_row.html"
+
+    def get(self, request):
+        if not settings.DASHBOARD_ORDER_EVENTS:
+            raise Http404()
+
+        store_ids = None
+        if not request.user.is_superuser:
+            store_ids = set(request.staff_stores.values_list("id", flat=True))
+
+        response = StreamingHttpResponse(
+            self.stream(request, store_ids), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self, request, store_ids):
+        yield "retry: %d\n\n" % settings.DASHBOARD_ORDER_EVENTS_RETRY
+        async for event in iter_order_events():
+            if event is None:
+                yield ": ping\n\n"
+                continue
+            if store_ids is not None and event["store_id"] not in store_ids:
+                continue
+            if event["active"]:
+                event["html"] = await sync_to_async(self.render_row)(
+                    request, event["number"]
+                )
+                event["active"] = event["html"] is not None
+            yield "event: order\ndata: %s\n\n" % json.dumps(event)
+
+    def render_row(self, request, number):
+        queryset = annotate_orders(
+            queryset_orders(request=request).filter(
+                number=number, status__in=settings.ORDER_ACTIVE_STATUSES
+            )
+        )
+        table = self.table_class(queryset)
+        rows = list(table.rows)
+        if not rows:
+            return None
+        return render_to_string(
+            self.row_template_name, {"table": table, "row": rows[0]}, request=request
+        )
+
+
 class OrderModalView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [SessionAuthentication]
@@ -0,0 +1,66 @@
+from apps.dashboard.staff import StoreCounters, bump_staff_version
+from apps.webshop.order.signals import (bulk_order_status_changed, order_placed,
+                                        order_status_changed)
+from core.compat import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+User = get_user_model()
+
+
+# pylint: disable=unused-argument
+@receiver(order_placed)
+def count_order_placed(sender, order, **kwargs):
+    if kwargs.get("raw", False):
+        return
+    transaction.on_commit(lambda: StoreCounters().order_placed(order))
+
+
+# pylint: disable=unused-argument
+@receiver(order_status_changed)
+def count_order_status_changed(sender, order, old_status, new_status, **kwargs):
+    transaction.on_commit(
+        lambda: StoreCounters().status_changed(order, old_status, new_status)
+    )
+
+
+# pylint: disable=unused-argument
+@receiver(bulk_order_status_changed)
+def count_bulk_order_status_changed(sender, orders, old_statuses, new_status, **kwargs):
+    def update():
+        counters = StoreCounters()
+        for order in orders:
+            counters.status_changed(order, old_statuses[order.pk], new_status)
+
+    transaction.on_commit(update)
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=User)
+def invalidate_user_staff_context(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    transaction.on_commit(lambda: bump_staff_version(instance.pk))
+
+
+# pylint: disable=unused-argument
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, User):
+        transaction.on_commit(lambda: bump_staff_version(instance.pk))
+    else:
+        # Changed from the group or permission side
+        transaction.on_commit(bump_staff_version)
+
+
+# pylint: disable=unused-argument
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permissions(sender, action, **kwargs):
+    if action.startswith("post_"):
+        transaction.on_commit(bump_staff_version)
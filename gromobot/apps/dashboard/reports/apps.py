@@ -13,9 +13,19 @@ class ReportsDashboardConfig(DashboardConfig):
     # pylint: disable=attribute-defined-outside-init
     def ready(self):
         self.index_view = get_class("dashboard.reports.views", "IndexView")
+        self.jobs_view = get_class("dashboard.reports.views", "ReportJobsView")
+        self.job_download_view = get_class(
+            "dashboard.reports.views", "ReportJobDownloadView"
+        )
 
     def get_urls(self):
         urls = [
             path("", self.index_view.as_view(), name="reports-index"),
+            path("jobs/", self.jobs_view.as_view(), name="reports-jobs"),
+            path(
+                "jobs/<uuid:job_id>/download/",
+                self.job_download_view.as_view(),
+                name="reports-job-download",
+            ),
         ]
         return self.post_process_urls(urls)
@@ -29,6 +29,12 @@ class ReportForm(forms.Form):
         help_text="Выбранный диапазон дат используется только в отчетах о предложениях и заказах",
     )
     download = forms.BooleanField(label="Скачать", required=False)
+    file_format = forms.ChoiceField(
+        choices=(("csv", "CSV"), ("xlsx", "XLSX")),
+        initial="csv",
+        required=False,
+        label="Формат файла",
+    )
 
     def clean(self):
         date_from = self.cleaned_data.get("date_from", None)
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import uuid
+
+from apps.dashboard.storage import export_storage
+from core.loading import get_class
+from django.conf import settings
+from django.core.files import File
+from django.utils.timezone import now
+
+GeneratorRepository = get_class("dashboard.reports.utils", "GeneratorRepository")
+
+
+class ReportJobRunner:
+    """
+    Generates the file of a ``ReportJob``.
+
+    The generator reads its queryset in chunks and streams the rows into a
+    temporary file which is then saved to the private export storage, the
+    progress of the job is updated after every chunk.
+    """
+
+    def __init__(self, job):
+        self.job = job
+
+    def get_generator(self):
+        generator_cls = GeneratorRepository().get_generator(self.job.code)
+        if generator_cls is None:
+            raise ValueError(f"Неизвестный тип отчета: {self.job.code}")
+        return generator_cls(
+            start_date=self.job.start_date,
+            end_date=self.job.end_date,
+            formatter="CSV",
+        )
+
+    def iter_objects(self, generator):
+        for objects in generator.iter_chunks():
+            yield from objects
+            self.job.update(progress=self.job.progress + len(objects))
+
+    def run(self):
+        """
+        Generate the report file and save it to the export storage.
+        """
+        job = self.job
+        generator = self.get_generator()
+        formatter = generator.formatter
+        job.update(status=job.RUNNING, progress=0, total=generator.count())
+
+        file_format = job.file_format
+        if file_format not in formatter.file_formats:
+            file_format = formatter.file_formats[0]
+        filename = "%s-%s-%s.%s" % (
+            job.code,
+            now().strftime("%Y%m%d-%H%M%S"),
+            uuid.uuid4().hex[:8],
+            file_format,
+        )
+        with tempfile.TemporaryFile() as tmp:
+            formatter.generate_file(tmp, self.iter_objects(generator), file_format)
+            tmp.seek(0)
+            name = export_storage.save(
+                os.path.join(settings.REPORTS_EXPORT_DIR, filename), File(tmp)
+            )
+        job.update(status=job.DONE, file_name=name, file_format=file_format)
+        return name
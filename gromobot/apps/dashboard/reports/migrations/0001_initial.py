@@ -0,0 +1,40 @@
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('code', models.CharField(max_length=128, verbose_name='Код отчета')),
+                ('description', models.CharField(max_length=255, verbose_name='Отчет')),
+                ('start_date', models.DateField(blank=True, null=True, verbose_name='Дата начала')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Дата окончания')),
+                ('file_format', models.CharField(default='csv', max_length=16, verbose_name='Формат файла')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Формируется'), ('done', 'Готов'), ('failed', 'Ошибка')], default='pending', max_length=16, verbose_name='Статус')),
+                ('progress', models.PositiveIntegerField(default=0, verbose_name='Обработано строк')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Всего строк')),
+                ('file_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Файл')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('date_created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Файл отчета',
+                'verbose_name_plural': 'Файлы отчетов',
+                'ordering': ('-date_created',),
+            },
+        ),
+    ]
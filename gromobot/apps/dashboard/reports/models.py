@@ -0,0 +1,109 @@
+import uuid
+
+from apps.dashboard.storage import export_storage
+from core.compat import AUTH_USER_MODEL
+from django.conf import settings
+from django.db import models
+from django.urls import reverse
+
+
+class ReportJob(models.Model):
+    """
+    Report file generated in the background.
+
+    The reports page lists the latest ``REPORTS_JOBS_HISTORY`` jobs of the
+    user, older jobs are deleted with their files when a new one is
+    started. The file is only served to the user who started the job.
+    """
+
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+    STATUS_CHOICES = (
+        (PENDING, "В очереди"),
+        (RUNNING, "Формируется"),
+        (DONE, "Готов"),
+        (FAILED, "Ошибка"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="report_jobs",
+        verbose_name="Пользователь",
+    )
+    code = models.CharField("Код отчета", max_length=128)
+    description = models.CharField("Отчет", max_length=255)
+    start_date = models.DateField("Дата начала", blank=True, null=True)
+    end_date = models.DateField("Дата окончания", blank=True, null=True)
+    file_format = models.CharField("Формат файла", max_length=16, default="csv")
+    status = models.CharField(
+        "Статус", choices=STATUS_CHOICES, default=PENDING, max_length=16
+    )
+    progress = models.PositiveIntegerField("Обработано строк", default=0)
+    total = models.PositiveIntegerField("Всего строк", blank=True, null=True)
+    file_name = models.CharField("Файл", max_length=255, blank=True, default="")
+    error = models.TextField("Ошибка", blank=True, default="")
+    date_created = models.DateTimeField("Дата создания", auto_now_add=True)
+
+    class Meta:
+        app_label = "reports_dashboard"
+        ordering = ("-date_created",)
+        verbose_name = "Файл отчета"
+        verbose_name_plural = "Файлы отчетов"
+
+    def __str__(self):
+        return f"{self.description} - {self.get_status_display()}"
+
+    @classmethod
+    def create(cls, user, generator_cls, start_date, end_date, file_format):
+        job = cls.objects.create(
+            user=user,
+            code=generator_cls.code,
+            description=generator_cls.description,
+            start_date=start_date,
+            end_date=end_date,
+            file_format=file_format,
+        )
+        cls.delete_old(user.id)
+        return job
+
+    @classmethod
+    def delete_old(cls, user_id):
+        """Delete the jobs beyond the history of the user with their files"""
+        old_jobs = cls.objects.filter(user_id=user_id)[settings.REPORTS_JOBS_HISTORY :]
+        for job in old_jobs:
+            if job.file_name:
+                export_storage.delete(job.file_name)
+            job.delete()
+
+    @classmethod
+    def for_user(cls, user_id):
+        jobs = cls.objects.filter(user_id=user_id)
+        return list(jobs[: settings.REPORTS_JOBS_HISTORY])
+
+    def update(self, **kwargs):
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+        self.save(update_fields=list(kwargs))
+
+    @property
+    def status_label(self):
+        return self.get_status_display()
+
+    @property
+    def is_active(self):
+        return self.status in (self.PENDING, self.RUNNING)
+
+    @property
+    def percent(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.total:
+            return 0
+        return min(int(self.progress * 100 / self.total), 100)
+
+    @property
+    def url(self):
+        if not self.file_name:
+            return ""
+        return reverse("dashboard:reports-job-download", kwargs={"job_id": self.id})
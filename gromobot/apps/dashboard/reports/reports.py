@@ -1,9 +1,15 @@
-from datetime import time
+import datetime
+import io
+from decimal import Decimal as D
 
+import openpyxl
 from core import utils
 from core.compat import UnicodeCSVWriter
+from django.conf import settings
+from django.db.models.query import ModelIterable, QuerySet
 from django.http import HttpResponse
 from django.template.defaultfilters import date
+from django.utils.timezone import is_aware, localtime
 
 
 class ReportGenerator(object):
@@ -79,6 +85,48 @@ class ReportGenerator(object):
     def generate(self, *args, **kwargs):
         return self.formatter.generate_response(self.queryset)
 
+    def count(self):
+        return self.queryset.count()
+
+    def prepare_chunk(self, objects):
+        """
+        Hook for loading the related data of a chunk of report objects, with
+        one query per relation instead of one per row.
+        """
+        return objects
+
+    def iter_chunks(self, chunk_size=None):
+        """
+        Yield the report objects in chunks. Model querysets are paginated by
+        primary key, so a later chunk costs as much as the first one;
+        aggregated ``values()`` querysets are small and read at once.
+        """
+        chunk_size = chunk_size or settings.REPORTS_CHUNK_SIZE
+        queryset = self.queryset
+        if not isinstance(queryset, QuerySet) or not issubclass(
+            queryset._iterable_class, ModelIterable
+        ):
+            objects = list(queryset)
+            if objects:
+                yield self.prepare_chunk(objects)
+            return
+
+        queryset = queryset.order_by("pk")
+        last_pk = None
+        while True:
+            page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            objects = list(page[:chunk_size])
+            if not objects:
+                return
+            yield self.prepare_chunk(objects)
+            if len(objects) < chunk_size:
+                return
+            last_pk = objects[-1].pk
+
+    def iter_objects(self):
+        for objects in self.iter_chunks():
+            yield from objects
+
     def filename(self):
         """
         Returns the filename for this report
@@ -101,7 +149,7 @@ class ReportGenerator(object):
 
         # After the start date
         if self.start_date:
-            start_datetime = utils.datetime_combine(self.start_date, time.min)
+            start_datetime = utils.datetime_combine(self.start_date, datetime.time.min)
             filter_kwargs = {
                 "%s__gte" % self.date_range_field_name: start_datetime,
             }
@@ -109,7 +157,7 @@ class ReportGenerator(object):
 
         # Before the end of the end date
         if self.end_date:
-            end_datetime = utils.datetime_combine(self.end_date, time.max)
+            end_datetime = utils.datetime_combine(self.end_date, datetime.time.max)
             filter_kwargs = {
                 "%s__lte" % self.date_range_field_name: end_datetime,
             }
@@ -137,10 +185,57 @@ class ReportFormatter(object):
         return self.filename_template
 
 
+class XLSXWriter:
+    """
+    Row writer with the interface of ``UnicodeCSVWriter`` which appends rows
+    to a sheet of a write-only openpyxl workbook, so rows aren't kept in
+    memory.
+    """
+
+    def __init__(self, workbook):
+        self.sheet = workbook.create_sheet()
+
+    def cell_value(self, value):
+        if isinstance(value, datetime.datetime) and is_aware(value):
+            return localtime(value).replace(tzinfo=None)
+        if value is None or isinstance(value, (str, int, float, D, datetime.date)):
+            return value
+        return str(value)
+
+    def writerow(self, row):
+        self.sheet.append([self.cell_value(value) for value in row])
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+
 class ReportCSVFormatter(ReportFormatter):
+    # Formats of report files, the first one is used by default
+    file_formats = ("csv", "xlsx")
+
     def get_csv_writer(self, file_handle, **kwargs):
+        # Report files pass a ready row writer, e.g. for XLSX output
+        if hasattr(file_handle, "writerow"):
+            return file_handle
         return UnicodeCSVWriter(open_file=file_handle, **kwargs)
 
+    def generate_file(self, file, objects, file_format):
+        """
+        Write the report of *objects* to the binary *file*.
+        """
+        if file_format == "xlsx":
+            workbook = openpyxl.Workbook(write_only=True)
+            # pylint: disable=no-member
+            self.generate_csv(XLSXWriter(workbook), objects)
+            workbook.save(file)
+        else:
+            output = io.TextIOWrapper(file, encoding="utf-8", newline="")
+            # pylint: disable=no-member
+            self.generate_csv(output, objects)
+            output.flush()
+            output.detach()
+
     def generate_response(self, objects, **kwargs):
         response = HttpResponse(content_type="text/csv")
         # pylint: disable=no-member
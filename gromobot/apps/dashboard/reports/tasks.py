@@ -0,0 +1,25 @@
+import logging
+
+from celery import shared_task
+from core.loading import get_class, get_model
+
+ReportJob = get_model("reports_dashboard", "ReportJob")
+ReportJobRunner = get_class("dashboard.reports.jobs", "ReportJobRunner")
+
+logger = logging.getLogger("apps.dashboard.reports")
+
+
+@shared_task
+def generate_report_task(job_id):
+    """
+    Формирует файл отчета в фоне и сохраняет его в хранилище.
+    """
+    job = ReportJob.objects.filter(pk=job_id).first()
+    if job is None:
+        logger.error(f"Задача формирования отчета не найдена (job_id={job_id})")
+        return
+    try:
+        ReportJobRunner(job).run()
+    except Exception as e:
+        logger.error(f"{e} при формировании отчета {job.code} (job_id={job_id})")
+        job.update(status=ReportJob.FAILED, error=str(e))
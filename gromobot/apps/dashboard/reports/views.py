@@ -1,11 +1,17 @@
-from core.loading import get_class
+from apps.dashboard.reports.tasks import generate_report_task
+from apps.dashboard.storage import serve_export
+from core.loading import get_class, get_model
 from django.conf import settings
-from django.http import Http404, HttpResponseForbidden
+from django.contrib import messages
+from django.db import transaction
+from django.http import Http404, HttpResponseForbidden, HttpResponseRedirect
 from django.template.response import TemplateResponse
-from django.views.generic import ListView
+from django.urls import reverse
+from django.views.generic import ListView, TemplateView, View
 
 ReportForm = get_class("dashboard.reports.forms", "ReportForm")
 GeneratorRepository = get_class("dashboard.reports.utils", "GeneratorRepository")
+ReportJob = get_model("reports_dashboard", "ReportJob")
 
 
 class IndexView(ListView):
@@ -15,23 +21,49 @@ class IndexView(ListView):
     report_form_class = ReportForm
     generator_repository = GeneratorRepository
 
-    def _get_generator(self, form):
+    def _get_generator_class(self, form):
         code = form.cleaned_data["report_type"]
 
         repo = self.generator_repository()
         generator_cls = repo.get_generator(code)
         if not generator_cls:
             raise Http404()
+        return generator_cls
 
-        download = form.cleaned_data["download"]
-        formatter = "CSV" if download else "HTML"
-
+    def _get_generator(self, form):
+        generator_cls = self._get_generator_class(form)
         return generator_cls(
             start_date=form.cleaned_data["date_from"],
             end_date=form.cleaned_data["date_to"],
-            formatter=formatter,
+            formatter="HTML",
         )
 
+    def _start_job(self, form):
+        """
+        Queue the report file, it is generated in the background and shows
+        up in the list of report jobs.
+        """
+        job = ReportJob.create(
+            self.request.user,
+            self._get_generator_class(form),
+            start_date=form.cleaned_data["date_from"],
+            end_date=form.cleaned_data["date_to"],
+            file_format=form.cleaned_data["file_format"] or "csv",
+        )
+        if settings.CELERY:
+            transaction.on_commit(lambda: generate_report_task.delay(job.id))
+        else:
+            generate_report_task(job.id)
+        messages.info(
+            self.request, "Отчет формируется, ссылка на файл появится в списке отчетов"
+        )
+        return HttpResponseRedirect(reverse("dashboard:reports-index"))
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["report_jobs"] = ReportJob.for_user(self.request.user.id)
+        return ctx
+
     def get(self, request, *args, **kwargs):
         if "report_type" in request.GET:
             form = self.report_form_class(request.GET)
@@ -40,10 +72,8 @@ class IndexView(ListView):
                 if not generator.is_available_to(request.user):
                     return HttpResponseForbidden("У вас нет доступа к этому отчету.")
 
-                report = generator.generate(request)
-
                 if form.cleaned_data["download"]:
-                    return report
+                    return self._start_job(form)
                 else:
                     self.template_name = generator.filename()
                     # pylint: disable=attribute-defined-outside-init
@@ -55,4 +85,36 @@ class IndexView(ListView):
                     return self.render_to_response(context)
         else:
             form = self.report_form_class()
-        return TemplateResponse(request, self.template_name, {"form": form})
+        return TemplateResponse(
+            request,
+            self.template_name,
+            {"form": form, "report_jobs": ReportJob.for_user(request.user.id)},
+        )
+
+
+class ReportJobsView(TemplateView):
+    """
+    List of the user's report jobs, polled by the reports page while a job
+    is running.
+    """
+
+    template_name = "dashboard/reports/partials/report_jobs.html"
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["report_jobs"] = ReportJob.for_user(self.request.user.id)
+        return ctx
+
+
+class ReportJobDownloadView(View):
+    """
+    Serves the file of a finished report job to the user who started it.
+    """
+
+    def get(self, request, *args, **kwargs):
+        job = ReportJob.objects.filter(
+            pk=kwargs["job_id"], user_id=request.user.id
+        ).first()
+        if job is None or not job.file_name:
+            raise Http404()
+        return serve_export(job.file_name)
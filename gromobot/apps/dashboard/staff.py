@@ -0,0 +1,231 @@
+import datetime
+import time
+from decimal import Decimal as D
+
+from apps.webshop.store.registry import STORES_VERSION_KEY
+from core.loading import get_model
+from core.utils import datetime_combine
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils.timezone import localdate, now
+
+Store = get_model("store", "Store")
+Order = get_model("order", "Order")
+
+STAFF_VERSION_KEY = "dashboard_staff_version"
+USER_VERSION_KEY_TEMPLATE = "dashboard_staff_version_%s"
+
+
+def bump_staff_version(user_id=None):
+    """
+    Invalidate the staff context of one user, or of every user if
+    *user_id* is not given.
+    """
+    key = USER_VERSION_KEY_TEMPLATE % user_id if user_id else STAFF_VERSION_KEY
+    cache.set(key, time.time_ns(), None)
+
+
+class StaffContext:
+    """
+    Compact per-user dashboard context: the ids and names of the stores the
+    user works with and whether they have full access.
+
+    The context is cached under the stores version, the global staff version
+    and the user's own version, so a warm request needs no queries.
+    """
+
+    cache_key_template = "dashboard_staff_%s_%s_%s_%s"
+
+    def __init__(self, store_ids, store_names, full_access):
+        self.store_ids = store_ids
+        self.store_names = store_names
+        self.full_access = full_access
+
+    @classmethod
+    def get_cache_key(cls, user):
+        user_version_key = USER_VERSION_KEY_TEMPLATE % user.id
+        versions = cache.get_many(
+            [STORES_VERSION_KEY, STAFF_VERSION_KEY, user_version_key]
+        )
+        return cls.cache_key_template % (
+            user.id,
+            versions.get(STORES_VERSION_KEY, 0),
+            versions.get(STAFF_VERSION_KEY, 0),
+            versions.get(user_version_key, 0),
+        )
+
+    @classmethod
+    def for_user(cls, user):
+        key = cls.get_cache_key(user)
+        data = cache.get(key)
+        if data is None:
+            data = cls.build(user)
+            cache.set(key, data, settings.DASHBOARD_STAFF_CONTEXT_TIMEOUT)
+        return cls(**data)
+
+    @classmethod
+    def build(cls, user):
+        full_access = user.is_superuser or user.has_perm("user.full_access")
+        stores = Store.objects.all()
+        if not full_access:
+            stores = stores.filter(users=user)
+        rows = list(stores.values_list("id", "name"))
+        return {
+            "store_ids": [store_id for store_id, _ in rows],
+            "store_names": dict(rows),
+            "full_access": full_access,
+        }
+
+    def get_queryset(self):
+        """
+        Lazy queryset of the staff stores, meant to be used in filters.
+        """
+        if self.full_access:
+            return Store.objects.all()
+        return Store.objects.filter(pk__in=self.store_ids)
+
+
+class StoreCounters:
+    """
+    Today's revenue and order counters and the number of active orders per
+    store.
+
+    Counters live in the cache and are updated incrementally by order
+    signals. A missing counter is recomputed from the database on read;
+    counters expire after ``DASHBOARD_COUNTERS_TIMEOUT`` so orders created
+    without signals (e.g. synced from Evotor) are picked up.
+    """
+
+    day_fields = ("revenue", "orders", "online_orders")
+
+    @staticmethod
+    def day_key(store_id, field, day=None):
+        day = day or localdate()
+        return "dashboard_%s_%s_%s" % (field, store_id, day.strftime("%Y%m%d"))
+
+    @staticmethod
+    def active_key(store_id):
+        return "dashboard_active_orders_%s" % store_id
+
+    @staticmethod
+    def is_active(status):
+        return status in settings.ORDER_ACTIVE_STATUSES
+
+    # Reading
+
+    def get_today(self, store_ids):
+        """
+        Return a dict mapping store ids to today's ``revenue``, ``orders``
+        and ``online_orders``.
+        """
+        keys = {
+            (store_id, field): self.day_key(store_id, field)
+            for store_id in store_ids
+            for field in self.day_fields
+        }
+        values = cache.get_many(list(keys.values()))
+        missing = [
+            store_id
+            for store_id in store_ids
+            if any(keys[store_id, field] not in values for field in self.day_fields)
+        ]
+        if missing:
+            computed = self.compute_today(missing)
+            fresh = {
+                keys[store_id, field]: computed[store_id][field]
+                for store_id in missing
+                for field in self.day_fields
+            }
+            cache.set_many(fresh, settings.DASHBOARD_COUNTERS_TIMEOUT)
+            values.update(fresh)
+
+        return {
+            store_id: {
+                "revenue": D(values[keys[store_id, "revenue"]]) / 100,
+                "orders": values[keys[store_id, "orders"]],
+                "online_orders": values[keys[store_id, "online_orders"]],
+            }
+            for store_id in store_ids
+        }
+
+    def compute_today(self, store_ids):
+        rows = (
+            Order.objects.filter(
+                store_id__in=store_ids,
+                date_placed__gt=datetime_combine(now(), datetime.time.min),
+            )
+            .order_by()
+            .values("store_id")
+            .annotate(
+                revenue=Sum("total"),
+                orders=Count("id"),
+                online_orders=Count("id", filter=~Q(site__in=settings.OFFLINE_ORDERS)),
+            )
+        )
+        computed = {
+            store_id: {"revenue": 0, "orders": 0, "online_orders": 0}
+            for store_id in store_ids
+        }
+        for row in rows:
+            computed[row["store_id"]] = {
+                "revenue": int((row["revenue"] or 0) * 100),
+                "orders": row["orders"],
+                "online_orders": row["online_orders"],
+            }
+        return computed
+
+    def get_active(self, store_ids):
+        """
+        Return a dict mapping store ids to the number of active orders.
+        """
+        keys = {store_id: self.active_key(store_id) for store_id in store_ids}
+        values = cache.get_many(list(keys.values()))
+        missing = [store_id for store_id in store_ids if keys[store_id] not in values]
+        if missing:
+            counts = dict.fromkeys(missing, 0)
+            counts.update(
+                Order.objects.filter(
+                    store_id__in=missing,
+                    date_finish__isnull=True,
+                    status__in=settings.ORDER_ACTIVE_STATUSES,
+                )
+                .order_by()
+                .values_list("store_id")
+                .annotate(count=Count("id"))
+            )
+            fresh = {keys[store_id]: counts[store_id] for store_id in missing}
+            cache.set_many(fresh, settings.DASHBOARD_COUNTERS_TIMEOUT)
+            values.update(fresh)
+        return {store_id: values[keys[store_id]] for store_id in store_ids}
+
+    # Writing
+
+    def incr(self, key, delta):
+        # Missing counters are recomputed on the next read
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+    def order_placed(self, order):
+        if not order.store_id:
+            return
+        day = localdate(order.date_placed)
+        self.incr(
+            self.day_key(order.store_id, "revenue", day), int(order.total * 100)
+        )
+        self.incr(self.day_key(order.store_id, "orders", day), 1)
+        if order.site not in settings.OFFLINE_ORDERS:
+            self.incr(self.day_key(order.store_id, "online_orders", day), 1)
+        if order.date_finish is None and self.is_active(order.status):
+            self.incr(self.active_key(order.store_id), 1)
+
+    def status_changed(self, order, old_status, new_status):
+        if not order.store_id:
+            return
+        was_active, is_active = self.is_active(old_status), self.is_active(new_status)
+        if was_active and not is_active:
+            self.incr(self.active_key(order.store_id), -1)
+        elif is_active and not was_active:
+            self.incr(self.active_key(order.store_id), 1)
@@ -0,0 +1,34 @@
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404
+from django.utils.functional import LazyObject
+
+
+class ExportStorage(LazyObject):
+    """
+    Private storage for report and order export files.
+
+    The files contain customer data, so they are kept outside the media
+    root and are only served by dashboard views which check the owner.
+    """
+
+    def _setup(self):
+        self._wrapped = FileSystemStorage(location=settings.EXPORTS_ROOT)
+
+
+export_storage = ExportStorage()
+
+
+def serve_export(name):
+    """
+    Return the export file *name* as an attachment or raise 404.
+    """
+    if not name or not export_storage.exists(name):
+        raise Http404()
+    return FileResponse(
+        export_storage.open(name, "rb"),
+        as_attachment=True,
+        filename=os.path.basename(name),
+    )
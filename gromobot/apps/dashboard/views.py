@@ -1,3 +1,4 @@
+import copy
 import datetime as datetime_min
 import json
 from datetime import datetime, timedelta
@@ -5,11 +6,12 @@ from decimal import ROUND_UP
 from decimal import Decimal as D
 
 from apps.dashboard.orders.views import queryset_orders
+from apps.dashboard.staff import StoreCounters
+from apps.webshop.store.registry import StoreRegistry
 from apps.webshop.user.customer.views import AccountAuthView
 from core.compat import get_user_model
-from core.loading import get_class, get_model
+from core.loading import get_class, get_classes, get_model
 from core.utils import datetime_combine
-from django.conf import settings
 from django.contrib import messages
 from django.db.models import Avg, Count, Q, Sum
 from django.template.loader import render_to_string
@@ -23,6 +25,9 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 RelatedFieldWidgetWrapper = get_class("dashboard.widgets", "RelatedFieldWidgetWrapper")
+OrderRollups, sum_rows, average = get_classes(
+    "webshop.analytics.rollups", ["OrderRollups", "sum_rows", "average"]
+)
 
 ConditionalOffer = get_model("offer", "ConditionalOffer")
 Voucher = get_model("voucher", "Voucher")
@@ -30,7 +35,6 @@ Basket = get_model("basket", "Basket")
 StockAlert = get_model("store", "StockAlert")
 Product = get_model("catalogue", "Product")
 Category = get_model("catalogue", "Category")
-Order = get_model("order", "Order")
 Line = get_model("order", "Line")
 User = get_user_model()
 
@@ -64,7 +68,7 @@ class IndexView(TemplateView):
         """
         return Voucher.objects.filter(end_datetime__gt=now())
 
-    def get_hourly_report(self, orders, hours=24, segments=10):
+    def get_hourly_report(self, orders, hours=24, segments=10, rows=None):
         """
         Get report of order revenue split up in hourly chunks. A report is
         generated for the last *hours* (default=24) from the current time.
@@ -73,17 +77,24 @@ class IndexView(TemplateView):
         ``order_total_hourly``, a list of properties for hourly chunks.
         *segments* defines the number of labelling segments used for the y-axis
         when generating the y-axis labels (default=10).
+        If rollup *rows* are given, the chunks are summed from them instead
+        of querying *orders*.
         """
         # Get datetime for 24 hours ago
-        start_time = now().replace(minute=0, second=0) - timedelta(hours=hours - 1)
+        start_time = OrderRollups.truncate(now(), "hour") - timedelta(hours=hours - 1)
 
         order_total_hourly = []
         for _ in range(0, hours, 2):
             end_time = start_time + timedelta(hours=2)
-            hourly_orders = orders.filter(
-                date_placed__gte=start_time, date_placed__lt=end_time
-            )
-            total = hourly_orders.aggregate(Sum("total"))["total__sum"] or D("0.0")
+            if rows is not None:
+                total = sum_rows(rows, start_time, end_time)["revenue"]
+            else:
+                hourly_orders = orders.filter(
+                    date_placed__gte=start_time, date_placed__lt=end_time
+                )
+                total = hourly_orders.aggregate(Sum("total"))["total__sum"] or D(
+                    "0.0"
+                )
             order_total_hourly.append({"end_time": end_time, "total": total})
             start_time = end_time
 
@@ -114,7 +125,7 @@ class IndexView(TemplateView):
         }
         return ctx
 
-    def get_days_report(self, orders, days=7, segments=10):
+    def get_days_report(self, orders, days=7, segments=10, rows=None):
         """
         Get report of order revenue split up in days chunks. A report is
         generated for the last *days* (default=7 week) from the current time.
@@ -123,6 +134,8 @@ class IndexView(TemplateView):
         ``order_total_hourly``, a list of properties for hourly chunks.
         *segments* defines the number of labelling segments used for the y-axis
         when generating the y-axis labels (default=10).
+        If daily rollup *rows* are given, the chunks are summed from them
+        instead of querying *orders*.
         """
         start_time = datetime_combine(now(), datetime_min.time.max) - timedelta(
             days=days
@@ -131,10 +144,13 @@ class IndexView(TemplateView):
         order_total_days = []
         for _ in range(0, days, 1):
             end_time = start_time + timedelta(days=1)
-            days_orders = orders.filter(
-                date_placed__gte=start_time, date_placed__lt=end_time
-            )
-            total = days_orders.aggregate(Sum("total"))["total__sum"] or D("0.0")
+            if rows is not None:
+                total = sum_rows(rows, start_time, end_time)["revenue"]
+            else:
+                days_orders = orders.filter(
+                    date_placed__gte=start_time, date_placed__lt=end_time
+                )
+                total = days_orders.aggregate(Sum("total"))["total__sum"] or D("0.0")
             order_total_days.append({"end_time": end_time, "total": total})
             start_time = end_time
 
@@ -220,21 +236,158 @@ class IndexView(TemplateView):
             "products": prods,
         }
 
-    def get_stats(self):
+    def get_periods(self):
         current_time = datetime_combine(now(), datetime_min.time.min)
-        start_of_week = current_time.weekday()
         start_of_month = datetime(
             year=current_time.year,
             month=current_time.month,
             day=1,
             tzinfo=current_time.tzinfo,
         )
+        return {
+            "day": current_time,
+            "week": current_time - timedelta(days=current_time.weekday()),
+            "month": start_of_month,
+            "7days": current_time - timedelta(days=7),
+            "30days": current_time - timedelta(days=30),
+        }
+
+    def get_stats(self):
+        """
+        Overall statistics are read from the order rollups; statistics for
+        a single product or category still need the orders themselves.
+        """
+        if self.request.GET.get("product") or self.request.GET.get("category"):
+            stats = self.get_orders_stats()
+        else:
+            stats = self.get_rollup_stats()
+
+        if self.request.user.is_staff:
+            stats.update(
+                offer_maps=(
+                    ConditionalOffer.objects.filter(end_datetime__gt=now())
+                    .values("offer_type")
+                    .annotate(count=Count("id"))
+                    .order_by("offer_type")
+                ),
+                total_vouchers=self.get_active_vouchers().count(),
+            )
+        return stats
+
+    def get_rollup_stats(self):
+        request = self.request
+        staff_stores = request.staff_stores
+        stores = None if request.user.is_superuser else staff_stores
+        periods = self.get_periods()
+        current_time = periods["day"]
+
+        rollups = OrderRollups()
+        daily = rollups.get_rows(
+            "day",
+            "period_start",
+            stores=stores,
+            start=min(periods["month"], periods["30days"]),
+        )
+        hourly = rollups.get_rows(
+            "hour",
+            "period_start",
+            stores=stores,
+            start=OrderRollups.truncate(now(), "hour") - timedelta(hours=23),
+        )
+        by_status = rollups.get_rows("day", "status", stores=stores)
+        totals = sum_rows(by_status)
+
+        def joined_counts(queryset, field, **extra):
+            return queryset.aggregate(
+                total=Count("id"),
+                **extra,
+                **{
+                    name: Count("id", filter=Q(**{f"{field}__gt": start}))
+                    for name, start in periods.items()
+                },
+            )
+
+        users = User.objects.filter(
+            baskets__lines__isnull=False, baskets__store__in=staff_stores
+        ).distinct()
+        customers = User.objects.filter(
+            orders__lines__isnull=False, orders__store__in=staff_stores
+        ).distinct()
+        baskets = Basket.objects.filter(
+            lines__isnull=False, status=Basket.OPEN, store__in=staff_stores
+        ).distinct()
+        alerts = StockAlert.objects.filter(stockrecord__store__in=staff_stores)
+
+        user_counts = joined_counts(users, "date_joined")
+        customer_counts = joined_counts(customers, "date_joined")
+        basket_counts = joined_counts(
+            baskets, "date_created", guests=Count("id", filter=Q(owner__isnull=True))
+        )
+        alert_counts = alerts.aggregate(
+            open=Count("id", filter=Q(status=StockAlert.OPEN)),
+            closed=Count("id", filter=Q(status=StockAlert.CLOSED)),
+        )
+        customer_orders = customers.annotate(order_count=Count("orders")).aggregate(
+            orders2=Count("id", filter=Q(order_count__gte=2)),
+            orders5=Count("id", filter=Q(order_count__gte=5)),
+        )
+
+        stats = {
+            "title": "Общая статистика",
+            "current_time": current_time,
+            "start_of_week": periods["week"],
+            "start_of_month": periods["month"],
+            "time_7days_ago": periods["7days"],
+            "time_30days_ago": periods["30days"],
+            "hourly_report_dict": self.get_hourly_report(None, rows=hourly),
+            "week_report_dict": self.get_days_report(None, 7, rows=daily),
+            "month_report_dict": self.get_days_report(None, 30, rows=daily),
+            "total_products": Product.objects.count(),
+            "total_open_stock_alerts": alert_counts["open"],
+            "total_closed_stock_alerts": alert_counts["closed"],
+            "total_users": user_counts["total"],
+            "total_customers_2orders": customer_orders["orders2"],
+            "total_customers_5orders": customer_orders["orders5"],
+            "total_customers": customer_counts["total"],
+            "guest_baskets": basket_counts["guests"],
+            "customers_baskets": basket_counts["total"] - basket_counts["guests"],
+            "total_open_baskets": basket_counts["total"],
+            "total_orders": totals["num_orders"],
+            "total_lines": totals["num_lines"],
+            "total_revenue": totals["revenue"],
+            "order_status_breakdown": [
+                {"status": row["status"], "freq": row["num_orders"]}
+                for row in by_status
+                if row["num_orders"]
+            ],
+        }
+        for name, start in periods.items():
+            window = sum_rows(daily, start)
+            stats.update(
+                {
+                    f"total_orders_last_{name}": window["num_orders"],
+                    f"total_lines_last_{name}": window["num_lines"],
+                    f"average_order_costs_{name}": average(
+                        window["revenue"], window["num_orders"]
+                    ),
+                    f"total_revenue_last_{name}": window["revenue"],
+                    f"total_users_last_{name}": user_counts[name],
+                    f"total_customers_last_{name}": customer_counts[name],
+                    f"total_open_baskets_last_{name}": basket_counts[name],
+                }
+            )
+        return stats
+
+    def get_orders_stats(self):
+        periods = self.get_periods()
+        current_time = periods["day"]
+        start_of_month = periods["month"]
 
         datetime_day_ago = current_time
-        datetime_week_ago = current_time - timedelta(days=start_of_week)
-        datetime_month_ago = current_time - (current_time - start_of_month)
-        datetime_7days_ago = current_time - timedelta(days=7)
-        datetime_30days_ago = current_time - timedelta(days=30)
+        datetime_week_ago = periods["week"]
+        datetime_month_ago = periods["month"]
+        datetime_7days_ago = periods["7days"]
+        datetime_30days_ago = periods["30days"]
 
         data = self.get_data()
 
@@ -383,17 +536,6 @@ class IndexView(TemplateView):
             .values("status")
             .annotate(freq=Count("id")),
         }
-
-        if self.request.user.is_staff:
-            stats.update(
-                offer_maps=(
-                    ConditionalOffer.objects.filter(end_datetime__gt=now())
-                    .values("offer_type")
-                    .annotate(count=Count("id"))
-                    .order_by("offer_type")
-                ),
-                total_vouchers=self.get_active_vouchers().count(),
-            )
         return stats
 
 
@@ -403,21 +545,21 @@ class NavbarCash(APIView):
 
     def get(self, request, *args, **kwargs):
         try:
-            stores = request.staff_stores
-            current_time = now()
-            for store in stores:
-                store.orders_today = Order.objects.filter(
-                    store=store,
-                    date_placed__gt=datetime_combine(
-                        current_time, datetime_min.time.min
-                    ),
-                ).aggregate(
-                    total_orders=Count("id"),
-                    revenue_today=Sum("total"),
-                    online_orders=Count(
-                        "id", filter=~Q(site__in=settings.OFFLINE_ORDERS)
-                    ),
-                )
+            store_ids = request.staff_context.store_ids
+            today = StoreCounters().get_today(store_ids)
+            stores = []
+            for store_id in store_ids:
+                store = StoreRegistry.get(store_id)
+                if store is None:
+                    continue
+                # Registry instances are shared by the process
+                store = copy.copy(store)
+                store.orders_today = {
+                    "total_orders": today[store_id]["orders"],
+                    "revenue_today": today[store_id]["revenue"],
+                    "online_orders": today[store_id]["online_orders"],
+                }
+                stores.append(store)
 
             staore_cash_html = render_to_string(
                 "dashboard/partials/navbar-cash.html",
@@ -3,6 +3,7 @@ from django.contrib import admin
 
 EvotorEvent = get_model("evotor", "EvotorEvent")
 EvotorBulk = get_model("evotor", "EvotorBulk")
+EvotorSnapshot = get_model("evotor", "EvotorSnapshot")
 
 
 class EvotorEventAdmin(admin.ModelAdmin):
@@ -16,5 +17,16 @@ class EvotorEventAdmin(admin.ModelAdmin):
     search_fields = ("body",)
 
 
+class EvotorSnapshotAdmin(admin.ModelAdmin):
+    list_display = (
+        "object_type",
+        "store_evotor_id",
+        "error",
+        "date_updated",
+    )
+    list_filter = ("object_type",)
+
+
 admin.site.register(EvotorEvent, EvotorEventAdmin)
 admin.site.register(EvotorBulk)
+admin.site.register(EvotorSnapshot, EvotorSnapshotAdmin)
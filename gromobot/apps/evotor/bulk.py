@@ -0,0 +1,200 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from apps.webshop.catalogue.serializers import ProductSerializer
+from core.loading import get_model
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("apps.evotor")
+
+Product = get_model("catalogue", "Product")
+ProductAttributeValue = get_model("catalogue", "ProductAttributeValue")
+StockRecord = get_model("store", "StockRecord")
+EvotorBulk = get_model("evotor", "EvotorBulk")
+
+_local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """Пул HTTP соединений с API Эвотор, отдельный для каждого потока"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.EVOTOR_BULK_WORKERS,
+            max_retries=1,
+        )
+        session.mount("https://", adapter)
+        _local.session = session
+    return session
+
+
+def get_headers():
+    return {
+        "Authorization": "Bearer %s" % settings.EVOTOR_CLOUD_TOKEN,
+        "Content-Type": "application/vnd.evotor.v2+bulk+json",
+        "Accept": "application/vnd.evotor.v2+json",
+    }
+
+
+class EvotorProductBulkExporter:
+    """
+    Массовая выгрузка товаров магазина в Эвотор.
+
+    Товары, их классы, родители и складские записи магазина загружаются
+    несколькими запросами на весь список, затем сериализуются частями по
+    ``EVOTOR_BULK_SIZE`` и отправляются в Эвотор параллельно. Каждой части
+    соответствует строка ``EvotorBulk``, по которой отслеживается статус.
+    """
+
+    url = "https://api.evotor.ru/stores/%s/products"
+
+    def __init__(self, store_evotor_id, product_ids):
+        self.store_evotor_id = store_evotor_id
+        self.product_ids = list(product_ids)
+        self.batch_id = uuid.uuid4()
+
+    def get_queryset(self):
+        return (
+            Product.objects.filter(id__in=self.product_ids)
+            .select_related("product_class", "parent", "parent__product_class")
+            .prefetch_related(
+                "categories",
+                Prefetch(
+                    "attribute_values",
+                    queryset=ProductAttributeValue.objects.select_related(
+                        "attribute__option_group"
+                    ).prefetch_related("value_multi_option"),
+                ),
+            )
+            .order_by("id")
+        )
+
+    def get_stockrecords(self):
+        stockrecords = StockRecord.objects.filter(
+            product_id__in=self.product_ids, store__evotor_id=self.store_evotor_id
+        ).order_by("-id")
+        return {stc.product_id: stc for stc in stockrecords}
+
+    def get_chunks(self):
+        products = list(self.get_queryset())
+        size = settings.EVOTOR_BULK_SIZE
+        return [products[i : i + size] for i in range(0, len(products), size)]
+
+    def serialize(self, products, stockrecords):
+        serializer = ProductSerializer(
+            products,
+            many=True,
+            context={"store_id": self.store_evotor_id, "stockrecords": stockrecords},
+        )
+        return serializer.data
+
+    def run(self):
+        """Создает строки EvotorBulk, сериализует и отправляет все части"""
+        chunks = self.get_chunks()
+        if not chunks:
+            return []
+
+        stockrecords = self.get_stockrecords()
+        bulks = EvotorBulk.objects.bulk_create(
+            [
+                EvotorBulk(
+                    object_type=EvotorBulk.PRODUCT,
+                    status=EvotorBulk.PENDING,
+                    store_evotor_id=self.store_evotor_id,
+                    batch_id=self.batch_id,
+                    chunk=number,
+                    num_items=len(chunk),
+                )
+                for number, chunk in enumerate(chunks, start=1)
+            ]
+        )
+        payloads = [self.serialize(chunk, stockrecords) for chunk in chunks]
+
+        # В потоках только HTTP запросы, статусы сохраняются одним запросом
+        with ThreadPoolExecutor(max_workers=settings.EVOTOR_BULK_WORKERS) as executor:
+            list(executor.map(self.submit, bulks, payloads))
+
+        EvotorBulk.objects.bulk_update(
+            bulks, ["evotor_id", "status", "error", "date_finish"]
+        )
+        return bulks
+
+    def submit(self, bulk, payload):
+        try:
+            response = get_session().put(
+                self.url % self.store_evotor_id,
+                json=payload,
+                headers=get_headers(),
+                timeout=settings.EVOTOR_REQUEST_TIMEOUT,
+            )
+            response.raise_for_status()
+            data = response.json()
+            bulk.evotor_id = data.get("id")
+            bulk.status = data.get("status") or EvotorBulk.ACCEPTED
+        except (requests.RequestException, ValueError) as e:
+            logger.error(
+                "Ошибка отправки части %s выгрузки товаров %s в Эвотор: %s",
+                bulk.chunk,
+                self.batch_id,
+                e,
+            )
+            bulk.status = EvotorBulk.FAILED
+            bulk.error = str(e)
+            bulk.date_finish = timezone.now()
+        return bulk
+
+
+class EvotorBulkStatusUpdater:
+    """Обновляет статусы незавершенных массовых задач по данным Эвотор"""
+
+    url = "https://api.evotor.ru/bulks/%s"
+
+    def get_queryset(self):
+        return EvotorBulk.objects.filter(evotor_id__isnull=False).exclude(
+            status__in=EvotorBulk.FINAL_STATUSES
+        )
+
+    def run(self):
+        """Возвращает количество задач, которые еще выполняются"""
+        bulks = list(self.get_queryset())
+        if not bulks:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=settings.EVOTOR_BULK_WORKERS) as executor:
+            statuses = list(executor.map(self.fetch_status, bulks))
+
+        changed, running = [], 0
+        for bulk, status in zip(bulks, statuses):
+            if status is None or status == bulk.status:
+                running += 1
+                continue
+            bulk.status = status
+            if status in EvotorBulk.FINAL_STATUSES:
+                bulk.date_finish = timezone.now()
+            else:
+                running += 1
+            changed.append(bulk)
+
+        EvotorBulk.objects.bulk_update(changed, ["status", "date_finish"])
+        return running
+
+    def fetch_status(self, bulk):
+        try:
+            response = get_session().get(
+                self.url % bulk.evotor_id,
+                headers=get_headers(),
+                timeout=settings.EVOTOR_REQUEST_TIMEOUT,
+            )
+            response.raise_for_status()
+            return response.json().get("status")
+        except (requests.RequestException, ValueError) as e:
+            logger.error("Ошибка получения статуса задачи Эвотор %s: %s", bulk, e)
+            return None
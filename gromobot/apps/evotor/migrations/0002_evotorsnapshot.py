@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evotor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvotorSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_type', models.CharField(choices=[('stores', 'Магазины'), ('terminals', 'Терминалы'), ('staffs', 'Сотрудники'), ('groups', 'Категории'), ('products', 'Товары'), ('additionals', 'Доп. товары')], max_length=32, verbose_name='Тип объектов')),
+                ('store_evotor_id', models.CharField(blank=True, default='', max_length=128, verbose_name='ID магазина Эвотор')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Ответ Эвотор')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Ошибка')),
+                ('date_updated', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Снимок данных Эвотор',
+                'verbose_name_plural': 'Снимки данных Эвотор',
+                'ordering': ('-date_updated',),
+                'unique_together': {('object_type', 'store_evotor_id')},
+            },
+        ),
+    ]
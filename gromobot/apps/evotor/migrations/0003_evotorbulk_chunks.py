@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evotor', '0002_evotorsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evotorbulk',
+            name='store_evotor_id',
+            field=models.CharField(blank=True, default='', max_length=128, verbose_name='ID магазина Эвотор'),
+        ),
+        migrations.AddField(
+            model_name='evotorbulk',
+            name='batch_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True, verbose_name='ID выгрузки'),
+        ),
+        migrations.AddField(
+            model_name='evotorbulk',
+            name='chunk',
+            field=models.PositiveIntegerField(default=0, verbose_name='Номер части'),
+        ),
+        migrations.AddField(
+            model_name='evotorbulk',
+            name='num_items',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество объектов'),
+        ),
+        migrations.AddField(
+            model_name='evotorbulk',
+            name='error',
+            field=models.TextField(blank=True, default='', verbose_name='Ошибка'),
+        ),
+        migrations.AlterField(
+            model_name='evotorbulk',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Задача ожидает отправки'), ('ACCEPTED', 'Задача принята в работу'), ('RUNNING', 'Задача обрабатывается'), ('COMPLETED', 'Обработка задачи завершена'), ('DECLINED', 'Задача отклонена'), ('FAILED', 'Обработать задачу не удалось')], default='ACCEPTED', max_length=128, verbose_name='Статус задачи'),
+        ),
+    ]
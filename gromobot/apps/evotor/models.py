@@ -75,7 +75,8 @@ class EvotorBulk(models.Model):
     object_type = models.CharField(
         "Тип объектов", default=PRODUCT, choices=TYPE_CHOICES, max_length=128
     )
-    ACCEPTED, RUNNING, COMPLETED, DECLINED, FAILED = (
+    PENDING, ACCEPTED, RUNNING, COMPLETED, DECLINED, FAILED = (
+        "PENDING",
         "ACCEPTED",
         "RUNNING",
         "COMPLETED",
@@ -83,6 +84,7 @@ class EvotorBulk(models.Model):
         "FAILED",
     )
     STATUS_CHOICES = (
+        (PENDING, "Задача ожидает отправки"),
         (ACCEPTED, "Задача принята в работу"),
         (RUNNING, "Задача обрабатывается"),
         (COMPLETED, "Обработка задачи завершена"),
@@ -92,6 +94,14 @@ class EvotorBulk(models.Model):
     status = models.CharField(
         "Статус задачи", default=ACCEPTED, choices=STATUS_CHOICES, max_length=128
     )
+    store_evotor_id = models.CharField(
+        "ID магазина Эвотор", max_length=128, blank=True, default=""
+    )
+    # Все части одной выгрузки имеют общий batch_id
+    batch_id = models.UUIDField("ID выгрузки", blank=True, null=True, db_index=True)
+    chunk = models.PositiveIntegerField("Номер части", default=0)
+    num_items = models.PositiveIntegerField("Количество объектов", default=0)
+    error = models.TextField("Ошибка", blank=True, default="")
     date_created = models.DateTimeField("Дата создания", auto_now_add=True)
     date_finish = models.DateTimeField("Дата окончания", blank=True, null=True)
 
@@ -121,3 +131,48 @@ class EvotorUserGroup(models.Model):
         unique_together = (("group", "evotor_id"),)
         verbose_name = "Группа пользователей Эвотор"
         verbose_name_plural = "Группа пользователей Эвотор"
+
+
+class EvotorSnapshot(models.Model):
+    """
+    Last known state of a list of Evotor cloud objects.
+
+    Dashboard pages read and diff this stored copy instead of calling the
+    Evotor API on every request. Store-bound lists (groups, products,
+    additionals) are kept per store, the rest under an empty store id.
+    """
+
+    STORES, TERMINALS, STAFFS, GROUPS, PRODUCTS, ADDITIONALS = (
+        "stores",
+        "terminals",
+        "staffs",
+        "groups",
+        "products",
+        "additionals",
+    )
+    TYPE_CHOICES = (
+        (STORES, "Магазины"),
+        (TERMINALS, "Терминалы"),
+        (STAFFS, "Сотрудники"),
+        (GROUPS, "Категории"),
+        (PRODUCTS, "Товары"),
+        (ADDITIONALS, "Доп. товары"),
+    )
+    object_type = models.CharField(
+        "Тип объектов", choices=TYPE_CHOICES, max_length=32
+    )
+    store_evotor_id = models.CharField(
+        "ID магазина Эвотор", max_length=128, blank=True, default=""
+    )
+    data = models.JSONField("Ответ Эвотор", default=dict, blank=True)
+    error = models.TextField("Ошибка", blank=True, default="")
+    date_updated = models.DateTimeField("Дата обновления", auto_now=True, db_index=True)
+
+    class Meta:
+        ordering = ("-date_updated",)
+        unique_together = (("object_type", "store_evotor_id"),)
+        verbose_name = "Снимок данных Эвотор"
+        verbose_name_plural = "Снимки данных Эвотор"
+
+    def __str__(self):
+        return f"{self.object_type} - {self.store_evotor_id} - {self.date_updated}"
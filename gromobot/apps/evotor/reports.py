@@ -1,3 +1,5 @@
+import io
+
 import openpyxl
 from babel.dates import format_date
 from core.loading import get_class, get_model
@@ -20,61 +22,69 @@ file_path = settings.STATIC_PRIVATE_ROOT + "/xlsx/ОТЧЕТ!Прованс.xlsx
 
 class EvotorReportCSVFormatter(ReportCSVFormatter):
     filename_template = "evotor-%s-to-%s.csv"
+    # Отчет заполняет шаблон ТРЦ, поэтому формируется только в XLSX
+    file_formats = ("xlsx",)
 
-    def generate_response(self, orders, **kwargs):
+    def validate(self, orders):
         if 0 == len(orders):
-            msg = "Заказы за данный период не найдены!"
-            messages.warning(
-                kwargs["request"],
-                msg,
-            )
-            return HttpResponseRedirect(reverse("dashboard:reports-index"))
+            return "Заказы за данный период не найдены!"
         elif len(orders) > 31:
-            msg = "Представленный диапазон для отчета больше 31 дня!"
+            return "Представленный диапазон для отчета больше 31 дня!"
+        return None
+
+    def build_workbook(self, orders):
+        wb = openpyxl.load_workbook(file_path)
+        ws = wb.active
+        start_row = 16
+        last_day = orders[-1].get("day")
+        ws.cell(
+            row=8,
+            column=19,
+            value=format_date(last_day, format="LLLL", locale="ru").capitalize(),
+        )
+        ws.cell(row=10, column=19, value=last_day.month)
+        ws.cell(row=13, column=19, value=last_day.year)
+
+        for i, row_data in enumerate(orders):
+            ws.cell(row=start_row + i, column=1, value=row_data.get("day"))
+            ws.cell(row=start_row + i, column=22, value=row_data.get("total_sum"))
+            ws.cell(row=start_row + i, column=28, value=row_data.get("order_count"))
+            ws.cell(row=start_row + i, column=30, value=row_data.get("line_count"))
+
+            ws.cell(row=start_row + i, column=6, value="-")
+            ws.cell(row=start_row + i, column=11, value="-")
+            ws.cell(row=start_row + i, column=17, value="-")
+
+            ws.cell(row=start_row + i, column=33, value="не применимо")
+        return wb
+
+    def generate_file(self, file, objects, file_format):
+        orders = list(objects)
+        msg = self.validate(orders)
+        if msg:
+            raise ValueError(msg)
+        self.build_workbook(orders).save(file)
+
+    def generate_response(self, orders, **kwargs):
+        orders = list(orders)
+        msg = self.validate(orders)
+        if msg:
             messages.warning(
                 kwargs["request"],
                 msg,
             )
             return HttpResponseRedirect(reverse("dashboard:reports-index"))
-        else:
-            wb = openpyxl.load_workbook(file_path)
-            ws = wb.active
-            start_row = 16
-            ws.cell(
-                row=8,
-                column=19,
-                value=format_date(
-                    orders.last().get("day"), format="LLLL", locale="ru"
-                ).capitalize(),
-            )
-            ws.cell(row=10, column=19, value=orders.last().get("day").month)
-            ws.cell(row=13, column=19, value=orders.last().get("day").year)
-
-            for i, row_data in enumerate(orders):
-                # ws.cell(row=start_row + i, column=1, value=row_data.get('day').replace(tzinfo=None))
-                ws.cell(row=start_row + i, column=1, value=row_data.get("day"))
-                ws.cell(row=start_row + i, column=22, value=row_data.get("total_sum"))
-                ws.cell(row=start_row + i, column=28, value=row_data.get("order_count"))
-                ws.cell(row=start_row + i, column=30, value=row_data.get("line_count"))
-
-                ws.cell(row=start_row + i, column=6, value="-")
-                ws.cell(row=start_row + i, column=11, value="-")
-                ws.cell(row=start_row + i, column=17, value="-")
-
-                ws.cell(row=start_row + i, column=33, value="не применимо")
-
-            # Сохранение измененного файла
-            file_name = "site-report.xlsx"
-            wb.save(file_name)
-
-            # Отправка файла в ответе
-            with open(file_name, "rb") as file:
-                response = HttpResponse(
-                    file.read(),
-                    content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                )
-                response["Content-Disposition"] = f"attachment; filename={file_name}"
-                return response
+
+        # Файл собирается в памяти, без записи в рабочий каталог
+        file_name = "site-report.xlsx"
+        output = io.BytesIO()
+        self.build_workbook(orders).save(output)
+        response = HttpResponse(
+            output.getvalue(),
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        response["Content-Disposition"] = f"attachment; filename={file_name}"
+        return response
 
     def filename(self, **kwargs):
         return self.filename_template % (kwargs["start_date"], kwargs["end_date"])
@@ -89,8 +99,7 @@ class EvotorReportGenerator(ReportGenerator):
     description = "Отчет ТРЦ Планета"
     date_range_field_name = "day"
     queryset = (
-        Order._default_manager.prefetch_related("lines")
-        .filter(status=settings.SUCCESS_ORDER_STATUS)
+        Order._default_manager.filter(status=settings.SUCCESS_ORDER_STATUS)
         .annotate(
             day=TruncDate("date_placed"),
             line_quantity=Subquery(
@@ -0,0 +1,87 @@
+import logging
+
+from apps.evotor.api.cloud import EvatorCloud
+from apps.evotor.bulk import EvotorBulkStatusUpdater, EvotorProductBulkExporter
+from celery import shared_task
+from core.loading import get_model
+from django.conf import settings
+
+logger = logging.getLogger("apps.evotor")
+
+EvotorSnapshot = get_model("evotor", "EvotorSnapshot")
+Store = get_model("store", "Store")
+
+# Методы EvatorCloud, которыми загружается каждый тип снимка
+SNAPSHOT_LOADERS = {
+    EvotorSnapshot.STORES: "get_stores",
+    EvotorSnapshot.TERMINALS: "get_terminals",
+    EvotorSnapshot.STAFFS: "get_staffs",
+    EvotorSnapshot.GROUPS: "get_groups",
+    EvotorSnapshot.PRODUCTS: "get_primary_products",
+    EvotorSnapshot.ADDITIONALS: "get_additionals_products",
+}
+
+
+def refresh_evotor_snapshot(object_type, store_evotor_id=""):
+    """Загружает список объектов из Эвотор и сохраняет его снимок"""
+    loader = getattr(EvatorCloud(), SNAPSHOT_LOADERS[object_type])
+    data = loader(store_evotor_id) if store_evotor_id else loader()
+
+    snapshot, _ = EvotorSnapshot.objects.get_or_create(
+        object_type=object_type, store_evotor_id=store_evotor_id
+    )
+    if isinstance(data, dict) and data.get("error"):
+        # Оставляем последние корректные данные, сохраняем только ошибку
+        logger.error("Ошибка обновления снимка Эвотор %s: %s", object_type, data["error"])
+        snapshot.error = str(data["error"])
+        snapshot.save(update_fields=["error"])
+    else:
+        snapshot.data = data
+        snapshot.error = ""
+        snapshot.save()
+    return snapshot
+
+
+@shared_task
+def refresh_evotor_snapshot_task(object_type, store_evotor_id=""):
+    refresh_evotor_snapshot(object_type, store_evotor_id)
+
+
+@shared_task
+def refresh_evotor_snapshots_task():
+    """Периодически обновляет все сохраненные снимки Эвотор"""
+    snapshots = EvotorSnapshot.objects.values_list("object_type", "store_evotor_id")
+    for object_type, store_evotor_id in snapshots:
+        refresh_evotor_snapshot_task.delay(object_type, store_evotor_id)
+
+
+@shared_task
+def send_evotor_products_task(product_ids, store_evotor_id=None):
+    """
+    Отправляет товары в Эвотор массовыми задачами. Без store_evotor_id
+    товары выгружаются во все активные магазины Эвотор.
+    """
+    if store_evotor_id:
+        store_evotor_ids = [store_evotor_id]
+    else:
+        store_evotor_ids = Store.objects.filter(
+            evotor_id__isnull=False, is_active=True
+        ).values_list("evotor_id", flat=True)
+
+    for evotor_id in store_evotor_ids:
+        EvotorProductBulkExporter(evotor_id, product_ids).run()
+
+    if settings.CELERY:
+        update_evotor_bulks_task.apply_async(
+            countdown=settings.EVOTOR_BULK_POLL_INTERVAL
+        )
+
+
+@shared_task
+def update_evotor_bulks_task(attempt=1):
+    """Опрашивает статусы массовых задач, пока они не завершатся"""
+    running = EvotorBulkStatusUpdater().run()
+    if running and settings.CELERY and attempt < settings.EVOTOR_BULK_POLL_ATTEMPTS:
+        update_evotor_bulks_task.apply_async(
+            (attempt + 1,), countdown=settings.EVOTOR_BULK_POLL_INTERVAL
+        )
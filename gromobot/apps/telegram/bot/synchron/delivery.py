@@ -0,0 +1,132 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import (TelegramAPIError, TelegramNetworkError,
+                                TelegramRetryAfter)
+from bot_loader import BOT_DEFAULTS, create_session
+from django.conf import settings
+
+logger = logging.getLogger("apps.telegram")
+
+MESSAGE_LENGTH = 4096
+
+
+def split_text(text, length=MESSAGE_LENGTH):
+    return [text[i : i + length] for i in range(0, len(text), length)]
+
+
+class RateLimiter:
+    """
+    Spaces out requests so no more than *rate* of them start per second.
+    A flood control answer pauses every request of the bot.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.lock = asyncio.Lock()
+        self.next_at = 0
+        self.paused_until = 0
+
+    async def wait(self):
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            start = max(now, self.next_at, self.paused_until)
+            self.next_at = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def pause(self, seconds):
+        until = asyncio.get_running_loop().time() + seconds
+        self.paused_until = max(self.paused_until, until)
+
+
+class TelegramDelivery:
+    """
+    Sends one text to many chats concurrently through a single pooled bot
+    session.
+
+    Telegram allows about 30 messages per second per bot and one message
+    per second per chat, so requests are spaced out globally by
+    ``TELEGRAM_DELIVERY_RATE`` and the parts of a long message are sent to
+    a chat ``TELEGRAM_DELIVERY_CHAT_INTERVAL`` seconds apart. On
+    ``RetryAfter`` the whole bot waits the requested time and retries.
+    """
+
+    def __init__(
+        self,
+        bot_token,
+        concurrency=None,
+        rate=None,
+        chat_interval=None,
+        retries=None,
+    ):
+        self.bot_token = bot_token
+        self.concurrency = concurrency or settings.TELEGRAM_DELIVERY_CONCURRENCY
+        self.rate = rate or settings.TELEGRAM_DELIVERY_RATE
+        if chat_interval is None:
+            chat_interval = settings.TELEGRAM_DELIVERY_CHAT_INTERVAL
+        self.chat_interval = chat_interval
+        if retries is None:
+            retries = settings.TELEGRAM_DELIVERY_RETRIES
+        self.retries = retries
+
+    def send(self, chat_ids, text, **kwargs):
+        """
+        Send *text* to every chat of *chat_ids*. Returns a dict mapping chat
+        ids to ``(sent_parts, error)``, where *error* is the exception which
+        stopped the delivery to that chat or ``None``.
+        """
+        chat_ids = list(dict.fromkeys(chat_ids))
+        parts = split_text(text)
+        if not chat_ids or not parts:
+            return {}
+        return asyncio.run(self.deliver(chat_ids, parts, kwargs))
+
+    async def deliver(self, chat_ids, parts, kwargs):
+        # The session is bound to the running loop, so every delivery opens
+        # its own one instead of sharing the session of the polling bots
+        bot = Bot(
+            token=self.bot_token,
+            session=create_session(limit=self.concurrency),
+            default=BOT_DEFAULTS,
+        )
+        self.limiter = RateLimiter(self.rate)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            results = await asyncio.gather(
+                *(self.send_chat(bot, chat_id, parts, kwargs) for chat_id in chat_ids)
+            )
+        finally:
+            await bot.session.close()
+        return dict(zip(chat_ids, results))
+
+    async def send_chat(self, bot, chat_id, parts, kwargs):
+        sent = []
+        for part in parts:
+            if sent:
+                await asyncio.sleep(self.chat_interval)
+            try:
+                async with self.semaphore:
+                    await self.send_part(bot, chat_id, part, kwargs)
+            except TelegramAPIError as e:
+                logger.error(f"{e} при отправке телеграм сообщения в чат {chat_id}")
+                return sent, e
+            sent.append(part)
+        return sent, None
+
+    async def send_part(self, bot, chat_id, text, kwargs):
+        attempt = 0
+        while True:
+            await self.limiter.wait()
+            try:
+                return await bot.send_message(chat_id, text, **kwargs)
+            except TelegramRetryAfter as e:
+                if attempt >= self.retries:
+                    raise
+                self.limiter.pause(e.retry_after)
+            except TelegramNetworkError:
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(2**attempt)
+            attempt += 1
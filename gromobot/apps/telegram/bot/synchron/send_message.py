@@ -1,6 +1,4 @@
-import logging
-
-import requests
+from apps.telegram.bot.synchron.delivery import TelegramDelivery
 from core.loading import get_model
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -14,7 +12,19 @@ TelegramMessage = get_model("telegram", "TelegramMessage")
 STAFF_BOT = settings.TELEGRAM_STAFF_BOT_TOKEN
 CUSTOMER_BOT = settings.TELEGRAM_CUSTOMER_BOT_TOKEN
 
-logger = logging.getLogger("apps.telegram")
+
+def log_messages(results, users, type=TelegramMessage.MISC):
+    """
+    Save the delivered parts of *results* for the users of *users*, a dict
+    mapping chat ids to user ids, with one query.
+    """
+    messages = [
+        TelegramMessage(user_id=users[chat_id], type=type, message=part)
+        for chat_id, (sent, _) in results.items()
+        if users.get(chat_id)
+        for part in sent
+    ]
+    TelegramMessage.objects.bulk_create(messages)
 
 
 # Синхронная функция отправки сообщения через Telegram API
@@ -32,50 +42,18 @@ def send_message(
     :param bot_token: Токен бота Telegram
     :param chat_id: ID чата, в который отправляется сообщение
     :param text: Текст сообщения
-    :param kwargs: Дополнительные параметры, которые принимает sendMessage метод Telegram API
-    :return: Ответ от Telegram API
+    :param kwargs: Дополнительные параметры метода sendMessage
+    :return: Список отправленных частей сообщения
     """
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-
-    # Разделяем текст на части, если он превышает допустимую длину
-    messages = [text[i : i + 4096] for i in range(0, len(text), 4096)]
-
-    response_data = None
-    try:
-        for message_part in messages:
-            # Параметры запроса для каждого сообщения
-            payload = {
-                "chat_id": chat_id,
-                "text": message_part,
-                "parse_mode": "HTML",
-                **kwargs,
-            }
-
-            # Отправляем сообщение в Telegram API
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-
-            # Получаем JSON-ответ для каждой части сообщения
-            response_data = response.json()
-
-            if user is not None:
-                # Сохраняем сообщение в базу данных
-                TelegramMessage.objects.create(
-                    user=user,
-                    type=type,
-                    message=message_part,
-                )
-
-        return response_data
-
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(
-            f"Ошибка HTTP запроса при отправке телеграм сообщения синхроно: {http_err}"
-        )
-        raise Exception(f"HTTP error occurred: {http_err}")
-    except Exception as err:
-        logger.error(f"Ошибка при отправке телеграм сообщения синхроно: {err}")
-        raise Exception(f"An error occurred: {err}")
+    results = TelegramDelivery(bot_token).send([chat_id], text, **kwargs)
+    sent, error = results.get(chat_id, ([], None))
+
+    if user is not None:
+        log_messages(results, {chat_id: user.pk}, type)
+
+    if error is not None:
+        raise Exception(f"An error occurred: {error}")
+    return sent
 
 
 def send_message_to_staffs(
@@ -109,8 +87,16 @@ def send_message_to_staffs(
     if store_id:
         users = users.filter(Q(stores__id=store_id) | Q(is_superuser=True))
 
-    for user in users:
-        send_message(user.telegram_id, text, type, user, bot_token, **kwargs)
+    # Один пользователь может попасть в выборку несколько раз через магазины
+    chats = dict(
+        users.exclude(telegram_id="")
+        .order_by()
+        .distinct()
+        .values_list("telegram_id", "id")
+    )
+
+    results = TelegramDelivery(bot_token).send(chats, text, **kwargs)
+    log_messages(results, chats, type)
 
 
 def send_message_to_customer(
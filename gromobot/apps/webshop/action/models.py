@@ -1,8 +1,8 @@
 from functools import cached_property
 
 from core.models.fields import AutoSlugField
-from core.models.img.image_processor import ImageProcessor
 from core.models.img.missing_image import MissingImage
+from core.models.img.pipeline import ImagePipelineMixin
 from core.models.img.paths import (
     get_image_actions_upload_path,
     get_image_promocategory_upload_path,
@@ -13,7 +13,7 @@ from django.template.defaultfilters import striptags
 from django.urls import reverse
 
 
-class AbstractAction(models.Model):
+class AbstractAction(ImagePipelineMixin, models.Model):
     slug = AutoSlugField("Ярлык", max_length=128, unique=True, populate_from="title")
     title = models.CharField("Заголовок", max_length=128, blank=False, null=False)
     description = models.TextField("Описание", blank=True)
@@ -28,6 +28,8 @@ class AbstractAction(models.Model):
     )
     meta_description = models.TextField("Мета описание", blank=True, null=True)
 
+    image_fields = ("image",)
+
     class Meta:
         abstract = True
 
@@ -55,10 +57,6 @@ class AbstractAction(models.Model):
         return unique_slug
 
     def save(self, *args, **kwargs):
-        if hasattr(self, "image") and self.image:  # Добавлена проверка hasattr
-            processor = ImageProcessor()
-            optimized_image = processor.optimize_image(self.image)
-            self.image.save(optimized_image.name, optimized_image, save=False)
         super().save(*args, **kwargs)
 
         if not self.slug:
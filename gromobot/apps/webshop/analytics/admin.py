@@ -21,7 +21,22 @@ class UserRecordAdmin(admin.ModelAdmin):
     )
 
 
+class OrderRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "period_start",
+        "store",
+        "status",
+        "is_online",
+        "num_orders",
+        "num_lines",
+        "revenue",
+    )
+    list_filter = ("store", "is_online", "status")
+
+
 admin.site.register(get_model("analytics", "productrecord"), ProductRecordAdmin)
 admin.site.register(get_model("analytics", "userrecord"), UserRecordAdmin)
 admin.site.register(get_model("analytics", "usersearch"))
 admin.site.register(get_model("analytics", "userproductview"), UserProductViewAdmin)
+admin.site.register(get_model("analytics", "hourlyorderrollup"), OrderRollupAdmin)
+admin.site.register(get_model("analytics", "dailyorderrollup"), OrderRollupAdmin)
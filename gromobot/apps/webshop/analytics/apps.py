@@ -1,4 +1,5 @@
 from core.application import Config
+from django.db import connection
 
 
 class AnalyticsConfig(Config):
@@ -9,3 +10,43 @@ class AnalyticsConfig(Config):
     # pylint: disable=unused-import
     def ready(self):
         from . import receivers
+
+        self.register_periodic_tasks()
+
+    def register_periodic_tasks(self):
+        from celery import current_app
+        from django.conf import settings
+        from django_celery_beat.models import IntervalSchedule, PeriodicTask
+
+        if not current_app.loader:
+            return
+        try:
+            table_names = connection.introspection.table_names()
+            if (
+                "django_celery_beat_intervalschedule" in table_names
+                and "django_celery_beat_periodictask" in table_names
+            ):
+                schedule, created = IntervalSchedule.objects.get_or_create(
+                    every=settings.ORDER_ROLLUPS_REFRESH_INTERVAL,
+                    period=IntervalSchedule.MINUTES,
+                )
+                PeriodicTask.objects.get_or_create(
+                    name="Пересчитать статистику заказов за последние часы",
+                    defaults={
+                        "interval": schedule,
+                        "task": "apps.webshop.analytics.tasks.refresh_recent_order_rollups_task",
+                    },
+                )
+                schedule, created = IntervalSchedule.objects.get_or_create(
+                    every=settings.ANALYTICS_FLUSH_INTERVAL,
+                    period=IntervalSchedule.MINUTES,
+                )
+                PeriodicTask.objects.get_or_create(
+                    name="Сохранить счетчики аналитики",
+                    defaults={
+                        "interval": schedule,
+                        "task": "apps.webshop.analytics.tasks.flush_analytics_counters_task",
+                    },
+                )
+        except Exception as e:
+            print("Ошибка при проверке базы данных:", e)
@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import redis
+from core.loading import get_model
+from django.conf import settings
+from django.db import connection, transaction
+
+ProductRecord = get_model("analytics", "ProductRecord")
+UserRecord = get_model("analytics", "UserRecord")
+
+logger = logging.getLogger("apps.webshop.analytics")
+
+_client = None
+
+
+def get_redis():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.ANALYTICS_REDIS_URL)
+    return _client
+
+
+class CounterBuffer:
+    """
+    Buffer of analytics counter increments.
+
+    Views and basket additions only increment a counter in Redis, or in an
+    in-process buffer when Celery isn't used, instead of writing a record
+    each time. The buffer is flushed periodically by the same task with or
+    without Celery: the deltas of every record are written with one
+    ``INSERT ... ON CONFLICT DO UPDATE`` per model, so a missing record is
+    created without a race, and the product scores are recalculated.
+    """
+
+    models = {
+        "ProductRecord": (ProductRecord, "product"),
+        "UserRecord": (UserRecord, "user"),
+    }
+    key_prefix = "analytics_counters_"
+    # Rows per INSERT, keeps the number of query parameters in bounds
+    batch_size = 500
+
+    _local = defaultdict(int)
+    _local_flushed = time.monotonic()
+    _lock = threading.Lock()
+
+    def __init__(self, use_redis=None):
+        self.use_redis = settings.CELERY if use_redis is None else use_redis
+
+    # Buffering
+
+    def incr(self, model_name, object_id, field_name, increment=1):
+        self.incr_many([(model_name, object_id, field_name, increment)])
+
+    def incr_many(self, increments):
+        """
+        Add *increments*, a list of (model name, object id, field name,
+        increment) tuples, to the buffer.
+        """
+        increments = [item for item in increments if item[1] and item[3]]
+        if not increments:
+            return
+        if self.use_redis:
+            try:
+                pipe = get_redis().pipeline(transaction=False)
+                for model_name, object_id, field_name, increment in increments:
+                    pipe.hincrby(
+                        self.key_prefix + model_name,
+                        f"{object_id}:{field_name}",
+                        increment,
+                    )
+                pipe.execute()
+            except redis.RedisError as e:
+                logger.error(f"{e} при записи счетчиков аналитики")
+            return
+
+        with self._lock:
+            for model_name, object_id, field_name, increment in increments:
+                self._local[model_name, object_id, field_name] += increment
+            due = (
+                time.monotonic() - CounterBuffer._local_flushed
+                >= settings.ANALYTICS_FLUSH_INTERVAL * 60
+            )
+        if due:
+            # The task also recalculates the scores of the products
+            from apps.webshop.analytics.tasks import flush_analytics_counters_task
+
+            flush_analytics_counters_task()
+
+    # Flushing
+
+    def pop(self):
+        """
+        Take the buffered deltas out of the buffer as a dict mapping model
+        names to ``{object_id: {field_name: delta}}``.
+        """
+        deltas = defaultdict(lambda: defaultdict(dict))
+        if not self.use_redis:
+            with self._lock:
+                items = list(self._local.items())
+                self._local.clear()
+                CounterBuffer._local_flushed = time.monotonic()
+            for (model_name, object_id, field_name), delta in items:
+                deltas[model_name][object_id][field_name] = delta
+            return deltas
+
+        client = get_redis()
+        for model_name in self.models:
+            key = self.key_prefix + model_name
+            # Increments made during the flush go to a fresh hash
+            flushing = f"{key}_{uuid.uuid4().hex}"
+            try:
+                client.rename(key, flushing)
+            except redis.ResponseError:
+                continue
+            pipe = client.pipeline()
+            pipe.hgetall(flushing)
+            pipe.delete(flushing)
+            values, _ = pipe.execute()
+            for field, delta in values.items():
+                object_id, field_name = field.decode().split(":", 1)
+                deltas[model_name][int(object_id)][field_name] = int(delta)
+        return deltas
+
+    def restore(self, deltas):
+        """Put deltas back into the buffer after a failed flush"""
+        self.incr_many(
+            [
+                (model_name, object_id, field_name, delta)
+                for model_name, rows in deltas.items()
+                for object_id, fields in rows.items()
+                for field_name, delta in fields.items()
+            ]
+        )
+
+    def flush(self):
+        """
+        Write the buffered deltas to the records. Returns a dict mapping
+        model names to the number of written records.
+        """
+        deltas = self.pop()
+        written = {}
+        try:
+            with transaction.atomic():
+                for model_name, rows in deltas.items():
+                    written[model_name] = self.upsert(model_name, rows)
+        except Exception:
+            self.restore(deltas)
+            raise
+        return written
+
+    def upsert(self, model_name, rows):
+        model, fk_name = self.models[model_name]
+        fk = model._meta.get_field(fk_name)
+
+        # Objects deleted since the increment would break the whole insert
+        existing = set(
+            fk.related_model._default_manager.filter(pk__in=rows).values_list(
+                "pk", flat=True
+            )
+        )
+        rows = {pk: fields for pk, fields in rows.items() if pk in existing}
+        if not rows:
+            return 0
+
+        counters = sorted({name for fields in rows.values() for name in fields})
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if not field.primary_key and field is not fk
+        ]
+        defaults = {
+            field.name: field.get_db_prep_save(field.get_default(), connection)
+            for field in fields
+        }
+
+        qn = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        columns = ", ".join(qn(f.column) for f in [fk] + fields)
+        updates = ", ".join(
+            "{col} = {table}.{col} + EXCLUDED.{col}".format(
+                col=qn(model._meta.get_field(name).column), table=table
+            )
+            for name in counters
+        )
+        placeholders = "(%s)" % ", ".join(["%s"] * (len(fields) + 1))
+
+        items = list(rows.items())
+        with connection.cursor() as cursor:
+            for i in range(0, len(items), self.batch_size):
+                batch = items[i : i + self.batch_size]
+                params = []
+                for pk, deltas in batch:
+                    params.append(pk)
+                    params.extend(
+                        deltas.get(field.name, 0)
+                        if field.name in counters
+                        else defaults[field.name]
+                        for field in fields
+                    )
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) "
+                    f"VALUES {', '.join([placeholders] * len(batch))} "
+                    f"ON CONFLICT ({qn(fk.column)}) DO UPDATE SET {updates}",
+                    params,
+                )
+        return len(rows)
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_initial'),
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyOrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateTimeField(db_index=True, verbose_name='Начало периода')),
+                ('status', models.CharField(blank=True, default='', max_length=100, verbose_name='Статус')),
+                ('is_online', models.BooleanField(default=True, verbose_name='Онлайн заказы')),
+                ('num_orders', models.PositiveIntegerField(default=0, verbose_name='Заказы')),
+                ('num_discount_orders', models.PositiveIntegerField(default=0, verbose_name='Заказы со скидкой')),
+                ('num_lines', models.PositiveIntegerField(default=0, verbose_name='Позиции')),
+                ('num_discount_lines', models.PositiveIntegerField(default=0, verbose_name='Позиции со скидкой')),
+                ('num_items', models.PositiveIntegerField(default=0, verbose_name='Товары')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Выручка')),
+                ('revenue_before_discounts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Выручка без скидок')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='store.store', verbose_name='Магазин')),
+            ],
+            options={
+                'verbose_name': 'Дневная статистика заказов',
+                'verbose_name_plural': 'Дневная статистика заказов',
+                'ordering': ['-period_start'],
+                'abstract': False,
+                'constraints': [
+                    models.UniqueConstraint(fields=('period_start', 'store', 'status', 'is_online'), name='analytics_dailyorderrollup_bucket'),
+                    models.UniqueConstraint(condition=models.Q(('store__isnull', True)), fields=('period_start', 'status', 'is_online'), name='analytics_dailyorderrollup_bucket_no_store'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyOrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateTimeField(db_index=True, verbose_name='Начало периода')),
+                ('status', models.CharField(blank=True, default='', max_length=100, verbose_name='Статус')),
+                ('is_online', models.BooleanField(default=True, verbose_name='Онлайн заказы')),
+                ('num_orders', models.PositiveIntegerField(default=0, verbose_name='Заказы')),
+                ('num_discount_orders', models.PositiveIntegerField(default=0, verbose_name='Заказы со скидкой')),
+                ('num_lines', models.PositiveIntegerField(default=0, verbose_name='Позиции')),
+                ('num_discount_lines', models.PositiveIntegerField(default=0, verbose_name='Позиции со скидкой')),
+                ('num_items', models.PositiveIntegerField(default=0, verbose_name='Товары')),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Выручка')),
+                ('revenue_before_discounts', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Выручка без скидок')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='store.store', verbose_name='Магазин')),
+            ],
+            options={
+                'verbose_name': 'Почасовая статистика заказов',
+                'verbose_name_plural': 'Почасовая статистика заказов',
+                'ordering': ['-period_start'],
+                'abstract': False,
+                'constraints': [
+                    models.UniqueConstraint(fields=('period_start', 'store', 'status', 'is_online'), name='analytics_hourlyorderrollup_bucket'),
+                    models.UniqueConstraint(condition=models.Q(('store__isnull', True)), fields=('period_start', 'status', 'is_online'), name='analytics_hourlyorderrollup_bucket_no_store'),
+                ],
+            },
+        ),
+    ]
@@ -113,3 +113,65 @@ class UserSearch(models.Model):
             "user": self.user,
             "query": self.query,
         }
+
+
+class AbstractOrderRollup(models.Model):
+    """
+    Pre-aggregated order counters for one period.
+
+    Rows are keyed by period start, store, order status and channel, so
+    dashboards can sum any window with a single query instead of scanning
+    orders and lines.
+    """
+
+    period_start = models.DateTimeField("Начало периода", db_index=True)
+    store = models.ForeignKey(
+        "store.Store",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        verbose_name="Магазин",
+    )
+    status = models.CharField("Статус", max_length=100, blank=True, default="")
+    is_online = models.BooleanField("Онлайн заказы", default=True)
+
+    num_orders = models.PositiveIntegerField("Заказы", default=0)
+    num_discount_orders = models.PositiveIntegerField("Заказы со скидкой", default=0)
+    num_lines = models.PositiveIntegerField("Позиции", default=0)
+    num_discount_lines = models.PositiveIntegerField("Позиции со скидкой", default=0)
+    num_items = models.PositiveIntegerField("Товары", default=0)
+    revenue = models.DecimalField(
+        "Выручка", decimal_places=2, max_digits=14, default=Decimal("0.00")
+    )
+    revenue_before_discounts = models.DecimalField(
+        "Выручка без скидок", decimal_places=2, max_digits=14, default=Decimal("0.00")
+    )
+
+    class Meta:
+        abstract = True
+        app_label = "analytics"
+        ordering = ["-period_start"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period_start", "store", "status", "is_online"],
+                name="%(app_label)s_%(class)s_bucket",
+            ),
+            # NULLs are distinct in unique constraints
+            models.UniqueConstraint(
+                fields=["period_start", "status", "is_online"],
+                condition=models.Q(store__isnull=True),
+                name="%(app_label)s_%(class)s_bucket_no_store",
+            ),
+        ]
+
+
+class HourlyOrderRollup(AbstractOrderRollup):
+    class Meta(AbstractOrderRollup.Meta):
+        verbose_name = "Почасовая статистика заказов"
+        verbose_name_plural = "Почасовая статистика заказов"
+
+
+class DailyOrderRollup(AbstractOrderRollup):
+    class Meta(AbstractOrderRollup.Meta):
+        verbose_name = "Дневная статистика заказов"
+        verbose_name_plural = "Дневная статистика заказов"
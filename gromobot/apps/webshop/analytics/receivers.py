@@ -1,40 +1,38 @@
 from apps.webshop.analytics.tasks import (
-    record_products_in_order_task,
     record_user_order_task,
-    update_counter_task,
+    refresh_order_rollups_task,
     user_searched_product_task,
     user_viewed_product_task,
 )
 from apps.webshop.basket.signals import basket_addition
 from apps.webshop.catalogue.signals import product_viewed
-from apps.webshop.order.signals import order_placed
+from apps.webshop.order.signals import (bulk_order_status_changed, order_placed,
+                                        order_status_changed)
 from apps.webshop.search.signals import user_search
+from core.loading import get_class, get_model
 from django.conf import settings
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models.signals import post_delete
 from django.dispatch import receiver
 
+Order = get_model("order", "Order")
+CounterBuffer = get_class("webshop.analytics.buffer", "CounterBuffer")
+OrderRollups = get_class("webshop.analytics.rollups", "OrderRollups")
+
 
 # pylint: disable=unused-argument
 @receiver(product_viewed)
 def receive_product_view(sender, product, user, **kwargs):
     if kwargs.get("raw", False):
         return
-    if settings.CELERY:
-        update_counter_task.delay(
-            "ProductRecord", "num_views", {"product_id": product.id}
-        )
-    else:
-        update_counter_task("ProductRecord", "num_views", {"product_id": product.id})
-
+    increments = [("ProductRecord", product.id, "num_views", 1)]
     if user and user.is_authenticated:
+        increments.append(("UserRecord", user.id, "num_product_views", 1))
         if settings.CELERY:
-            update_counter_task.delay(
-                "UserRecord", "num_product_views", {"user_id": user.id}
-            )
             user_viewed_product_task.delay(product.id, user.id)
         else:
-            update_counter_task("UserRecord", "num_product_views", {"user_id": user.id})
             user_viewed_product_task(product.id, user.id)
+    CounterBuffer().incr_many(increments)
 
 
 # pylint: disable=unused-argument
@@ -52,24 +50,10 @@ def receive_product_search(sender, query, user, **kwargs):
 def receive_basket_addition(sender, product, user, **kwargs):
     if kwargs.get("raw", False):
         return
-    if settings.CELERY:
-        update_counter_task.delay(
-            "ProductRecord", "num_basket_additions", {"product_id": product.id}
-        )
-    else:
-        update_counter_task(
-            "ProductRecord", "num_basket_additions", {"product_id": product.id}
-        )
-
+    increments = [("ProductRecord", product.id, "num_basket_additions", 1)]
     if user and user.is_authenticated:
-        if settings.CELERY:
-            update_counter_task.delay(
-                "UserRecord", "num_basket_additions", {"user_id": user.id}
-            )
-        else:
-            update_counter_task(
-                "UserRecord", "num_basket_additions", {"user_id": user.id}
-            )
+        increments.append(("UserRecord", user.id, "num_basket_additions", 1))
+    CounterBuffer().incr_many(increments)
 
 
 @receiver(order_placed)
@@ -77,21 +61,66 @@ def receive_order_placed(sender, order, user, **kwargs):
     if kwargs.get("raw", False):
         return
 
-    order_data = {
-        "total": order.total,
-        "date_placed": order.date_placed,
-        "num_lines": order.lines.count(),
-        "lines": list(order.lines.values_list("product_id", "quantity")),
-        "num_items": order.lines.aggregate(total_items=Sum("quantity"))["total_items"],
-    }
-
-    if settings.CELERY:
-        record_products_in_order_task.delay(order_data)
-    else:
-        record_products_in_order_task(order_data)
+    lines = list(order.lines.values_list("product_id", "quantity"))
+    CounterBuffer().incr_many(
+        [
+            ("ProductRecord", product_id, "num_purchases", quantity)
+            for product_id, quantity in lines
+        ]
+    )
 
     if user and user.is_authenticated:
+        order_data = {
+            "total": order.total,
+            "date_placed": order.date_placed,
+            "num_lines": len(lines),
+            "num_items": sum(quantity for _, quantity in lines),
+        }
         if settings.CELERY:
             record_user_order_task.delay(user.id, order_data)
         else:
             record_user_order_task(user.id, order_data)
+
+
+def refresh_order_rollups(order):
+    """
+    Recompute the rollup buckets of the order once the transaction commits.
+    """
+    args = (order.store_id, order.date_placed.isoformat())
+
+    def refresh():
+        if settings.CELERY:
+            refresh_order_rollups_task.delay(*args)
+        else:
+            refresh_order_rollups_task(*args)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(order_placed)
+def receive_order_placed_rollups(sender, order, **kwargs):
+    if kwargs.get("raw", False):
+        return
+    refresh_order_rollups(order)
+
+
+@receiver(order_status_changed)
+def receive_order_status_changed(sender, order, **kwargs):
+    refresh_order_rollups(order)
+
+
+@receiver(bulk_order_status_changed)
+def receive_bulk_order_status_changed(sender, orders, **kwargs):
+    # One refresh per store and hour is enough for the whole batch
+    buckets = {}
+    for order in orders:
+        hour = OrderRollups.truncate(order.date_placed, "hour")
+        buckets.setdefault((order.store_id, hour), order)
+    for order in buckets.values():
+        refresh_order_rollups(order)
+
+
+@receiver(post_delete, sender=Order)
+def receive_order_deleted(sender, instance, **kwargs):
+    if instance.date_placed:
+        refresh_order_rollups(instance)
@@ -33,7 +33,7 @@ class ProductReportHTMLFormatter(ReportHTMLFormatter):
 class ProductReportGenerator(ReportGenerator):
     code = "product_analytics"
     description = "Аналитика товара"
-    model_class = ProductRecord
+    queryset = ProductRecord._default_manager.select_related("product")
 
     formatters = {
         "CSV_formatter": ProductReportCSVFormatter,
@@ -0,0 +1,248 @@
+import datetime
+import zlib
+from decimal import Decimal as D
+
+from core.loading import get_model
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (BooleanField, Case, Count, Exists, F, OuterRef, Q,
+                              Sum, Value, When)
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+Order = get_model("order", "Order")
+Line = get_model("order", "Line")
+HourlyOrderRollup = get_model("analytics", "HourlyOrderRollup")
+DailyOrderRollup = get_model("analytics", "DailyOrderRollup")
+
+COUNTERS = (
+    "num_orders",
+    "num_discount_orders",
+    "num_lines",
+    "num_discount_lines",
+    "num_items",
+    "revenue",
+    "revenue_before_discounts",
+)
+
+
+def online_case(prefix=""):
+    return Case(
+        When(**{f"{prefix}site__in": settings.OFFLINE_ORDERS}, then=Value(False)),
+        default=Value(True),
+        output_field=BooleanField(),
+    )
+
+
+def sum_rows(rows, start=None, end=None, **lookups):
+    """
+    Sum rollup counters of *rows* whose ``period_start`` falls into
+    [start, end) and whose values match *lookups*.
+    """
+    totals = {name: 0 for name in COUNTERS}
+    totals["revenue"] = totals["revenue_before_discounts"] = D("0.00")
+    for row in rows:
+        if start is not None and row["period_start"] < start:
+            continue
+        if end is not None and row["period_start"] >= end:
+            continue
+        if any(row[key] != value for key, value in lookups.items()):
+            continue
+        for name in COUNTERS:
+            totals[name] += row[name] or 0
+    return totals
+
+
+def average(revenue, num_orders):
+    if not num_orders:
+        return D("0.00")
+    return (revenue / num_orders).quantize(D("0.01"))
+
+
+class OrderRollups:
+    """
+    Hourly and daily order rollups.
+
+    A bucket is always recomputed from the orders table, so a refresh is
+    idempotent and can be repeated after any late change: a status update,
+    an Evotor sync or a corrected order. Rebuilds of a period are
+    serialized with a transaction level lock and aggregate inside it, so
+    concurrent refreshes never both insert the same bucket.
+    """
+
+    periods = {
+        "hour": (HourlyOrderRollup, TruncHour, datetime.timedelta(hours=1)),
+        "day": (DailyOrderRollup, TruncDay, datetime.timedelta(days=1)),
+    }
+
+    @staticmethod
+    def truncate(value, period):
+        value = timezone.localtime(value).replace(minute=0, second=0, microsecond=0)
+        if period == "day":
+            value = value.replace(hour=0)
+        return value
+
+    @staticmethod
+    def store_filter(store_ids, field="store"):
+        store_ids = set(store_ids)
+        query = Q(**{f"{field}_id__in": [pk for pk in store_ids if pk is not None]})
+        if None in store_ids:
+            query |= Q(**{f"{field}__isnull": True})
+        return query
+
+    # Writing
+
+    def refresh(self, timestamp, store_id=None):
+        """
+        Recompute the hourly and daily buckets of one store containing
+        *timestamp*.
+        """
+        for period, (_, _, delta) in self.periods.items():
+            start = self.truncate(timestamp, period)
+            self.rebuild(period, start, start + delta, store_ids=[store_id])
+
+    def refresh_recent(self, hours):
+        """
+        Recompute the buckets of all stores for the last *hours*. This picks
+        up orders which are created without the ``order_placed`` signal,
+        e.g. orders synced from Evotor.
+        """
+        since = timezone.now() - datetime.timedelta(hours=hours)
+        for period in self.periods:
+            self.rebuild(period, self.truncate(since, period))
+
+    def rebuild(self, period, start=None, end=None, store_ids=None):
+        """
+        Replace the rollup rows of *period* in [start, end) with fresh
+        aggregates. Returns the number of created rows.
+        """
+        model, trunc, _ = self.periods[period]
+        orders = Order.objects.all()
+        existing = model.objects.all()
+        if start is not None:
+            orders = orders.filter(date_placed__gte=start)
+            existing = existing.filter(period_start__gte=start)
+        if end is not None:
+            orders = orders.filter(date_placed__lt=end)
+            existing = existing.filter(period_start__lt=end)
+        if store_ids is not None:
+            orders = orders.filter(self.store_filter(store_ids))
+            existing = existing.filter(self.store_filter(store_ids))
+
+        with transaction.atomic():
+            self.lock(model)
+            rows = self.aggregate(orders, trunc)
+            existing.delete()
+            model.objects.bulk_create([model(**row) for row in rows], batch_size=1000)
+        return len(rows)
+
+    @staticmethod
+    def lock(model):
+        """
+        Hold a lock on the rollups of *model* until the transaction ends.
+        Other databases (SQLite in development) serialize writers anyway.
+        """
+        if connection.vendor != "postgresql":
+            return
+        key = zlib.crc32(model._meta.db_table.encode())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+
+    def aggregate(self, orders, trunc):
+        tzinfo = timezone.get_current_timezone()
+        discount_lines = Line.objects.filter(order=OuterRef("pk")).exclude(
+            line_price_before_discounts=F("line_price")
+        )
+        order_rows = (
+            orders.order_by()
+            .annotate(
+                period_start=trunc("date_placed", tzinfo=tzinfo),
+                online=online_case(),
+                has_discount=Exists(discount_lines),
+            )
+            .values("period_start", "store_id", "status", "online")
+            .annotate(
+                num_orders=Count("id"),
+                num_discount_orders=Count("id", filter=Q(has_discount=True)),
+                revenue=Sum("total"),
+            )
+        )
+        line_rows = (
+            Line.objects.filter(order__in=orders.values("pk"))
+            .order_by()
+            .annotate(
+                period_start=trunc("order__date_placed", tzinfo=tzinfo),
+                order_store_id=F("order__store_id"),
+                order_status=F("order__status"),
+                online=online_case("order__"),
+            )
+            .values("period_start", "order_store_id", "order_status", "online")
+            .annotate(
+                num_lines=Count("id"),
+                num_discount_lines=Count(
+                    "id", filter=~Q(line_price_before_discounts=F("line_price"))
+                ),
+                num_items=Sum("quantity"),
+                revenue_before_discounts=Sum("line_price_before_discounts"),
+            )
+        )
+
+        rows = {}
+        for row in order_rows:
+            key = (row["period_start"], row["store_id"], row["status"], row["online"])
+            rows[key] = {
+                "num_orders": row["num_orders"],
+                "num_discount_orders": row["num_discount_orders"],
+                "revenue": row["revenue"] or D("0.00"),
+            }
+        for row in line_rows:
+            key = (
+                row["period_start"],
+                row["order_store_id"],
+                row["order_status"],
+                row["online"],
+            )
+            rows.setdefault(key, {}).update(
+                num_lines=row["num_lines"],
+                num_discount_lines=row["num_discount_lines"],
+                num_items=row["num_items"] or 0,
+                revenue_before_discounts=row["revenue_before_discounts"] or D("0.00"),
+            )
+
+        return [
+            dict(
+                period_start=period_start,
+                store_id=store_id,
+                status=status or "",
+                is_online=online,
+                **counters,
+            )
+            for (period_start, store_id, status, online), counters in rows.items()
+        ]
+
+    # Reading
+
+    def get_queryset(self, period, stores=None, start=None, end=None, **filters):
+        """
+        Rollup rows of *period*, limited to *stores* unless it is ``None``.
+        """
+        model = self.periods[period][0]
+        queryset = model.objects.filter(**filters)
+        if stores is not None:
+            queryset = queryset.filter(store__in=stores)
+        if start is not None:
+            queryset = queryset.filter(period_start__gte=start)
+        if end is not None:
+            queryset = queryset.filter(period_start__lt=end)
+        return queryset
+
+    def get_rows(self, period, *group_by, **kwargs):
+        """
+        Counter sums grouped by *group_by* as a list of dicts.
+        """
+        return list(
+            self.get_queryset(period, **kwargs)
+            .order_by(*group_by)
+            .values(*group_by)
+            .annotate(**{name: Sum(name) for name in COUNTERS})
+        )
@@ -2,10 +2,10 @@ import logging
 
 from celery import shared_task
 from core.compat import get_user_model
-from core.loading import get_model
-from django.apps import apps
+from core.loading import get_class, get_model
 from django.conf import settings
 from django.db.models import F
+from django.utils.dateparse import parse_datetime
 
 ProductRecord = get_model("analytics", "ProductRecord")
 UserProductView = get_model("analytics", "UserProductView")
@@ -14,60 +14,25 @@ UserSearch = get_model("analytics", "UserSearch")
 Order = get_model("order", "Order")
 Product = get_model("catalogue", "Product")
 User = get_user_model()
+OrderRollups = get_class("webshop.analytics.rollups", "OrderRollups")
+CounterBuffer = get_class("webshop.analytics.buffer", "CounterBuffer")
+Calculator = get_class("webshop.analytics.scores", "Calculator")
 
 logger = logging.getLogger("apps.webshop.analytics")
 
 
 @shared_task
-def update_counter_task(model_name, field_name, filter_kwargs, increment=1):
+def flush_analytics_counters_task():
     """
-    Обновляет счетчик в модели. Если записи нет — создает новую.
-
-    Efficiently updates a counter field by a given increment. Uses Django's
-    update() call to fetch and update in one query.
-
-    TODO: This has a race condition, we should use UPSERT here
-
-    :param model: The model class of the recording model
-    :param field_name: The name of the field to update
-    :param filter_kwargs: Parameters to the ORM's filter() function to get the
-    correct instance
+    Сохраняет накопленные счетчики просмотров, добавлений в корзину и
+    покупок и пересчитывает рейтинг товаров.
     """
     try:
-        model = apps.get_model("analytics", model_name)
-        record = model.objects.filter(**filter_kwargs)
-        affected = record.update(**{field_name: F(field_name) + increment})
-        if not affected:
-            filter_kwargs[field_name] = increment
-            model.objects.create(**filter_kwargs)
+        written = CounterBuffer().flush()
+        if written.get("ProductRecord"):
+            Calculator(logger).calculate_scores()
     except Exception as e:
-        logger.error(f"{e} update_counter_task при обновлении {model_name}")
-
-
-@shared_task
-def record_products_in_order_task(order_data):
-    """
-    Записывает данные о товарах в заказе.
-    """
-    try:
-        updates = [
-            update_counter_task.s(
-                "ProductRecord",
-                "num_purchases",
-                {"product_id": product_id},
-                line_quantity,
-            )
-            for product_id, line_quantity in order_data["lines"]
-        ]
-        for task in updates:
-            if settings.CELERY:
-                task.delay()
-            else:
-                task()
-    except Exception as e:
-        logger.error(
-            f"{e} при записи продуктов в заказе пользователя (date_placed={order_data['date_placed']})"
-        )
+        logger.error(f"{e} при сохранении счетчиков аналитики")
 
 
 @shared_task
@@ -121,3 +86,27 @@ def user_searched_product_task(user_id, query):
         logger.error(
             f"Ошибка user_searched_product_task при записи заказа пользователя {e}"
         )
+
+
+@shared_task
+def refresh_order_rollups_task(store_id, timestamp):
+    """
+    Пересчитывает почасовую и дневную статистику заказов магазина.
+    """
+    try:
+        OrderRollups().refresh(parse_datetime(timestamp), store_id)
+    except Exception as e:
+        logger.error(
+            f"{e} при пересчете статистики заказов (store_id={store_id}, {timestamp})"
+        )
+
+
+@shared_task
+def refresh_recent_order_rollups_task(hours=None):
+    """
+    Пересчитывает статистику заказов всех магазинов за последние часы.
+    """
+    try:
+        OrderRollups().refresh_recent(hours or settings.ORDER_ROLLUPS_REFRESH_HOURS)
+    except Exception as e:
+        logger.error(f"{e} при пересчете статистики заказов за последние часы")
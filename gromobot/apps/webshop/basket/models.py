@@ -11,7 +11,7 @@ from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from django.db.models import Exists, OuterRef, Q, Sum
+from django.db.models import Count, Exists, OuterRef, Q, Sum
 from django.utils.encoding import smart_str
 from django.utils.functional import cached_property
 from django.utils.timezone import now
@@ -22,7 +22,8 @@ StockRequired = get_class("webshop.store.availability", "StockRequired")
 LineDiscountRegistry = get_class("webshop.basket.utils", "LineDiscountRegistry")
 OpenBasketManager = get_class("webshop.basket.managers", "OpenBasketManager")
 
-Store = get_model("store", "Store")
+StoreRegistry = get_class("webshop.store.registry", "StoreRegistry")
+
 StockRecord = get_model("store", "StockRecord")
 
 
@@ -103,6 +104,7 @@ class Basket(models.Model):
         # information.
         self._lines = None
         self._filtered_lines = None
+        self._line_quantities = None
         self.offer_applications = OfferApplications()
 
     def __str__(self):
@@ -142,32 +144,81 @@ class Basket(models.Model):
         if self.id is None:
             return self.lines.model.objects.none()  # pylint: disable=E1101
         if self._lines is None:
+            # Prices and stock come from the strategy's stock snapshot, so
+            # only the line's product rows and images are loaded here
             self._lines = (
-                self.lines.select_related("product", "stockrecord")
-                .prefetch_related(
-                    "attributes",
-                    "product__images",
-                    "product__categories",
-                    "product__stockrecords",
-                )
-                .annotate(
-                    has_stockrecord=Exists(
-                        StockRecord.objects.filter(
-                            product=OuterRef("product_id")
-                        ).filter(Q(store_id=self.store_id) if self.store_id else Q())
-                    )
+                self._annotated_lines()
+                .select_related(
+                    "product",
+                    "product__product_class",
+                    "product__parent",
+                    "product__parent__product_class",
+                    "stockrecord",
                 )
+                .prefetch_related("attributes", "product__images")
                 .order_by(self._meta.pk.name)
             )
         return self._lines
 
+    def _annotated_lines(self):
+        return self.lines.annotate(
+            has_stockrecord=Exists(
+                StockRecord.objects.filter(product=OuterRef("product_id")).filter(
+                    Q(store_id=self.store_id) if self.store_id else Q()
+                )
+            )
+        )
+
     def all_lines(self):
         if self._filtered_lines is None:
             self._filtered_lines = [
                 line for line in self._all_lines() if line.has_stockrecord
             ]
+            if self._filtered_lines and self.has_strategy:
+                # Load purchase info of all lines at once
+                self.strategy.fetch_for_products(
+                    [line.product for line in self._filtered_lines]
+                )
         return self._filtered_lines
 
+    def get_summary(self):
+        """
+        Return the number of lines and items of the basket with a single
+        aggregate query. This is all the header mini-basket needs, so pages
+        don't have to load lines and apply offers just to render it.
+        """
+        if self.id is None:
+            return {"num_lines": 0, "num_items": 0}
+        if self._filtered_lines is not None:
+            return {"num_lines": self.num_lines, "num_items": self.num_items}
+        summary = (
+            self._annotated_lines()
+            .filter(has_stockrecord=True)
+            .aggregate(num_lines=Count("id"), num_items=Sum("quantity"))
+        )
+        return {
+            "num_lines": summary["num_lines"],
+            "num_items": summary["num_items"] or 0,
+        }
+
+    def line_quantities(self):
+        """
+        Return a dict of line quantities summed up per (product id,
+        stockrecord id), loaded with one grouped query and cached until the
+        lines change.
+        """
+        if self._line_quantities is None:
+            self._line_quantities = {}
+            if self.id:
+                rows = (
+                    self.lines.order_by()
+                    .values_list("product_id", "stockrecord_id")
+                    .annotate(quantity=Sum("quantity"))
+                )
+                for product_id, stockrecord_id, quantity in rows:
+                    self._line_quantities[(product_id, stockrecord_id)] = quantity
+        return self._line_quantities
+
     def max_allowed_quantity(self):
         """
         Returns maximum product quantity, that can be added to the basket
@@ -224,9 +275,11 @@ class Basket(models.Model):
         The basket can contain multiple lines with the same product and
         stockrecord, but different options. Those quantities are summed up.
         """
-        matching_lines = self.lines.filter(stockrecord_id=line.stockrecord_id)
-        quantity = matching_lines.aggregate(Sum("quantity"))["quantity__sum"]
-        return quantity or 0
+        return sum(
+            quantity
+            for (_, stockrecord_id), quantity in self.line_quantities().items()
+            if stockrecord_id == line.stockrecord_id
+        )
 
     # ============
     # Manipulation
@@ -241,6 +294,7 @@ class Basket(models.Model):
         self.lines.all().delete()
         self._lines = None
         self._filtered_lines = None
+        self._line_quantities = None
 
     # pylint: disable=unused-argument
     def get_stock_info(self, product, options, additionals):
@@ -255,14 +309,12 @@ class Basket(models.Model):
         if not self.store_id or self.is_empty:
             self.store_id = line.stockrecord.store_id
             self.save()
-        else:
-            store = Store.objects.get(store_id=self.store_id)
-            line_store = Store.objects.get(store_id=line.stockrecord.store_id)
-
-            if line_store.store_id != self.store_id:
-                raise ValueError(
-                    f"Данный товар не доступен в {store.primary_address}, закажите его в {line_store.primary_address}"
-                )
+        elif line.stockrecord.store_id != self.store_id:
+            store = StoreRegistry.get(self.store_id)
+            line_store = StoreRegistry.get(line.stockrecord.store_id)
+            raise ValueError(
+                f"Данный товар не доступен в {store.primary_address}, закажите его в {line_store.primary_address}"
+            )
 
     def add_product(self, product, quantity=1, options=None, additionals=None):
         """
@@ -394,6 +446,7 @@ class Basket(models.Model):
         self.offer_applications = OfferApplications()
         self._lines = None
         self._filtered_lines = None
+        self._line_quantities = None
 
     def merge_line(self, line, add_quantities=True):
         """
@@ -420,6 +473,7 @@ class Basket(models.Model):
         finally:
             self._lines = None
             self._filtered_lines = None
+            self._line_quantities = None
 
     merge_line.alters_data = True
 
@@ -438,6 +492,7 @@ class Basket(models.Model):
         basket.date_merged = now()
         basket._lines = None
         basket._filtered_lines = None
+        basket._line_quantities = None
         basket.save()
         self.store_id = basket.store_id
         self.save()
@@ -742,12 +797,11 @@ class Basket(models.Model):
         The basket can contain multiple lines with the same product, but
         different options and stockrecords. Those quantities are summed up.
         """
-        if self.id:
-            matching_lines = self.lines.filter(product=product)
-            quantity = matching_lines.aggregate(Sum("quantity"))["quantity__sum"]
-            return quantity or 0
-
-        return 0
+        return sum(
+            quantity
+            for (product_id, _), quantity in self.line_quantities().items()
+            if product_id == product.id
+        )
 
     def line_quantity(
         self,
@@ -0,0 +1,78 @@
+import time
+
+from core.loading import get_class
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+
+StockSnapshot = get_class("webshop.store.snapshot", "StockSnapshot")
+
+CATALOGUE_VERSION_KEY = "catalogue_version"
+
+
+def bump_catalogue_version():
+    """Invalidate the rendered product cards of every store."""
+    cache.set(CATALOGUE_VERSION_KEY, time.time_ns(), None)
+
+
+def get_catalogue_version():
+    return cache.get_or_set(CATALOGUE_VERSION_KEY, 0, None)
+
+
+class ProductCards:
+    """
+    Rendered product cards kept in the cache.
+
+    A card is stored per product and store under the catalogue version,
+    which changes whenever products, their images, options or additionals
+    change, and the stock snapshot version of the store, which changes with
+    its stockrecords. The cards of a page are read with one ``get_many``,
+    so a warm page renders without any per-card work.
+    """
+
+    cache_key_template = "product_card_%s_%s_%s_%s"
+    template_name = "webshop/catalogue/partials/product.html"
+
+    def __init__(self, store_id):
+        self.store_id = store_id
+        self.catalogue_version = get_catalogue_version()
+        self.stock_version = StockSnapshot(store_id).get_version()
+        self.prefetched = {}
+
+    @classmethod
+    def for_request(cls, request):
+        """Return the cards of the request's store, shared by the request."""
+        cards = getattr(request, "_product_cards", None)
+        if cards is None:
+            cards = cls(request.strategy.get_store_id())
+            request._product_cards = cards
+        return cards
+
+    def get_cache_key(self, product):
+        return self.cache_key_template % (
+            product.pk,
+            self.store_id,
+            self.catalogue_version,
+            self.stock_version,
+        )
+
+    def prefetch(self, products):
+        """
+        Load the cached cards of *products* and return the products without
+        one.
+        """
+        keys = {self.get_cache_key(product): product for product in products}
+        cached = cache.get_many(list(keys))
+        for key, html in cached.items():
+            self.prefetched[keys[key].pk] = html
+        return [product for key, product in keys.items() if key not in cached]
+
+    def render(self, context, product):
+        html = self.prefetched.get(product.pk)
+        if html is None:
+            key = self.get_cache_key(product)
+            html = cache.get(key)
+            if html is None:
+                html = get_template(self.template_name).render(context)
+                cache.set(key, html, settings.PRODUCT_CARD_CACHE_TIMEOUT)
+        return html
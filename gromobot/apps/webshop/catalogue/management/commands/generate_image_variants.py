@@ -0,0 +1,29 @@
+from core.models.img.pipeline import ImagePipeline
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate and record the thumbnails of existing images, "
+        "for every model in IMAGE_THUMBNAIL_SIZES."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="Only process the model with this label, e.g. catalogue.productimage",
+        )
+
+    def handle(self, *args, **options):
+        pipeline = ImagePipeline()
+        labels = options["models"] or list(settings.IMAGE_THUMBNAIL_SIZES)
+        for label in labels:
+            model = apps.get_model(label)
+            processed = sum(1 for _ in pipeline.generate_missing(model))
+            self.stdout.write(
+                "%s: generated thumbnails of %s images\n" % (label, processed)
+            )
@@ -0,0 +1,20 @@
+from core.loading import get_class
+from django.core.management.base import BaseCommand
+
+ProductURLPaths = get_class("webshop.catalogue.url_paths", "ProductURLPaths")
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalised page paths of all products."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Number of products read and written per query",
+        )
+
+    def handle(self, *args, **options):
+        changed = ProductURLPaths(batch_size=options["batch_size"]).update()
+        self.stdout.write("Successfully updated %s products\n" % changed)
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='url_path',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Полный путь категории и ярлык товара, обновляется автоматически.', max_length=1024, verbose_name='Путь страницы товара'),
+        ),
+    ]
@@ -1,9 +1,10 @@
 import uuid
 
+from apps.webshop.catalogue.signals import category_moved
 from core.loading import get_class, get_classes, get_model
 from core.models.fields import AutoSlugField, NullCharField, SlugField
-from core.models.img.image_processor import ImageProcessor
 from core.models.img.missing_image import MissingImage
+from core.models.img.pipeline import ImagePipelineMixin
 from core.models.img.paths import (
     get_image_additionals_upload_path,
     get_image_categories_upload_path,
@@ -11,10 +12,9 @@ from core.models.img.paths import (
 )
 from core.utils import get_default_currency, slugify
 from django.contrib.contenttypes.models import ContentType
-from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.files.base import File
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Count, Exists, OuterRef, Sum
 from django.db.models.fields import Field
 from django.db.models.lookups import StartsWith
@@ -167,7 +167,7 @@ class ProductClass(models.Model):
         return self.class_additionals.all()
 
 
-class Category(MP_Node):
+class Category(ImagePipelineMixin, MP_Node):
     """
     A product category. Merely used for navigational purposes; has no
     effects on business logic.
@@ -213,6 +213,8 @@ class Category(MP_Node):
     _slug_separator = "/"
     _full_name_separator = " > "
 
+    image_fields = ("image",)
+
     objects = CategoryQuerySet.as_manager()
 
     def __str__(self):
@@ -244,20 +246,25 @@ class Category(MP_Node):
         names = [category.name for category in self.get_ancestors_and_self()]
         return self._full_name_separator.join(names)
 
+    def get_tree_node(self):
+        """
+        Returns this category from the cached category tree, or ``None`` if
+        the snapshot doesn't have its current state.
+        """
+        from apps.webshop.catalogue.tree import CategoryTree
+
+        return CategoryTree.get().node(self)
+
     def get_full_slug(self, parent_slug=None):
         if self.is_root():
             return self.slug
 
-        cache_key = self.get_url_cache_key()
-        full_slug = cache.get(cache_key)
-        if full_slug is None:
-            parent_slug = (
-                parent_slug if parent_slug is not None else self.get_parent().full_slug
-            )
-            full_slug = "%s%s%s" % (parent_slug, self._slug_separator, self.slug)
-            cache.set(cache_key, full_slug)
-
-        return full_slug
+        if parent_slug is None:
+            node = self.get_tree_node()
+            if node is not None:
+                return node._full_slug
+            parent_slug = self.get_parent().full_slug
+        return "%s%s%s" % (parent_slug, self._slug_separator, self.slug)
 
     @property
     def full_slug(self):
@@ -294,11 +301,6 @@ class Category(MP_Node):
         instances with a slug already set, or expose a field on the
         appropriate forms.
         """
-        if self.image:
-            processor = ImageProcessor()
-            optimized_image = processor.optimize_image(self.image)
-            self.image.save(optimized_image.name, optimized_image, save=False)
-
         if not self.slug:
             self.slug = self.generate_slug()
 
@@ -322,7 +324,10 @@ class Category(MP_Node):
 
     @classmethod
     def fix_tree(cls, destructive=False, fix_paths=False):
+        from apps.webshop.catalogue.tree import bump_category_tree_version
+
         super().fix_tree(destructive, fix_paths)
+        transaction.on_commit(bump_category_tree_version)
         for node in cls.get_root_nodes():
             # ancestors_are_public *must* be True for root nodes, or all trees
             # will become non-public
@@ -338,6 +343,11 @@ class Category(MP_Node):
     def get_meta_description(self):
         return self.meta_description or striptags(self.description)
 
+    def move(self, target, pos=None):
+        # Moving updates paths with queries, without post_save
+        super().move(target, pos)
+        category_moved.send(sender=self.__class__, instance=self)
+
     def get_ancestors_and_self(self):
         """
         Gets ancestors and includes itself. Use treebeard's get_ancestors
@@ -347,7 +357,12 @@ class Category(MP_Node):
         if self.is_root():
             return [self]
 
-        return list(self.get_ancestors()) + [self]
+        from apps.webshop.catalogue.tree import CategoryTree
+
+        ancestors = CategoryTree.get().ancestors(self)
+        if ancestors is None:
+            ancestors = list(self.get_ancestors())
+        return ancestors + [self]
 
     def get_descendants_and_self(self):
         """
@@ -357,21 +372,14 @@ class Category(MP_Node):
         """
         return self.get_tree(self)
 
-    def get_url_cache_key(self):
-        cache_key = "CATEGORY_URL_%s" % (self.pk)
-        return cache_key
-
     def get_name(self):
         return self.name
 
     def _get_absolute_url(self, parent_slug=None):
         """
         Our URL scheme means we have to look up the category's ancestors. As
-        that is a bit more expensive, we cache the generated URL. That is
-        safe even for a stale cache, as the default implementation of
-        ProductCategoryView does the lookup via primary key anyway. But if
-        you change that logic, you'll have to reconsider the caching
-        approach.
+        that is a bit more expensive, ``get_absolute_url`` takes the URL
+        precomputed in the category tree snapshot when it's up to date.
         """
         return reverse(
             "catalogue:category",
@@ -385,6 +393,9 @@ class Category(MP_Node):
         return parent.evotor_id if parent else ""
 
     def get_absolute_url(self):
+        node = self.get_tree_node()
+        if node is not None:
+            return node._url
         return self._get_absolute_url()
 
     def get_staff_url(self):
@@ -499,6 +510,15 @@ class Product(models.Model):
     name = models.CharField("Название", max_length=255, blank=True)
 
     slug = SlugField("Ярлык", max_length=255, unique=True)
+    # Denormalised canonical path of the product page, maintained by signals
+    url_path = models.CharField(
+        "Путь страницы товара",
+        max_length=1024,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Полный путь категории и ярлык товара, обновляется автоматически.",
+    )
     description = models.TextField(
         "Описание",
         blank=True,
@@ -631,18 +651,29 @@ class Product(models.Model):
     def __str__(self):
         return self.get_name()
 
+    def get_url_path(self):
+        """
+        Return the canonical path of the product page: the full slug of the
+        first category and the slug of the product, or of the parent product
+        for a variant.
+        """
+        if self.is_child:
+            return self.parent.url_path or self.parent.get_url_path()
+        category = self.categories.first() if self.pk else None
+        return "%s/%s" % (category.full_slug if category else "misc", self.slug)
+
     def get_absolute_url(self):
         """
         Return a product's variant absolute URL
         """
-        product = self.parent if self.is_child else self
-        category = product.categories.first()
-
+        category_slug, product_slug = (self.url_path or self.get_url_path()).rsplit(
+            "/", 1
+        )
         return reverse(
             "catalogue:detail",
             kwargs={
-                "product_slug": product.slug,
-                "category_slug": category.full_slug if category else "misc",
+                "product_slug": product_slug,
+                "category_slug": category_slug,
             },
         )
 
@@ -753,9 +784,16 @@ class Product(models.Model):
 
         # Сохранение article и вызов родительского save()
         self.article = self.slug
+        self.url_path = self.get_url_path()
         super().save(*args, **kwargs)
         self.attr.save()
 
+        # Вариации используют путь родительского товара
+        if self.is_parent:
+            self.children.exclude(url_path=self.url_path).update(
+                url_path=self.url_path
+            )
+
     def refresh_from_db(self, using=None, fields=None):
         super().refresh_from_db(using, fields)
         self.attr.invalidate()
@@ -1315,7 +1353,7 @@ class Attribute(models.Model):
     _validate_image = _validate_file
 
 
-class ProductAttribute(models.Model):
+class ProductAttribute(ImagePipelineMixin, models.Model):
     """
     The "through" model for the m2m relationship between :py:class:`Product <.Product>` and
     :py:class:`ProductAttribute <.ProductAttribute>`  This specifies the value of the attribute for
@@ -1387,12 +1425,7 @@ class ProductAttribute(models.Model):
     )
     _dirty = False
 
-    def save(self, *args, **kwargs):
-        if self.value_image:
-            processor = ImageProcessor()
-            optimized_image = processor.optimize_image(self.value_image)
-            self.value_image.save(optimized_image.name, optimized_image, save=False)
-        super().save(*args, **kwargs)
+    image_fields = ("value_image",)
 
     @cached_property
     def type(self):
@@ -1747,7 +1780,7 @@ class ProductAdditional(models.Model):
         verbose_name_plural = "Дополнительные товары"
 
 
-class Additional(models.Model):
+class Additional(ImagePipelineMixin, models.Model):
     """
     An additional that can be selected for a particular item when the product
     is added to the basket.
@@ -1866,6 +1899,8 @@ class Additional(models.Model):
 
     parent_id = "201r02r2-5A02-403A-8tF6-r5C360350820"
 
+    image_fields = ("image",)
+
     @cached_property
     def primary_image(self):
         """
@@ -1884,13 +1919,6 @@ class Additional(models.Model):
         verbose_name = "Дополнительный товар"
         verbose_name_plural = "Дополнительные товары"
 
-    def save(self, *args, **kwargs):
-        if self.image:
-            processor = ImageProcessor()
-            optimized_image = processor.optimize_image(self.image)
-            self.image.save(optimized_image.name, optimized_image, save=False)
-        super().save(*args, **kwargs)
-
     def get_name(self):
         return self.name
 
@@ -1901,7 +1929,7 @@ class Additional(models.Model):
         return self.name
 
 
-class ProductImage(models.Model):
+class ProductImage(ImagePipelineMixin, models.Model):
     """
     An image of a product
     """
@@ -1933,6 +1961,8 @@ class ProductImage(models.Model):
     )
     date_created = models.DateTimeField("Дата создания", auto_now_add=True)
 
+    image_fields = ("original",)
+
     class Meta:
         app_label = "catalogue"
         # Any custom models should ensure that this ordering is unchanged, or
@@ -1950,13 +1980,6 @@ class ProductImage(models.Model):
         """
         return self.display_order == 0
 
-    def save(self, *args, **kwargs):
-        if self.original:
-            processor = ImageProcessor()
-            optimized_image = processor.optimize_image(self.original)
-            self.original.save(optimized_image.name, optimized_image, save=False)
-        super().save(*args, **kwargs)
-
     def delete(self, *args, **kwargs):
         """
         Always keep the display_order as consecutive integers. This avoids
@@ -1966,3 +1989,22 @@ class ProductImage(models.Model):
         for idx, image in enumerate(self.product.images.all()):
             image.display_order = idx
             image.save()
+
+
+class ImageVariant(models.Model):
+    """
+    URLs of the pre-generated thumbnails of an image file, see
+    ``core.models.img.pipeline.ImageVariants``.
+    """
+
+    name = models.CharField("Файл", max_length=255, unique=True)
+    variants = models.JSONField("Миниатюры", default=dict, blank=True)
+    date_updated = models.DateTimeField("Дата обновления", auto_now=True)
+
+    class Meta:
+        app_label = "catalogue"
+        verbose_name = "Миниатюры изображения"
+        verbose_name_plural = "Миниатюры изображений"
+
+    def __str__(self):
+        return self.name
@@ -1,11 +1,22 @@
+from apps.webshop.catalogue.cards import bump_catalogue_version
+from apps.webshop.catalogue.signals import category_moved
+from apps.webshop.catalogue.tasks import update_product_url_paths_task
+from apps.webshop.catalogue.tree import bump_category_tree_version
 from core.loading import get_model
+from core.models.img.pipeline import ImageVariants
 from core.thumbnails import get_thumbnailer
-from django.db import models
-from django.db.models.signals import post_delete, post_save
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
 Category = get_model("catalogue", "Category")
+Product = get_model("catalogue", "Product")
+ProductCategory = get_model("catalogue", "ProductCategory")
 Additional = get_model("catalogue", "Additional")
+ProductAdditional = get_model("catalogue", "ProductAdditional")
+ProductClass = get_model("catalogue", "ProductClass")
+Option = get_model("catalogue", "Option")
 ProductImage = get_model("catalogue", "ProductImage")
 PromoCategory = get_model("action", "PromoCategory")
 Action = get_model("action", "Action")
@@ -23,6 +34,8 @@ def delete_image_files(sender, instance, **kwargs):
             # Make Django return ImageFieldFile instead of ImageField
             field_file = getattr(instance, field.name)
             thumbnailer.delete_thumbnails(field_file)
+            if field_file:
+                ImageVariants.delete(field_file.name)
 
 
 # Connect for all models with ImageFields - add as needed
@@ -38,3 +51,106 @@ def post_save_set_ancestors_are_public(sender, instance, **kwargs):
         return
 
     instance.set_ancestors_are_public()
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Category, dispatch_uid="invalidate_category_tree")
+@receiver(post_delete, sender=Category, dispatch_uid="invalidate_category_tree")
+@receiver(category_moved, sender=Category, dispatch_uid="invalidate_category_tree")
+def invalidate_category_tree(sender, instance, **kwargs):
+    transaction.on_commit(bump_category_tree_version)
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Product, dispatch_uid="invalidate_product_cards")
+@receiver(post_delete, sender=Product, dispatch_uid="invalidate_product_cards")
+@receiver(post_save, sender=ProductImage, dispatch_uid="invalidate_product_cards")
+@receiver(post_delete, sender=ProductImage, dispatch_uid="invalidate_product_cards")
+@receiver(post_save, sender=ProductClass, dispatch_uid="invalidate_product_cards")
+@receiver(post_delete, sender=ProductClass, dispatch_uid="invalidate_product_cards")
+@receiver(post_save, sender=Option, dispatch_uid="invalidate_product_cards")
+@receiver(post_delete, sender=Option, dispatch_uid="invalidate_product_cards")
+@receiver(post_save, sender=Additional, dispatch_uid="invalidate_product_cards")
+@receiver(post_delete, sender=Additional, dispatch_uid="invalidate_product_cards")
+@receiver(post_save, sender=ProductAdditional, dispatch_uid="invalidate_product_cards")
+@receiver(
+    post_delete, sender=ProductAdditional, dispatch_uid="invalidate_product_cards"
+)
+@receiver(
+    m2m_changed, sender=ProductAdditional, dispatch_uid="invalidate_product_cards"
+)
+@receiver(
+    m2m_changed,
+    sender=Product.product_options.through,
+    dispatch_uid="invalidate_product_cards",
+)
+@receiver(
+    m2m_changed,
+    sender=ProductClass.options.through,
+    dispatch_uid="invalidate_product_cards",
+)
+def invalidate_product_cards(sender, **kwargs):
+    """
+    Product cards show the name, image, URL, options and additionals of the
+    product, so any of them changing invalidates the cached cards. Stock
+    changes are covered by the stock snapshot version.
+    """
+    if kwargs.get("raw"):
+        return
+    transaction.on_commit(bump_catalogue_version)
+
+
+def update_product_url_paths(product_ids=None, category_id=None):
+    def update():
+        if settings.CELERY:
+            update_product_url_paths_task.delay(product_ids, category_id)
+        else:
+            update_product_url_paths_task(product_ids, category_id)
+
+    transaction.on_commit(update)
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Category, dispatch_uid="update_category_url_paths")
+@receiver(category_moved, sender=Category, dispatch_uid="update_category_url_paths")
+def update_category_url_paths(sender, instance, created=False, **kwargs):
+    """
+    A changed slug or position changes the paths of the products of the
+    category and its subcategories.
+    """
+    if created or kwargs.get("raw"):
+        return
+    update_product_url_paths(category_id=instance.pk)
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=ProductCategory, dispatch_uid="update_product_url_path")
+@receiver(post_delete, sender=ProductCategory, dispatch_uid="update_product_url_path")
+def update_product_url_path(sender, instance, **kwargs):
+    if kwargs.get("raw"):
+        return
+    update_product_url_paths(product_ids=[instance.product_id])
+
+
+# pylint: disable=unused-argument
+@receiver(
+    m2m_changed, sender=Product.categories.through, dispatch_uid="product_categories"
+)
+def update_product_categories_url_paths(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if reverse and action == "pre_clear":
+        # The cleared products can't be looked up after the clear
+        instance._cleared_product_ids = list(
+            instance.product_set.values_list("pk", flat=True)
+        )
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        product_ids = [instance.pk]
+    elif action == "post_clear":
+        product_ids = getattr(instance, "_cleared_product_ids", [])
+    else:
+        product_ids = list(pk_set)
+    if product_ids:
+        update_product_url_paths(product_ids=product_ids)
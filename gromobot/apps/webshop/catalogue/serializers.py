@@ -106,13 +106,7 @@ class ProductSerializer(serializers.ModelSerializer):
                 rep["parent_id"] = parent_id
 
             # Складские данные
-            if (
-                stc := StockRecord.objects.filter(
-                    product=instance, store__evotor_id=store_id
-                )
-                .select_related("store")
-                .first()
-            ):
+            if (stc := self._get_stockrecord(instance, store_id)):
                 rep.update(
                     {
                         "code": stc.evotor_code,
@@ -137,6 +131,20 @@ class ProductSerializer(serializers.ModelSerializer):
 
         return rep
 
+    def _get_stockrecord(self, instance, store_id):
+        """
+        При массовой выгрузке складские записи передаются в context
+        словарем product_id -> StockRecord, чтобы не делать запрос на товар
+        """
+        stockrecords = self.context.get("stockrecords")
+        if stockrecords is not None:
+            return stockrecords.get(instance.id)
+        return (
+            StockRecord.objects.filter(product=instance, store__evotor_id=store_id)
+            .select_related("store")
+            .first()
+        )
+
     def _process_product(self, data, product=None):
         """Общая логика для create/update"""
         parent_id = data.pop("parent_id", None)
@@ -244,17 +252,27 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def _get_child_attributes(self, instance):
         """Получение атрибутов для дочерних товаров"""
+        if "attribute_values" in getattr(instance, "_prefetched_objects_cache", {}):
+            attribute_values = instance.attribute_values.all()
+        else:
+            attribute_values = instance.attribute_values.select_related(
+                "attribute__option_group"
+            ).prefetch_related("value_multi_option")
         return {
             av.attribute.option_group.evotor_id: v.evotor_id
-            for av in instance.attribute_values.select_related(
-                "attribute__option_group", "value"
-            )
-            if (v := av.value.first())
+            for av in attribute_values
+            if (v := self._get_first_option(av))
             and av.attribute.option_group
             and av.attribute.option_group.evotor_id
             and v.evotor_id
         }
 
+    @staticmethod
+    def _get_first_option(attribute_value):
+        # .all() reads the prefetched options, .first() would query them again
+        options = attribute_value.value_multi_option.all()
+        return options[0] if options else None
+
 
 class ProductsSerializer(serializers.Serializer):
     items = ProductSerializer(many=True)
@@ -0,0 +1,32 @@
+import logging
+
+from celery import shared_task
+from core.loading import get_class, get_model
+
+ProductURLPaths = get_class("webshop.catalogue.url_paths", "ProductURLPaths")
+
+Category = get_model("catalogue", "Category")
+Product = get_model("catalogue", "Product")
+
+logger = logging.getLogger("apps.webshop.catalogue")
+
+
+@shared_task
+def update_product_url_paths_task(product_ids=None, category_id=None):
+    """
+    Пересчитывает пути страниц товаров после изменения их категорий или
+    ярлыков и положения категории с ее подкатегориями.
+    """
+    try:
+        if category_id is not None:
+            category = Category.objects.filter(pk=category_id).first()
+            if category is None:
+                return
+            products = Product.objects.filter(
+                categories__path__startswith=category.path
+            )
+        else:
+            products = Product.objects.filter(pk__in=product_ids or [])
+        ProductURLPaths().update(products)
+    except Exception as e:
+        logger.error(f"{e} при обновлении путей страниц товаров")
@@ -0,0 +1,158 @@
+import threading
+import time
+
+from core.loading import get_model
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+Category = get_model("catalogue", "Category")
+
+CATEGORY_TREE_VERSION_KEY = "category_tree_version"
+
+
+def bump_category_tree_version():
+    """Invalidate the category tree of every process."""
+    cache.set(CATEGORY_TREE_VERSION_KEY, time.time_ns(), None)
+
+
+def get_category_tree_version():
+    return cache.get_or_set(CATEGORY_TREE_VERSION_KEY, 0, None)
+
+
+class CategoryTree:
+    """
+    Snapshot of the whole category tree.
+
+    Categories are loaded once, in tree order, with their full slug, URL,
+    parent and children precomputed, so menus, category pages and
+    breadcrumbs need no queries. The snapshot is stored in the cache under
+    the tree version, which changes whenever a category is saved, deleted
+    or moved, and is kept per process until the version changes or for at
+    most ``CATEGORY_TREE_TIMEOUT`` seconds, as the version only reaches
+    other processes through a shared cache.
+    """
+
+    cache_key_template = "category_tree_%s"
+
+    _tree = None
+    _version = None
+    _loaded_at = 0
+    _lock = threading.Lock()
+
+    def __init__(self, categories):
+        self.categories = categories
+        self.by_pk = {category.pk: category for category in categories}
+        self.by_slug = {category.slug: category for category in categories}
+
+    @classmethod
+    def is_stale(cls, version):
+        return (
+            cls._tree is None
+            or cls._version != version
+            or time.monotonic() - cls._loaded_at >= settings.CATEGORY_TREE_TIMEOUT
+        )
+
+    @classmethod
+    def get(cls):
+        version = get_category_tree_version()
+        tree = cls._tree
+        if cls.is_stale(version):
+            with cls._lock:
+                tree = cls._tree
+                if cls.is_stale(version):
+                    key = cls.cache_key_template % version
+                    categories = cache.get(key)
+                    if categories is None:
+                        categories = cls.build()
+                        cache.set(key, categories, settings.CATEGORY_TREE_TIMEOUT)
+                    tree = cls(categories)
+                    cls._tree, cls._version = tree, version
+                    cls._loaded_at = time.monotonic()
+        return tree
+
+    @classmethod
+    def build(cls):
+        """
+        Load every category and annotate it with ``_full_slug``, ``_url``,
+        ``_parent_id``, ``_child_ids`` and ``is_browsable``.
+        """
+        categories = list(Category.objects.order_by("path"))
+        by_path = {}
+        for category in categories:
+            parent = by_path.get(category.path[: -Category.steplen])
+            if parent is None:
+                category._full_slug = category.slug
+                category._parent_id = None
+                category.is_browsable = category.is_public
+            else:
+                category._full_slug = "%s%s%s" % (
+                    parent._full_slug,
+                    Category._slug_separator,
+                    category.slug,
+                )
+                category._parent_id = parent.pk
+                category.is_browsable = parent.is_browsable and category.is_public
+                parent._child_ids.append(category.pk)
+            category._child_ids = []
+            category._url = reverse(
+                "catalogue:category", kwargs={"category_slug": category._full_slug}
+            )
+            by_path[category.path] = category
+        return categories
+
+    def node(self, category):
+        """
+        Snapshot of *category*, given as an instance or a primary key.
+        Returns ``None`` for unknown categories and for instances that
+        differ from the snapshot, e.g. changed in the current transaction.
+        """
+        pk = getattr(category, "pk", category)
+        node = self.by_pk.get(pk)
+        if node is None or not isinstance(category, Category):
+            return node
+        if node.slug != category.slug or node.path != category.path:
+            return None
+        return node
+
+    def get_by_slug(self, slug):
+        return self.by_slug.get(slug)
+
+    def roots(self, browsable=True):
+        return [
+            category
+            for category in self.categories
+            if category.depth == 1 and (category.is_browsable or not browsable)
+        ]
+
+    def children(self, category, browsable=True):
+        node = self.node(category)
+        if node is None:
+            return []
+        children = [self.by_pk[pk] for pk in node._child_ids]
+        if browsable:
+            children = [child for child in children if child.is_browsable]
+        return children
+
+    def descendants(self, category, browsable=True):
+        return [
+            node
+            for node in self.categories
+            if node.depth > category.depth
+            and node.path.startswith(category.path)
+            and (node.is_browsable or not browsable)
+        ]
+
+    def ancestors(self, category):
+        """
+        Ancestors of *category* from the root down, or ``None`` if the
+        category isn't in the snapshot.
+        """
+        node = self.node(category)
+        if node is None:
+            return None
+        ancestors = []
+        while node._parent_id is not None:
+            node = self.by_pk[node._parent_id]
+            ancestors.append(node)
+        return ancestors[::-1]
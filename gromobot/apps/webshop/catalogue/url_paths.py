@@ -0,0 +1,77 @@
+from apps.webshop.catalogue.cards import bump_catalogue_version
+from core.loading import get_model
+from django.conf import settings
+from django.db.models import Min, OuterRef, Q, Subquery
+
+Category = get_model("catalogue", "Category")
+Product = get_model("catalogue", "Product")
+
+
+class ProductURLPaths:
+    """
+    Maintains ``Product.url_path``, the canonical path of the product page.
+
+    Paths are recomputed set-based: the full slugs of all categories are
+    built from one query, canonical products are read with the path of
+    their first category annotated, changed paths are written with
+    ``bulk_update`` and variants copy the path of their parent with one
+    UPDATE. The cached product cards are invalidated when paths change.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or settings.PRODUCT_URL_PATHS_BATCH_SIZE
+
+    def get_full_slugs(self):
+        """
+        Return a dict mapping category paths to full slugs.
+        """
+        full_slugs = {}
+        categories = Category.objects.order_by("path").values_list("path", "slug")
+        for path, slug in categories:
+            parent_slug = full_slugs.get(path[: -Category.steplen])
+            full_slugs[path] = (
+                "%s%s%s" % (parent_slug, Category._slug_separator, slug)
+                if parent_slug
+                else slug
+            )
+        return full_slugs
+
+    def update(self, products=None):
+        """
+        Recompute the paths of *products*, a queryset, or of every product.
+        Variants in *products* update their parent. Returns the number of
+        changed canonical products.
+        """
+        if products is None:
+            products = Product.objects.filter(parent__isnull=True)
+        else:
+            products = Product.objects.filter(
+                Q(pk__in=products.values("pk"))
+                | Q(pk__in=products.filter(parent__isnull=False).values("parent_id")),
+                parent__isnull=True,
+            )
+
+        full_slugs = self.get_full_slugs()
+        rows = (
+            products.annotate(category_path=Min("categories__path"))
+            .order_by("pk")
+            .values_list("pk", "slug", "url_path", "category_path")
+        )
+        changed = []
+        for pk, slug, url_path, category_path in rows.iterator(
+            chunk_size=self.batch_size
+        ):
+            new_path = "%s/%s" % (full_slugs.get(category_path, "misc"), slug)
+            if new_path != url_path:
+                changed.append(Product(pk=pk, url_path=new_path))
+        Product.objects.bulk_update(changed, ["url_path"], batch_size=self.batch_size)
+
+        updated_children = Product.objects.filter(parent__in=products).update(
+            url_path=Subquery(
+                Product.objects.filter(pk=OuterRef("parent_id")).values("url_path")[:1]
+            )
+        )
+        if changed or updated_children:
+            # Paths are written without signals, the cards link the old pages
+            bump_catalogue_version()
+        return len(changed)
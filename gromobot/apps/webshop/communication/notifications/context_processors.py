@@ -1,15 +1,15 @@
-from core.loading import get_model
+from core.loading import get_class
 
-Notification = get_model("communication", "Notification")
+UnreadNotifications = get_class(
+    "webshop.communication.notifications.counters", "UnreadNotifications"
+)
 
 
 def notifications(request):
     ctx = {}
     if getattr(request, "user", None) and request.user.is_authenticated:
         ctx["num_unread_notifications"] = ""
-        num_unread = Notification.objects.filter(
-            recipient=request.user, date_read=None, location="Inbox"
-        ).count()
+        num_unread = UnreadNotifications().get(request.user.id)
         if num_unread > 0:
             ctx["num_unread_notifications"] = num_unread
     return ctx
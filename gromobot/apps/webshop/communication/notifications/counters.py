@@ -0,0 +1,59 @@
+from core.loading import get_model
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+Notification = get_model("communication", "Notification")
+
+
+class UnreadNotifications:
+    """
+    Per-user number of unread inbox notifications kept in the cache.
+
+    The counter is changed incrementally when notifications are created,
+    read, archived or deleted, and is recounted from the database only
+    when it is missing from the cache.
+    """
+
+    cache_key_template = "notifications_unread_%s"
+
+    def get_cache_key(self, user_id):
+        return self.cache_key_template % user_id
+
+    def get(self, user_id):
+        key = self.get_cache_key(user_id)
+        count = cache.get(key)
+        if count is None:
+            count = self.count(user_id)
+            cache.set(key, count, settings.NOTIFICATIONS_UNREAD_TIMEOUT)
+        return max(count, 0)
+
+    def count(self, user_id):
+        return Notification.objects.filter(
+            recipient_id=user_id, date_read=None, location=Notification.INBOX
+        ).count()
+
+    def incr(self, user_id, delta=1):
+        """
+        Change the counter once the current transaction commits. A missing
+        counter is left alone, it is recounted on the next read.
+        """
+        key = self.get_cache_key(user_id)
+
+        def update():
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                pass
+
+        transaction.on_commit(update)
+
+    def decr(self, user_id, delta=1):
+        self.incr(user_id, -delta)
+
+    @staticmethod
+    def is_unread(notification):
+        return (
+            notification.date_read is None
+            and notification.location == Notification.INBOX
+        )
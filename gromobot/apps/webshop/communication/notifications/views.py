@@ -9,6 +9,9 @@ from django.views import generic
 
 PageTitleMixin = get_class("webshop.mixins", "PageTitleMixin")
 Notification = get_model("communication", "Notification")
+UnreadNotifications = get_class(
+    "webshop.communication.notifications.counters", "UnreadNotifications"
+)
 
 
 class NotificationListView(PageTitleMixin, generic.ListView):
@@ -59,11 +62,15 @@ class UpdateView(NotifEditMixin, generic.View):
 
     def archive(self, request, notification):
         # for notification in notifications:
+        counter = UnreadNotifications()
+        was_unread = counter.is_unread(notification)
+        # Read before archiving, so a recount still includes the notification
+        num_unread = counter.get(request.user.id)
         notification.archive()
 
-        num_unread = Notification.objects.filter(
-            recipient=request.user, date_read=None, location="Inbox"
-        ).count()
+        if was_unread:
+            counter.decr(request.user.id)
+            num_unread = max(num_unread - 1, 0)
 
         if num_unread == 0:
             num_unread = ""
@@ -98,9 +105,12 @@ class DetailView(PageTitleMixin, generic.DetailView):
     def get_object(self, queryset=None):
         obj = super().get_object()
         if not obj.date_read:
+            was_unread = UnreadNotifications.is_unread(obj)
             obj.date_read = now()
             obj.location = "Archive"
             obj.save()
+            if was_unread:
+                UnreadNotifications().decr(obj.recipient_id)
         return obj
 
     def get_queryset(self):
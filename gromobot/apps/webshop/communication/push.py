@@ -0,0 +1,140 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from py_vapid import Vapid
+from pywebpush import WebPusher
+from requests.adapters import HTTPAdapter
+from webpush.models import SubscriptionInfo
+
+logger = logging.getLogger("apps.webshop.communications")
+
+# Push сервисы отвечают так на удаленные и устаревшие подписки
+GONE_STATUSES = (404, 410)
+
+
+def get_subscription_info(subscription):
+    return {
+        "endpoint": subscription.endpoint,
+        "keys": {
+            "p256dh": subscription.p256dh,
+            "auth": subscription.auth,
+        },
+    }
+
+
+class PushDispatcher:
+    """
+    Sends one web push payload to many subscriptions.
+
+    Requests go out from a bounded thread pool over one shared session that
+    keeps a connection pool per push service. Signed VAPID headers are
+    cached per audience (the push service origin) until shortly before they
+    expire, so a batch signs once per push service instead of once per
+    subscription. Subscriptions answered with 404 or 410 are deleted with
+    one query.
+    """
+
+    _session = None
+    _vapid = None
+    _headers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, workers=None, timeout=None):
+        self.workers = workers or settings.WEBPUSH_WORKERS
+        self.timeout = timeout or settings.WEBPUSH_REQUEST_TIMEOUT
+
+    @classmethod
+    def get_session(cls):
+        with cls._lock:
+            if cls._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=settings.WEBPUSH_POOL_CONNECTIONS,
+                    pool_maxsize=settings.WEBPUSH_WORKERS,
+                )
+                session.mount("https://", adapter)
+                cls._session = session
+            return cls._session
+
+    @classmethod
+    def get_vapid_headers(cls, endpoint):
+        url = urlparse(endpoint)
+        audience = f"{url.scheme}://{url.netloc}"
+        with cls._lock:
+            expires, headers = cls._headers.get(audience, (0, None))
+            if expires - settings.WEBPUSH_VAPID_MARGIN > time.time():
+                return headers
+            if cls._vapid is None:
+                cls._vapid = Vapid.from_string(
+                    private_key=settings.WEBPUSH_PRIVATE_KEY
+                )
+            expires = int(time.time()) + settings.WEBPUSH_VAPID_TTL
+            headers = cls._vapid.sign(
+                {
+                    "sub": f"mailto:{settings.WEBPUSH_ADMIN_EMAIL}",
+                    "aud": audience,
+                    "exp": expires,
+                }
+            )
+            cls._headers[audience] = (expires, headers)
+            return headers
+
+    def send(self, subscriptions, payload):
+        """
+        Send *payload* to *subscriptions*, given as subscription info dicts
+        or ``SubscriptionInfo`` instances. Returns a summary with the number
+        of ``sent``, ``failed`` and ``deleted`` subscriptions.
+        """
+        subscriptions = [
+            s if isinstance(s, dict) else get_subscription_info(s)
+            for s in subscriptions
+        ]
+        summary = {"total": len(subscriptions), "sent": 0, "failed": 0, "deleted": 0}
+        if not subscriptions:
+            return summary
+
+        data = json.dumps(payload)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            statuses = list(
+                executor.map(lambda s: self.send_one(s, data), subscriptions)
+            )
+
+        gone = []
+        for subscription_info, status in zip(subscriptions, statuses):
+            if status is not None and status < 300:
+                summary["sent"] += 1
+            elif status in GONE_STATUSES:
+                gone.append(subscription_info["endpoint"])
+            else:
+                summary["failed"] += 1
+
+        if gone:
+            SubscriptionInfo.objects.filter(endpoint__in=gone).delete()
+            summary["deleted"] = len(gone)
+            logger.info(f"Удалено {len(gone)} неактивных push подписок")
+        return summary
+
+    def send_one(self, subscription_info, data):
+        """Returns the HTTP status of the push service or None on error"""
+        try:
+            pusher = WebPusher(subscription_info, requests_session=self.get_session())
+            response = pusher.send(
+                data,
+                headers=dict(self.get_vapid_headers(subscription_info["endpoint"])),
+                ttl=settings.WEBPUSH_TTL,
+                timeout=self.timeout,
+            )
+        except Exception as e:
+            logger.error(f"Ошибка отправки уведомления: {e}")
+            return None
+        if response.status_code >= 300 and response.status_code not in GONE_STATUSES:
+            logger.error(
+                f"Ошибка отправки уведомления: {response.status_code} {response.reason}"
+            )
+        return response.status_code
@@ -1,8 +1,11 @@
 import datetime
 
 from apps.webshop.checkout.signals import post_payment
-from apps.webshop.order.signals import order_status_changed
+from apps.webshop.order.signals import (bulk_order_status_changed,
+                                        order_status_changed)
+from core.loading import get_class, get_model
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 from .tasks import (
     _send_site_notification_new_order_to_customer,
@@ -10,6 +13,11 @@ from .tasks import (
     _send_sms_notification_order_status_to_customer,
 )
 
+Notification = get_model("communication", "Notification")
+UnreadNotifications = get_class(
+    "webshop.communication.notifications.counters", "UnreadNotifications"
+)
+
 
 def notify_about_new_order(sender, view, **kwargs):
     order = kwargs["order"]
@@ -59,7 +67,27 @@ def notify_customer_about_order_status(sender, order, **kwargs):
             _send_sms_notification_order_status_to_customer(ctx)
 
 
+def notify_customers_about_order_status(sender, orders, new_status, **kwargs):
+    for order in orders:
+        notify_customer_about_order_status(sender, order, new_status=new_status)
+
+
 order_status_changed.connect(notify_customer_about_order_status)
+bulk_order_status_changed.connect(notify_customers_about_order_status)
+
+
+def count_created_notification(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and UnreadNotifications.is_unread(instance):
+        UnreadNotifications().incr(instance.recipient_id)
+
+
+def count_deleted_notification(sender, instance, **kwargs):
+    if UnreadNotifications.is_unread(instance):
+        UnreadNotifications().decr(instance.recipient_id)
+
+
+post_save.connect(count_created_notification, sender=Notification)
+post_delete.connect(count_deleted_notification, sender=Notification)
 
 
 # helpers
@@ -1,23 +1,23 @@
-import json
 import logging
 
 from apps.telegram.bot.synchron.send_message import (send_message,
                                                      send_message_to_staffs)
+from apps.webshop.communication.push import PushDispatcher
 from celery import shared_task
 # from oscar.apps.sms.providers.base import Smsaero
-from core.loading import get_model
+from core.loading import get_class, get_model
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.template import loader
 from django.templatetags.static import static
-from pywebpush import WebPushException, webpush
-from webpush.models import PushInformation, SubscriptionInfo
+from webpush.models import SubscriptionInfo
 
 NotificationSetting = get_model("user", "NotificationSetting")
 Notification = get_model("communication", "Notification")
 CommunicationEvent = get_model("order", "CommunicationEvent")
 CommunicationEventType = get_model("communication", "CommunicationEventType")
 TelegramMessage = get_model("telegram", "TelegramMessage")
+Dispatcher = get_class("webshop.communication.utils", "Dispatcher")
 User = get_user_model()
 
 logger = logging.getLogger("apps.webshop.communications")
@@ -27,25 +27,19 @@ logger = logging.getLogger("apps.webshop.communications")
 
 @shared_task
 def _send_site_notification_new_order_to_staff(ctx: dict):
-    subject = "Пользовательский заказ"
-    message_tpl = loader.get_template(
-        "webshop/customer/alerts/staff_new_order_message.html"
-    )
-    description = "Заказ №%s успешно создан!" % (ctx["number"])
     staffs = User.objects.filter(
         is_staff=True, notification_settings=NotificationSetting.SELL
+    ).only("id")
+    return Dispatcher().notify_users(
+        staffs,
+        subject="Пользовательский заказ",
+        template_name="webshop/customer/alerts/staff_new_order_message.html",
+        context=ctx,
+        order_id=ctx["order_id"],
+        description="Заказ №%s успешно создан!" % (ctx["number"]),
+        status="Success",
     )
 
-    for staff in staffs:
-        Notification.objects.create(
-            recipient=staff,
-            order_id=ctx["order_id"],
-            subject=subject,
-            body=message_tpl.render(ctx).strip(),
-            description=description,
-            status="Success",
-        )
-
 
 @shared_task()
 def _send_site_notification_new_order_to_customer(ctx: dict):
@@ -135,32 +129,7 @@ def _send_site_notification_order_status_to_customer(ctx: dict):
 
 @shared_task
 def _send_push_notification(subscription_info, payload):
-    try:
-        webpush(
-            subscription_info=subscription_info,
-            data=json.dumps(payload),
-            vapid_private_key=settings.WEBPUSH_PRIVATE_KEY,
-            vapid_claims={
-                "sub": f"mailto:{settings.WEBPUSH_ADMIN_EMAIL}",
-            },
-        )
-    except WebPushException as ex:
-        if "Push failed: 410 Gone" in str(ex):
-            # Удаляем подписку из базы данных, если она больше не активна
-            subscription = SubscriptionInfo.objects.filter(
-                endpoint=subscription_info["endpoint"]
-            ).first()
-            if subscription:
-                subscription.delete()
-                logger.info(
-                    f"Подписка с endpoint {subscription_info['endpoint']} была удалена из-за ошибки 410 Gone."
-                )
-            else:
-                logger.error(
-                    f"Ошибка отправки уведомления и поиска подписки: {str(ex)}"
-                )
-        else:
-            logger.error(f"Ошибка отправки уведомления: {str(ex)}")
+    return PushDispatcher().send([subscription_info], payload)
 
 
 @shared_task
@@ -171,35 +140,11 @@ def _send_push_notification_new_order_to_staff(ctx):
         "icon": static("svg/webpush/new_order.svg"),
         "url": ctx.get("staff_url"),
     }
-    push_informations = PushInformation.objects.select_related("subscription").filter(
-        user_is_staff=True, user__notification_settings__code="sell"
-    )
-    for push_information in push_informations:
-        subscription_info = {
-            "endpoint": push_information.subscription.endpoint,
-            "keys": {
-                "p256dh": push_information.subscription.p256dh,
-                "auth": push_information.subscription.auth,
-            },
-        }
-        try:
-            webpush(
-                subscription_info=subscription_info,
-                data=json.dumps(payload),
-                vapid_private_key=settings.WEBPUSH_PRIVATE_KEY,
-                vapid_claims={
-                    "sub": f"mailto:{settings.WEBPUSH_ADMIN_EMAIL}",
-                },
-            )
-        except WebPushException as ex:
-            if "Push failed: 410 Gone" in str(ex):
-                # Удаляем подписку из базы данных, если она больше не активна
-                logger.info(
-                    f"Подписка с endpoint {push_information.subscription.endpoint} была удалена из-за ошибки 410 Gone."
-                )
-                push_information.subscription.delete()
-            else:
-                logger.error(f"Ошибка отправки уведомления: {str(ex)}")
+    subscriptions = SubscriptionInfo.objects.filter(
+        webpush_info__user__is_staff=True,
+        webpush_info__user__notification_settings__code=NotificationSetting.SELL,
+    ).distinct()
+    return PushDispatcher().send(subscriptions, payload)
 
 
 # ================= Telegram =================
@@ -216,7 +161,7 @@ def _send_telegram_message_new_order_to_staff(ctx: dict):
         f"Доставка: {ctx['shipping_method']}\n"
         f"Сумма: {ctx['total']} ₽\n\n"
     )
-    send_message_to_staffs(msg, TelegramMessage.NEW)
+    send_message_to_staffs(msg, TelegramMessage.SELL)
 
 
 @shared_task
@@ -1,13 +1,19 @@
+import json
 import logging
+from collections import Counter
 
-from core.loading import get_model
+from core.loading import get_class, get_model
 from django.conf import settings
 from django.contrib.sites.models import Site
 from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.template import loader
 
 CommunicationEventType = get_model("communication", "CommunicationEventType")
 Email = get_model("communication", "Email")
 Notification = get_model("communication", "Notification")
+UnreadNotifications = get_class(
+    "webshop.communication.notifications.counters", "UnreadNotifications"
+)
 
 
 class Dispatcher(object):
@@ -58,12 +64,58 @@ class Dispatcher(object):
         """
         Notification.objects.create(recipient=user, subject=subject, **kwargs)
 
-    def notify_users(self, users, subject, **kwargs):
-        """
-        Send a simple notification to an iterable of users
-        """
-        for user in users:
-            self.notify_user(user, subject, **kwargs)
+    def notify_users(self, users, subject, template_name=None, context=None, **kwargs):
+        """
+        Send a simple notification to an iterable of users with one insert.
+        Returns the ids of the created notifications.
+        """
+        return self.bulk_notify(
+            [
+                dict(
+                    recipient_id=user.pk,
+                    subject=subject,
+                    template_name=template_name,
+                    context=context,
+                    **kwargs,
+                )
+                for user in users
+            ]
+        )
+
+    def bulk_notify(self, notifications):
+        """
+        Create notifications from a list of dicts of ``Notification`` fields
+        with one insert and return their ids.
+
+        Instead of ``body`` a dict may give ``template_name`` and
+        ``context``; each template is rendered once per distinct context.
+        """
+        rendered = {}
+        objs = []
+        for data in notifications:
+            data = dict(data)
+            template_name = data.pop("template_name", None)
+            context = data.pop("context", None) or {}
+            if template_name:
+                key = (template_name, json.dumps(context, sort_keys=True, default=str))
+                if key not in rendered:
+                    rendered[key] = loader.render_to_string(
+                        template_name, context
+                    ).strip()
+                data["body"] = rendered[key]
+            objs.append(Notification(**data))
+
+        created = Notification.objects.bulk_create(objs)
+
+        # bulk_create doesn't send post_save, so the counters are updated here
+        unread = Counter(
+            obj.recipient_id for obj in created if UnreadNotifications.is_unread(obj)
+        )
+        counter = UnreadNotifications()
+        for recipient_id, count in unread.items():
+            counter.incr(recipient_id, count)
+
+        return [obj.pk for obj in created]
 
     # Internal
 
@@ -72,6 +72,15 @@ class WebshopMiddleware:
 
             return basket
 
+        def load_basket_summary():
+            """
+            Return the number of lines and items of the basket.
+
+            Unlike ``request.basket`` this doesn't load lines or apply
+            offers, unless the full basket has been loaded already.
+            """
+            return self.get_basket(request).get_summary()
+
         def load_basket_hash():
             """
             Load the basket and return the basket hash
@@ -87,6 +96,7 @@ class WebshopMiddleware:
         # when the attribute is accessed.
         request.basket = SimpleLazyObject(load_full_basket)
         request.basket_hash = SimpleLazyObject(load_basket_hash)
+        request.basket_summary = SimpleLazyObject(load_basket_summary)
         request.store = SimpleLazyObject(load_store)
         request._referral_source = SimpleLazyObject(load_referral_source)
 
@@ -2,8 +2,10 @@
 import logging
 from decimal import Decimal as D
 
-from apps.webshop.order.signals import (order_line_status_changed,
+from apps.webshop.order.signals import (bulk_order_status_changed,
+                                        order_line_status_changed,
                                         order_status_changed)
+from apps.webshop.store.exceptions import InvalidStockAdjustment
 from core.compat import AUTH_USER_MODEL
 from core.loading import get_model
 from core.models.fields import AutoSlugField
@@ -12,7 +14,7 @@ from core.utils import get_default_currency
 from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
 from django.core.signing import BadSignature, Signer
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Sum
 from django.urls import reverse
 from django.utils import timezone
@@ -145,31 +147,21 @@ class Order(models.Model):
 
         if new_status not in self.available_statuses():
             raise exceptions.InvalidOrderStatus(
-                (
-                    "'%(new_status)s' недействительный статус для заказа %(number)s"
-                    " (текущий статус: '%(status)s')"
-                )
-                % {
-                    "new_status": new_status,
-                    "number": self.number,
-                    "status": self.status,
-                }
+                self._invalid_status_message(new_status)
             )
+
+        lines = self._get_status_lines([self], new_status)
+        errors = self._check_stock([self], lines, new_status)
+        if errors:
+            raise InvalidStockAdjustment(errors[self])
+
         self.status = new_status
-        if new_status in self.cascade:
-            new_line_status = self.cascade[new_status]
-            for line in self.lines.all():
-                if new_line_status in line.available_statuses():
-                    line.status = new_line_status
-                    line.save()
+        self._cascade_lines(lines, new_status)
 
         if new_status in settings.ORDER_FINAL_STATUSES:
             self.date_finish = timezone.now()
 
-        if new_status == settings.SUCCESS_ORDER_STATUS:
-            self.consume_stock_allocations()
-        elif new_status == settings.FAIL_ORDER_STATUS:
-            self.cancel_stock_allocations()
+        self._adjust_stock(lines, new_status)
 
         self.save()
 
@@ -185,29 +177,192 @@ class Order(models.Model):
 
     set_status.alters_data = True
 
-    def consume_stock_allocations(self):
+    @classmethod
+    def bulk_set_status(cls, orders, new_status):
         """
-        Consume the stock allocations for the passed lines.
+        Set a new status for several orders with a fixed number of queries.
 
-        If no lines/quantities are passed, do it for all lines.
+        Transitions are validated in memory, orders which can't move to the
+        new status are left untouched. Returns the changed orders and a dict
+        mapping the other orders to the reason. A single
+        ``bulk_order_status_changed`` signal is sent for the changed orders
+        instead of ``order_status_changed`` for each of them.
         """
-        lines = self.lines.all()
-        line_quantities = [line.quantity for line in lines]
-        for line, qty in zip(lines, line_quantities):
-            if line.stockrecord:
-                line.stockrecord.consume_allocation(qty)
+        orders = [order for order in orders if order.status != new_status]
+        errors = {
+            order: order._invalid_status_message(new_status)
+            for order in orders
+            if new_status not in order.available_statuses()
+        }
+        orders = [order for order in orders if order not in errors]
 
-    def cancel_stock_allocations(self):
+        lines = cls._get_status_lines(orders, new_status)
+        errors.update(cls._check_stock(orders, lines, new_status))
+        orders = [order for order in orders if order not in errors]
+        if not orders:
+            return [], errors
+
+        order_ids = {order.pk for order in orders}
+        lines = {pk: value for pk, value in lines.items() if pk in order_ids}
+        old_statuses = {order.pk: order.status for order in orders}
+
+        fields = {"status": new_status}
+        if new_status in settings.ORDER_FINAL_STATUSES:
+            fields["date_finish"] = timezone.now()
+
+        with transaction.atomic():
+            cls._cascade_lines(lines, new_status)
+            cls._adjust_stock(lines, new_status)
+            cls._default_manager.filter(pk__in=order_ids).update(**fields)
+            OrderStatusChange.objects.bulk_create(
+                [
+                    OrderStatusChange(
+                        order=order,
+                        old_status=old_statuses[order.pk],
+                        new_status=new_status,
+                    )
+                    for order in orders
+                ]
+            )
+
+        for order in orders:
+            for name, value in fields.items():
+                setattr(order, name, value)
+
+        bulk_order_status_changed.send(
+            sender=cls,
+            orders=orders,
+            old_statuses=old_statuses,
+            new_status=new_status,
+        )
+        return orders, errors
+
+    bulk_set_status.alters_data = True
+
+    def _invalid_status_message(self, new_status):
+        return (
+            "'%(new_status)s' недействительный статус для заказа %(number)s"
+            " (текущий статус: '%(status)s')"
+        ) % {
+            "new_status": new_status,
+            "number": self.number,
+            "status": self.status,
+        }
+
+    @classmethod
+    def _get_status_lines(cls, orders, new_status):
+        """
+        Return a dict mapping order ids to the lines affected by moving the
+        orders to *new_status*, with stockrecords if stock changes.
         """
-        Cancel the stock allocations for the passed lines.
+        changes_stock = new_status in (
+            settings.SUCCESS_ORDER_STATUS,
+            settings.FAIL_ORDER_STATUS,
+        )
+        if not orders or (new_status not in cls.cascade and not changes_stock):
+            return {}
+
+        lines = Line.objects.filter(order__in=[order.pk for order in orders])
+        if changes_stock:
+            lines = lines.select_related(
+                "stockrecord__product__product_class",
+                "stockrecord__product__parent__product_class",
+            )
+        result = {}
+        for line in lines:
+            result.setdefault(line.order_id, []).append(line)
+        return result
 
-        If no lines/quantities are passed, do it for all lines.
+    @staticmethod
+    def _stock_quantities(lines):
+        """
+        Sum line quantities per tracked stockrecord, as a dict mapping
+        stockrecords to quantities.
+        """
+        stockrecords, quantities = {}, {}
+        for line in lines:
+            stockrecord = line.stockrecord
+            if stockrecord is None or not stockrecord.can_track_allocations:
+                continue
+            stockrecords.setdefault(stockrecord.pk, stockrecord)
+            quantities.setdefault(stockrecord.pk, 0)
+            quantities[stockrecord.pk] += line.quantity
+        return {stockrecords[pk]: quantity for pk, quantity in quantities.items()}
+
+    @classmethod
+    def _check_stock(cls, orders, lines, new_status):
+        """
+        Return a dict mapping orders whose allocations can't be consumed to
+        the reason. Orders are checked in turn against the stock left by the
+        previous ones.
+        """
+        if new_status != settings.SUCCESS_ORDER_STATUS:
+            return {}
+        available, errors = {}, {}
+        for order in orders:
+            needed = cls._stock_quantities(lines.get(order.pk, []))
+            for stockrecord in needed:
+                available.setdefault(
+                    stockrecord.pk,
+                    min(stockrecord.num_allocated or 0, stockrecord.num_in_stock or 0),
+                )
+            if any(qty > available[sr.pk] for sr, qty in needed.items()):
+                errors[order] = "Неверный запрос товарного запаса"
+                continue
+            for stockrecord, quantity in needed.items():
+                available[stockrecord.pk] -= quantity
+        return errors
+
+    @classmethod
+    def _cascade_lines(cls, lines, new_status):
+        """
+        Move the lines to the line status of the cascade with one UPDATE.
+        """
+        new_line_status = cls.cascade.get(new_status)
+        if not new_line_status:
+            return
+        line_ids = [
+            line.pk
+            for order_lines in lines.values()
+            for line in order_lines
+            if new_line_status in line.available_statuses()
+        ]
+        if line_ids:
+            Line.objects.filter(pk__in=line_ids).update(status=new_line_status)
+        for order_lines in lines.values():
+            for line in order_lines:
+                if line.pk in line_ids:
+                    line.status = new_line_status
+
+    @classmethod
+    def _adjust_stock(cls, lines, new_status):
+        if new_status not in (
+            settings.SUCCESS_ORDER_STATUS,
+            settings.FAIL_ORDER_STATUS,
+        ):
+            return
+        quantities = cls._stock_quantities(
+            line for order_lines in lines.values() for line in order_lines
+        )
+        StockRecord = Line._meta.get_field("stockrecord").related_model
+        if new_status == settings.SUCCESS_ORDER_STATUS:
+            StockRecord.bulk_consume_allocations(quantities)
+        else:
+            StockRecord.bulk_cancel_allocations(quantities)
+
+    def consume_stock_allocations(self):
+        """
+        Consume the stock allocations for all lines of the order.
+        """
+        lines = self._get_status_lines([self], settings.SUCCESS_ORDER_STATUS)
+        self._adjust_stock(lines, settings.SUCCESS_ORDER_STATUS)
+
+    def cancel_stock_allocations(self):
+        """
+        Cancel the stock allocations for all lines of the order.
         """
-        lines = self.lines.all()
-        line_quantities = [line.quantity for line in lines]
-        for line, qty in zip(lines, line_quantities):
-            if line.stockrecord:
-                line.stockrecord.cancel_allocation(qty)
+        lines = self._get_status_lines([self], settings.FAIL_ORDER_STATUS)
+        self._adjust_stock(lines, settings.FAIL_ORDER_STATUS)
 
     def _create_order_status_change(self, old_status, new_status):
         # Not setting the status on the order as that should be handled before
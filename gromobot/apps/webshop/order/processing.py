@@ -67,6 +67,17 @@ class EventHandler(object):
         """
         order.set_status(new_status)
 
+    def handle_order_status_changes(self, orders, new_status):
+        """
+        Handle a requested status change of several orders at once.
+
+        Returns the changed orders and a dict mapping the orders which
+        couldn't be changed to the reason.
+        """
+        if not orders:
+            return [], {}
+        return type(orders[0]).bulk_set_status(orders, new_status)
+
     # Validation methods
     # ------------------
 
@@ -9,7 +9,8 @@ from apps.webshop.communication.tasks import (
     _send_telegram_message_new_order_to_staff,
 )
 from apps.webshop.order.serializers import OrderSerializer
-from apps.webshop.order.signals import order_placed, order_status_changed
+from apps.webshop.order.signals import (bulk_order_status_changed, order_placed,
+                                        order_status_changed)
 from apps.webshop.order.tasks import update_paying_status_after_11_minutes_task
 from django.conf import settings
 from django.dispatch import receiver
@@ -64,7 +65,13 @@ def active_order_created(sender, order, **kwargs):
         _send_telegram_message_new_order_to_staff(ctx)
 
 
+def active_orders_created(sender, orders, **kwargs):
+    for order in orders:
+        active_order_created(sender, order)
+
+
 order_status_changed.connect(active_order_created)
+bulk_order_status_changed.connect(active_orders_created)
 post_checkout.connect(active_order_created)
 
 
@@ -5,6 +5,8 @@ ReportCSVFormatter = get_class("dashboard.reports.reports", "ReportCSVFormatter"
 ReportHTMLFormatter = get_class("dashboard.reports.reports", "ReportHTMLFormatter")
 
 Order = get_model("order", "Order")
+Line = get_model("order", "Line")
+Source = get_model("payment", "Source")
 
 
 class OrderReportCSVFormatter(ReportCSVFormatter):
@@ -28,10 +30,10 @@ class OrderReportCSVFormatter(ReportCSVFormatter):
             row = [
                 order.number,
                 order.user.username if order.user else "-",
-                order.get_items_name,
+                order.items_summary,
                 order.status,
                 order.shipping_method,
-                order.sources.last(),
+                order.last_source or "",
                 order.site,
                 order.total,
                 self.format_datetime(order.date_placed),
@@ -50,7 +52,7 @@ class OrderReportGenerator(ReportGenerator):
     code = "order_report"
     description = "Размещенные заказы"
     date_range_field_name = "date_placed"
-    model_class = Order
+    queryset = Order._default_manager.select_related("user")
 
     formatters = {
         "CSV_formatter": OrderReportCSVFormatter,
@@ -59,7 +61,33 @@ class OrderReportGenerator(ReportGenerator):
 
     def generate(self, *args, **kwargs):
         additional_data = {"start_date": self.start_date, "end_date": self.end_date}
-        return self.formatter.generate_response(self.queryset, **additional_data)
+        return self.formatter.generate_response(self.iter_objects(), **additional_data)
+
+    def prepare_chunk(self, orders):
+        """
+        Set the items summary and the last payment source of every order
+        with one query over the lines and one over the sources.
+        """
+        order_ids = [order.pk for order in orders]
+        items, sources = {}, {}
+        lines = (
+            Line.objects.filter(order_id__in=order_ids)
+            .order_by("order_id", "pk")
+            .values_list("order_id", "name", "quantity")
+        )
+        for order_id, name, quantity in lines:
+            items.setdefault(order_id, []).append(f"{name} ({quantity})")
+        for source in (
+            Source.objects.filter(order_id__in=order_ids)
+            .select_related("source_type")
+            .order_by("pk")
+        ):
+            sources[source.order_id] = source
+
+        for order in orders:
+            order.items_summary = ", ".join(items.get(order.pk, []))
+            order.last_source = sources.get(order.pk)
+        return orders
 
     def is_available_to(self, user):
         return user.is_staff
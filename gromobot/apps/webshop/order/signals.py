@@ -5,3 +5,5 @@ order_placed = django.dispatch.Signal()
 order_status_changed = django.dispatch.Signal()
 
 order_line_status_changed = django.dispatch.Signal()
+
+bulk_order_status_changed = django.dispatch.Signal()
@@ -5,6 +5,7 @@ from apps.webshop.order.signals import order_placed
 from core.loading import get_class, get_model
 from django.conf import settings
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 
 from . import exceptions
 
@@ -12,11 +13,14 @@ Dispatcher = get_class("webshop.communication.utils", "Dispatcher")
 
 Order = get_model("order", "Order")
 Line = get_model("order", "Line")
+LinePrice = get_model("order", "LinePrice")
+LineAttribute = get_model("order", "LineAttribute")
 OrderDiscount = get_model("order", "OrderDiscount")
 OrderLineDiscount = get_model("order", "OrderLineDiscount")
 CommunicationEvent = get_model("order", "CommunicationEvent")
 CommunicationEventType = get_model("communication", "CommunicationEventType")
 Surcharge = get_model("order", "Surcharge")
+StockRecord = get_model("store", "StockRecord")
 
 
 class OrderNumberGenerator(object):
@@ -116,9 +120,9 @@ class OrderCreator(object):
             for voucher in basket.vouchers.all():
                 self.record_voucher_usage(order, voucher, user)
 
-            for line in basket.all_lines():
-                self.create_line_models(order, line)
-                self.update_stock_records(line)
+            lines = basket.all_lines()
+            self.create_lines_models(order, lines)
+            self.update_lines_stock_records(lines)
 
         # Send signal for analytics to pick up
         order_placed.send(sender=self, order=order, user=user)
@@ -185,6 +189,20 @@ class OrderCreator(object):
         You can set extra fields by passing a dictionary as the
         extra_line_fields value
         """
+        line_data = self.get_line_data(order, basket_line, extra_line_fields)
+        order_line = Line._default_manager.create(**line_data)
+        self.create_line_price_models(order, order_line, basket_line)
+        self.create_line_attributes(order, order_line, basket_line)
+        self.create_line_additionals(order, order_line, basket_line)
+        self.create_line_discount_models(order, order_line, basket_line)
+        self.create_additional_line_models(order, order_line, basket_line)
+
+        return order_line
+
+    def get_line_data(self, order, basket_line, extra_line_fields=None):
+        """
+        Return the field values of the order line for a basket line
+        """
         product = basket_line.product
         stockrecord = basket_line.stockrecord
         if not stockrecord:
@@ -218,14 +236,63 @@ class OrderCreator(object):
         if extra_line_fields:
             line_data.update(extra_line_fields)
 
-        order_line = Line._default_manager.create(**line_data)
-        self.create_line_price_models(order, order_line, basket_line)
-        self.create_line_attributes(order, order_line, basket_line)
-        self.create_line_additionals(order, order_line, basket_line)
-        self.create_line_discount_models(order, order_line, basket_line)
-        self.create_additional_line_models(order, order_line, basket_line)
+        return line_data
 
-        return order_line
+    def create_lines_models(self, order, basket_lines, extra_line_fields=None):
+        """
+        Create the order lines together with their prices, attributes and
+        discounts using one bulk insert per model. The related rows come
+        from the per-line ``get_line_*`` builders, override those to change
+        them.
+        """
+        prefetch_related_objects(
+            basket_lines,
+            "stockrecord__store",
+            "attributes__option",
+            "attributes__additional",
+        )
+
+        order_lines = Line._default_manager.bulk_create(
+            [
+                Line(**self.get_line_data(order, basket_line, extra_line_fields))
+                for basket_line in basket_lines
+            ]
+        )
+
+        order_discounts = self.get_order_discounts(order)
+        prices, attributes, discounts = [], [], []
+        for order_line, basket_line in zip(order_lines, basket_lines):
+            prices.extend(self.get_line_prices(order, order_line, basket_line))
+            attributes.extend(self.get_line_attributes(order, order_line, basket_line))
+            attributes.extend(self.get_line_additionals(order, order_line, basket_line))
+            discounts.extend(
+                self.get_line_discounts(order, order_line, basket_line, order_discounts)
+            )
+            self.create_additional_line_models(order, order_line, basket_line)
+
+        LinePrice._default_manager.bulk_create(prices)
+        LineAttribute._default_manager.bulk_create(attributes)
+        OrderLineDiscount._default_manager.bulk_create(discounts)
+
+        return order_lines
+
+    def update_lines_stock_records(self, lines):
+        """
+        Allocate stock for all order lines with one UPDATE
+        """
+        prefetch_related_objects(
+            lines, "product__product_class", "product__parent__product_class"
+        )
+        allocations, stockrecords = {}, {}
+        for line in lines:
+            if not line.product.get_product_class().track_stock:
+                continue
+            stockrecord = stockrecords.setdefault(line.stockrecord.pk, line.stockrecord)
+            # Avoid loading the product again for ``can_track_allocations``
+            stockrecord.product = line.product
+            allocations[stockrecord] = allocations.get(stockrecord, 0) + line.quantity
+
+        StockRecord.bulk_allocate(allocations)
 
     def update_stock_records(self, line):
         """
@@ -234,16 +301,40 @@ class OrderCreator(object):
         if line.product.get_product_class().track_stock:
             line.stockrecord.allocate(line.quantity)
 
-    def create_line_discount_models(self, order, order_line, basket_line):
+    def get_order_discounts(self, order):
+        """
+        Return a dict mapping offer ids to the order discounts
+        """
+        order_discounts = {}
+        for order_discount in order.discounts.all():
+            order_discounts.setdefault(order_discount.offer_id, order_discount)
+        return order_discounts
+
+    def get_line_discounts(self, order, order_line, basket_line, order_discounts=None):
+        """
+        Return the unsaved discount models of the order line
+        """
+        if order_discounts is None:
+            order_discounts = self.get_order_discounts(order)
+        discounts = []
         for discount in basket_line.discounts:
-            order_discount = order.discounts.filter(offer_id=discount.offer.id).first()
+            order_discount = order_discounts.get(discount.offer.id)
             # If we are unable to find the discount we do not care, the total amount is still saved on the discount model,
             # these models are only created so we know how much discount was given per line for each offer
             if order_discount:
-                order_line.discounts.create(
-                    order_discount=order_discount,
-                    amount=discount.amount,
+                discounts.append(
+                    OrderLineDiscount(
+                        line=order_line,
+                        order_discount=order_discount,
+                        amount=discount.amount,
+                    )
                 )
+        return discounts
+
+    def create_line_discount_models(self, order, order_line, basket_line):
+        OrderLineDiscount._default_manager.bulk_create(
+            self.get_line_discounts(order, order_line, basket_line)
+        )
 
     def create_additional_line_models(self, order, order_line, basket_line):
         """
@@ -255,42 +346,76 @@ class OrderCreator(object):
         """
         return
 
-    def create_line_price_models(self, order, order_line, basket_line):
+    def get_line_prices(self, order, order_line, basket_line):
         """
-        Creates the batch line price models
+        Return the unsaved batch line price models
         """
-        breakdown = basket_line.get_price_breakdown()
-        for price, quantity in breakdown:
-            order_line.prices.create(
+        return [
+            LinePrice(
                 order=order,
+                line=order_line,
                 quantity=quantity,
                 price=price,
                 tax_code=basket_line.tax_code,
             )
+            for price, quantity in basket_line.get_price_breakdown()
+        ]
+
+    def create_line_price_models(self, order, order_line, basket_line):
+        """
+        Creates the batch line price models
+        """
+        LinePrice._default_manager.bulk_create(
+            self.get_line_prices(order, order_line, basket_line)
+        )
 
     # pylint: disable=unused-argument
+    def get_line_attributes(self, order, order_line, basket_line):
+        """
+        Return the unsaved option attributes of the order line
+        """
+        return [
+            LineAttribute(
+                line=order_line,
+                option=attr.option,
+                type=attr.option.code,
+                value=attr.value,
+            )
+            for attr in basket_line.attributes.all()
+            if attr.option
+        ]
+
     def create_line_attributes(self, order, order_line, basket_line):
         """
         Creates the batch line attributes.
         """
-        for attr in basket_line.attributes.all():
-            if attr.option:
-                order_line.attributes.create(
-                    option=attr.option, type=attr.option.code, value=attr.value
-                )
+        LineAttribute._default_manager.bulk_create(
+            self.get_line_attributes(order, order_line, basket_line)
+        )
 
     # pylint: disable=unused-argument
+    def get_line_additionals(self, order, order_line, basket_line):
+        """
+        Return the unsaved additional attributes of the order line
+        """
+        return [
+            LineAttribute(
+                line=order_line,
+                additional=attr.additional,
+                type=attr.additional.article,
+                value=attr.value,
+            )
+            for attr in basket_line.attributes.all()
+            if attr.additional
+        ]
+
     def create_line_additionals(self, order, order_line, basket_line):
         """
         Creates the batch line attributes.
         """
-        for attr in basket_line.attributes.all():
-            if attr.additional:
-                order_line.attributes.create(
-                    additional=attr.additional,
-                    type=attr.additional.article,
-                    value=attr.value,
-                )
+        LineAttribute._default_manager.bulk_create(
+            self.get_line_additionals(order, order_line, basket_line)
+        )
 
     def create_discount_model(self, order, discount):
         """
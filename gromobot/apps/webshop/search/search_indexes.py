@@ -1,8 +1,13 @@
+import logging
+
 from core.loading import get_class, get_model
+from core.thumbnails import get_thumbnailer
 from haystack import indexes
 
 Selector = get_class("webshop.store.strategy", "Selector")
 
+logger = logging.getLogger("apps.webshop.search")
+
 
 class ProductIndex(indexes.SearchIndex, indexes.Indexable):
     # Search text
@@ -36,6 +41,13 @@ class ProductIndex(indexes.SearchIndex, indexes.Indexable):
     is_public = indexes.BooleanField(model_attr="is_public")
     structure = indexes.CharField(model_attr="structure")
 
+    # Stored fields used to render search suggestions without the DB. Price
+    # and availability depend on the store and are resolved per request.
+    url = indexes.CharField(null=True, indexed=False)
+    image = indexes.CharField(null=True, indexed=False)
+
+    suggestion_image_size = "x200"
+
     _strategy = None
 
     def get_model(self):
@@ -44,7 +56,19 @@ class ProductIndex(indexes.SearchIndex, indexes.Indexable):
     def index_queryset(self, using=None):
         # Only index browsable products (not each individual child product)
         # return self.get_model().objects.browsable().order_by("-order")
-        return self.get_model().objects.browsable()
+        return self.prepare_queryset(self.get_model().objects.browsable())
+
+    def prepare_queryset(self, queryset):
+        """
+        Preload everything the ``prepare_*`` methods need for a whole chunk
+        of products: the product class, categories and availability.
+        """
+        queryset = queryset.select_related("product_class").prefetch_related(
+            "categories", "images"
+        )
+        return self.get_strategy().annotate_availability(
+            queryset, name="search_is_available"
+        )
 
     def read_queryset(self, using=None):
         return self.get_model().objects.browsable().base_queryset()
@@ -53,12 +77,31 @@ class ProductIndex(indexes.SearchIndex, indexes.Indexable):
         return obj.get_product_class().name
 
     def prepare_category(self, obj):
-        return list(obj.get_categories().values_list("pk", flat=True)) or []
+        return [category.pk for category in obj.get_categories()]
 
     def prepare_category_name(self, obj):
-        return " ".join(obj.get_categories().values_list("name", flat=True) or [])
+        return " ".join(category.name for category in obj.get_categories())
+
+    def prepare_url(self, obj):
+        return obj.get_absolute_url()
+
+    def prepare_image(self, obj):
+        image = obj.primary_image()
+        if isinstance(image, dict):
+            return None
+        try:
+            thumbnail = get_thumbnailer().generate_thumbnail(
+                image.original, size=self.suggestion_image_size, upscale=False
+            )
+        except Exception as e:
+            logger.error(f"{e} при создании миниатюры товара #{obj.pk}")
+            return None
+        return thumbnail.url
 
     def prepare_is_available(self, obj):
+        is_available = getattr(obj, "search_is_available", None)
+        if is_available is not None:
+            return is_available
         strategy = self.get_strategy()
         return strategy.is_available(obj)
 
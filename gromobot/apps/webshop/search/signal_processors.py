@@ -0,0 +1,124 @@
+import threading
+
+from celery.signals import task_postrun
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import models, transaction
+from haystack.exceptions import NotHandled
+from haystack.signals import BaseSignalProcessor
+
+_local = threading.local()
+
+
+class QueuedSignalProcessor(BaseSignalProcessor):
+    """
+    Collects saved and deleted indexed objects and updates the search
+    index once the transaction commits.
+
+    Repeated saves of the same object are collapsed into one update and the
+    updates are written to the index in batches by a Celery task, so mass
+    saves (e.g. Evotor product sync) don't open the index for every object.
+
+    Inside a transaction one flush is scheduled on commit. Saves outside a
+    transaction are collected until ``SEARCH_INDEX_BATCH_SIZE`` objects are
+    pending or the request or Celery task finishes. Objects left pending by
+    a rolled back transaction are flushed too, which is harmless as the
+    index task re-reads every object from the database.
+    """
+
+    def setup(self):
+        models.signals.post_save.connect(self.handle_save)
+        models.signals.post_delete.connect(self.handle_delete)
+        models.signals.post_save.connect(
+            self.handle_stockrecord_save, sender="store.StockRecord"
+        )
+        request_finished.connect(self.handle_finished)
+        task_postrun.connect(self.handle_finished)
+
+    def teardown(self):
+        models.signals.post_save.disconnect(self.handle_save)
+        models.signals.post_delete.disconnect(self.handle_delete)
+        models.signals.post_save.disconnect(
+            self.handle_stockrecord_save, sender="store.StockRecord"
+        )
+        request_finished.disconnect(self.handle_finished)
+        task_postrun.disconnect(self.handle_finished)
+
+    def handle_stockrecord_save(self, sender, instance, **kwargs):
+        """
+        Price and availability are stored in the index, so reindex the
+        (parent) product when one of its stockrecords changes.
+        """
+        product = instance.product
+        if product.is_child:
+            product = product.parent
+        self.enqueue(product.__class__, product, "update")
+
+    def handle_save(self, sender, instance, **kwargs):
+        self.enqueue(sender, instance, "update")
+
+    def handle_delete(self, sender, instance, **kwargs):
+        self.enqueue(sender, instance, "remove")
+
+    def handle_finished(self, sender=None, **kwargs):
+        self.flush()
+
+    def is_indexed(self, sender):
+        for using in self.connection_router.for_write(sender=sender):
+            try:
+                self.connections[using].get_unified_index().get_index(sender)
+                return True
+            except NotHandled:
+                continue
+        return False
+
+    def enqueue(self, sender, instance, action):
+        if not self.is_indexed(sender):
+            return
+
+        in_transaction = transaction.get_connection().in_atomic_block
+        if not in_transaction:
+            # A flush scheduled by a transaction which didn't run was
+            # dropped by a rollback
+            _local.scheduled = False
+
+        pending = getattr(_local, "pending", None)
+        if pending is None:
+            pending = _local.pending = {}
+        model_actions = pending.setdefault(
+            sender._meta.label, {"update": set(), "remove": set()}
+        )
+        other = "remove" if action == "update" else "update"
+        model_actions[other].discard(instance.pk)
+        model_actions[action].add(instance.pk)
+
+        if in_transaction:
+            if not getattr(_local, "scheduled", False):
+                _local.scheduled = True
+                transaction.on_commit(self.flush)
+        elif self.count_pending() >= settings.SEARCH_INDEX_BATCH_SIZE:
+            self.flush()
+
+    def count_pending(self):
+        return sum(
+            len(model_actions["update"]) + len(model_actions["remove"])
+            for model_actions in (getattr(_local, "pending", None) or {}).values()
+        )
+
+    def flush(self):
+        from apps.webshop.search.tasks import update_search_index_task
+
+        pending = getattr(_local, "pending", None) or {}
+        _local.pending = None
+        _local.scheduled = False
+
+        for model_label, model_actions in pending.items():
+            args = (
+                model_label,
+                list(model_actions["update"]),
+                list(model_actions["remove"]),
+            )
+            if settings.CELERY:
+                update_search_index_task.delay(*args)
+            else:
+                update_search_index_task(*args)
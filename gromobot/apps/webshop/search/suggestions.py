@@ -0,0 +1,112 @@
+import hashlib
+import threading
+
+from apps.webshop.templatetags.currency_filters import currency
+from django.conf import settings
+from django.core.cache import cache
+from haystack.query import SearchQuerySet
+
+
+class Suggestions:
+    """
+    Search suggestions served from stored index fields only.
+
+    Results are cached for a short time under the normalised query, and
+    concurrent requests for the same query within a process share one
+    backend search. Prices and availability differ per store, so they are
+    added to the cached results per request from the store's stock
+    snapshot.
+    """
+
+    cache_prefix = "search_suggestions_store"
+    max_results = 20
+
+    _inflight = {}
+    _lock = threading.Lock()
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or settings.SEARCH_SUGGESTIONS_CACHE_TIMEOUT
+
+    @staticmethod
+    def normalize_query(query):
+        return " ".join(query.lower().split())
+
+    def get_cache_key(self, query):
+        digest = hashlib.md5(query.encode("utf-8")).hexdigest()
+        return "%s_%s" % (self.cache_prefix, digest)
+
+    def get(self, query, strategy=None):
+        results = self.get_results(query)
+        if strategy is not None:
+            results = self.add_purchase_info(results, strategy)
+        return results
+
+    def get_results(self, query):
+        query = self.normalize_query(query)
+        if not query:
+            return []
+
+        key = self.get_cache_key(query)
+        results = cache.get(key)
+        if results is not None:
+            return results
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._inflight[key] = {"event": threading.Event()}
+
+        if not is_leader:
+            # Another thread is already searching for the same query
+            if flight["event"].wait(settings.SEARCH_SUGGESTIONS_WAIT_TIMEOUT):
+                if "results" in flight:
+                    return flight["results"]
+            return self.search(query)
+
+        try:
+            results = flight["results"] = self.search(query)
+            cache.set(key, results, self.timeout)
+            return results
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight["event"].set()
+
+    def search(self, query):
+        sqs = SearchQuerySet().auto_query(query_string=query, fieldname="name")
+        return [
+            self.serialize(result)
+            for result in sqs[: self.max_results]
+            if result.structure in ["parent", "standalone"]
+        ]
+
+    def serialize(self, result):
+        return {
+            "id": int(result.pk),
+            "name": result.name_exact,
+            "url": result.url,
+            "image": result.image,
+            "price": None,
+            "is_parent": result.structure == "parent",
+            "is_available": False,
+        }
+
+    def add_purchase_info(self, results, strategy):
+        """
+        Return copies of *results* with the price and availability of the
+        strategy's store.
+        """
+        grouped = strategy.stockrecords_for_ids([result["id"] for result in results])
+        with_info = []
+        for result in results:
+            stockrecords = grouped.get(result["id"], [])
+            prices = [sr.price for sr in stockrecords if sr.price is not None]
+            with_info.append(
+                dict(
+                    result,
+                    price=currency(min(prices)) if prices else None,
+                    is_available=bool(stockrecords),
+                )
+            )
+        return with_info
@@ -0,0 +1,47 @@
+import logging
+
+from celery import shared_task
+from django.apps import apps
+from django.conf import settings
+from haystack import connection_router, connections
+from haystack.exceptions import NotHandled
+from haystack.utils import get_model_ct
+
+logger = logging.getLogger("apps.webshop.search")
+
+
+@shared_task
+def update_search_index_task(model_label, update_pks=(), remove_pks=()):
+    """
+    Обновляет поисковый индекс для переданных объектов.
+
+    Objects are loaded through the index queryset in chunks of
+    ``SEARCH_INDEX_BATCH_SIZE`` and every chunk is written to the index in
+    one go. Objects that left the index queryset are removed from the index.
+    Removed objects are checked as well, so objects queued by a rolled back
+    transaction are just brought in line with the database.
+    """
+    model = apps.get_model(model_label)
+    batch_size = settings.SEARCH_INDEX_BATCH_SIZE
+
+    for using in connection_router.for_write(model=model):
+        try:
+            index = connections[using].get_unified_index().get_index(model)
+        except NotHandled:
+            continue
+        backend = connections[using].get_backend()
+
+        stale_pks = set()
+        update_pks = list(update_pks) + list(remove_pks)
+        for start in range(0, len(update_pks), batch_size):
+            chunk_pks = update_pks[start : start + batch_size]
+            objects = list(index.index_queryset(using=using).filter(pk__in=chunk_pks))
+            if objects:
+                backend.update(index, objects)
+            stale_pks.update(set(chunk_pks) - {obj.pk for obj in objects})
+
+        for pk in stale_pks:
+            try:
+                backend.remove("%s.%s" % (get_model_ct(model), pk))
+            except Exception as e:
+                logger.error(f"{e} при удалении {model_label} #{pk} из индекса")
@@ -3,14 +3,14 @@ from urllib.parse import quote
 
 from core.loading import get_class, get_model
 from django.contrib import messages
-from django.core.cache import cache
 from django.http import Http404, HttpResponsePermanentRedirect
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import redirect
 
 BrowseCategoryForm = get_class("webshop.search.forms", "BrowseCategoryForm")
 CategoryForm = get_class("webshop.search.forms", "CategoryForm")
 BaseSearchView = get_class("webshop.search.views.base", "BaseSearchView")
 PageTitleMixin = get_class("webshop.mixins", "PageTitleMixin")
+CategoryTree = get_class("catalogue.tree", "CategoryTree")
 
 Category = get_model("catalogue", "Category")
 
@@ -75,15 +75,11 @@ class ProductCategoryView(PageTitleMixin, BaseSearchView):
                 return HttpResponsePermanentRedirect(expected_path)
 
     def get_category(self):
-        """Получает категорию из кеша или БД, используя slug из URL."""
-        cache_key = f"category_{self.kwargs['category_slug']}"
-        category = cache.get(cache_key)
-
+        """Получает категорию из дерева категорий, используя slug из URL."""
+        slug = self.kwargs["category_slug"].split(Category._slug_separator)[-1]
+        category = CategoryTree.get().get_by_slug(slug)
         if category is None:
-            slug = self.kwargs["category_slug"].split(Category._slug_separator)[-1]
-            category = get_object_or_404(Category, slug=slug)
-            cache.set(cache_key, category, timeout=3600)
-
+            raise Http404()
         return category
 
     def get_context_data(self, **kwargs):
@@ -4,7 +4,6 @@ from django import http
 # from django.template.response import TemplateResponse
 from django.template.loader import render_to_string
 from django.views.generic import TemplateView
-from haystack.query import SearchQuerySet
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
@@ -14,6 +13,7 @@ PageTitleMixin, ThemeMixin = get_classes(
 )
 SearchForm = get_class("webshop.search.forms", "SearchForm")
 BaseSearchView = get_class("webshop.search.views.base", "BaseSearchView")
+Suggestions = get_class("webshop.search.suggestions", "Suggestions")
 
 
 class FacetedSearchView(ThemeMixin, BaseSearchView):
@@ -58,29 +58,16 @@ class SuggestionsView(APIView, BaseSearchView):
     permission_classes = [AllowAny]
 
     def post(self, request, *args, **kwargs):
-        dfuery_string = request.POST.get("q", "")
-        sqs = SearchQuerySet().auto_query(
-            query_string=request.POST.get("q", ""), fieldname="name"
-        )[:20]
-
-        products = []
-        for prd in sqs:
-            if prd.structure in ["parent", "standalone"]:
-                products.append(prd._get_object())
-
-        context = {
-            "query": request.POST.get("q", ""),
-            "object_list": products,
-        }
+        query = request.POST.get("q", "")
 
         user_search.send(
             sender=self,
             session=self.request.session,
             user=self.request.user,
-            query=dfuery_string,
+            query=query,
         )
 
-        res = render_to_string(
-            "search/results.html", context, request=self.request
+        return http.JsonResponse(
+            {"query": query, "results": Suggestions().get(query, request.strategy)},
+            status=200,
         )
-        return http.JsonResponse({"results": res}, status=200)
@@ -12,6 +12,8 @@ class ShippingConfig(Config):
 
     # pylint: disable=attribute-defined-outside-init, W0611, W0201
     def ready(self):
+        from . import receivers
+
         self.order_now_view = get_class("webshop.shipping.views", "OrderNowView")
         self.order_later_view = get_class("webshop.shipping.views", "OrderLaterView")
         self.shipping_zones_view = get_class(
@@ -1,14 +1,114 @@
+import hashlib
 import json
+import re
+import threading
+import time
 import typing
+from collections import OrderedDict
 from decimal import Decimal
 from typing import List
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
 
 from .exceptions import InvalidKey, UnexpectedResponse
 from .utils import unix_time
 
+_local = threading.local()
+
+
+def get_session() -> requests.Session:
+    """
+    Return a pooled HTTP session for the map clients. Sessions are kept
+    per thread, so keep-alive connections are reused between requests.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=1)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session = session
+    return session
+
+
+class GeocodeCache:
+    """
+    Two level geocode cache: a small in-process LRU in front of the
+    configured Django cache backend. Entries are keyed on the normalised
+    address or on coordinates rounded to ~10 meters and expire after
+    ``GEOCODE_CACHE_TIMEOUT`` seconds. Responses without a result expire
+    after ``GEOCODE_EMPTY_CACHE_TIMEOUT``, so a temporary miss doesn't stick.
+    """
+
+    prefix = "geocode"
+    coords_precision = 4
+
+    _memory = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, timeout=None, max_size=None, empty_timeout=None):
+        self.timeout = timeout or settings.GEOCODE_CACHE_TIMEOUT
+        self.empty_timeout = empty_timeout or settings.GEOCODE_EMPTY_CACHE_TIMEOUT
+        self.max_size = max_size or settings.GEOCODE_CACHE_SIZE
+
+    @staticmethod
+    def normalize_address(address: str) -> str:
+        return " ".join(re.sub(r"[^\w\s]", " ", address.lower()).split())
+
+    def make_key(self, provider, address=None, coords=None) -> str:
+        if coords:
+            lookup = "%s,%s" % tuple(
+                round(float(crd), self.coords_precision) for crd in coords[:2]
+            )
+        else:
+            lookup = self.normalize_address(address)
+        digest = hashlib.md5(lookup.encode("utf-8")).hexdigest()
+        return "%s_%s_%s" % (self.prefix, provider, digest)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+        value = cache.get(key)
+        if value is not None:
+            self._remember(key, value)
+        return value
+
+    def set(self, key, value, timeout=None):
+        timeout = timeout or self.timeout
+        cache.set(key, value, timeout)
+        self._remember(key, value, timeout)
+
+    def _remember(self, key, value, timeout=None):
+        with self._lock:
+            self._memory[key] = (time.monotonic() + (timeout or self.timeout), value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def get_or_fetch(self, key, fetch, has_result=bool):
+        """
+        Return the cached response for *key* or *fetch* it. *has_result*
+        tells responses with a result from "nothing found" ones.
+        """
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            if value:
+                timeout = self.timeout if has_result(value) else self.empty_timeout
+                self.set(key, value, timeout)
+        return value
+
 
 class YandexMap:
     """Yandex geocoder API client.
@@ -30,11 +130,17 @@ class YandexMap:
 
     def __init__(self, api_key=None):
         self.api_key = api_key or settings.YANDEX_API_KEY
+        self.geocode_cache = GeocodeCache()
 
     def _make_request(self, url: str, params: dict) -> dict:
         """Helper method to handle HTTP requests."""
         params.update({"apikey": self.api_key})
-        response = requests.get(url, params=params)
+        try:
+            response = get_session().get(
+                url, params=params, timeout=settings.MAP_REQUEST_TIMEOUT
+            )
+        except requests.exceptions.RequestException as err:
+            raise UnexpectedResponse(f"Request error: {err}")
 
         if response.status_code == 200:
             return response.json()
@@ -77,7 +183,10 @@ class YandexMap:
             "results": 1,
             "lang": "ru_RU",
         }
-        return self._make_request(self.BASE_URL, params)
+        key = self.geocode_cache.make_key("yandex", address=address)
+        return self.geocode_cache.get_or_fetch(
+            key, lambda: self._make_request(self.BASE_URL, params), self.exact
+        )
 
     def coordinates(self, geoObject) -> tuple:
         """Extract coordinates (longitude, latitude) from geoObject."""
@@ -125,6 +234,7 @@ class GISMap:
 
     def __init__(self, api_key=None):
         self.api_key = api_key or settings.GIS_API_KEY
+        self.geocode_cache = GeocodeCache()
 
     def geocode(
         self,
@@ -142,7 +252,10 @@ class GISMap:
             params["q"] = address
         else:
             raise ValueError("Необходимо указать либо адрес, либо координаты.")
-        return self._send_request(self.GEOCODE_URL, params)
+        key = self.geocode_cache.make_key("2gis", address=address, coords=coords)
+        return self.geocode_cache.get_or_fetch(
+            key, lambda: self._send_request(self.GEOCODE_URL, params), self.exact
+        )
 
     def routing(
         self,
@@ -198,10 +311,14 @@ class GISMap:
         """Отправка HTTP-запроса."""
         params.update({"key": self.api_key})
         try:
+            session = get_session()
+            timeout = settings.MAP_REQUEST_TIMEOUT
             if method == "get":
-                response = requests.get(url, params=params)
+                response = session.get(url, params=params, timeout=timeout)
             elif method == "post":
-                response = requests.post(url, params=params, data=json.dumps(data))
+                response = session.post(
+                    url, params=params, data=json.dumps(data), timeout=timeout
+                )
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as err:
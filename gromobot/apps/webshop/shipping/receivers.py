@@ -1,7 +1,9 @@
 from apps.webshop.shipping.tasks import update_shipping_zones_jsons_task
+from apps.webshop.shipping.zones import bump_zones_version
 from core.loading import get_model
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 
@@ -18,3 +20,13 @@ def update_shipping_zones_jsons(sender, instance, created, **kwargs):
         update_shipping_zones_jsons_task.delay()
     else:
         update_shipping_zones_jsons_task.delay()
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=ShippingZona)
+@receiver(post_delete, sender=ShippingZona)
+def invalidate_shipping_zones_index(sender, instance, **kwargs):
+    """
+    Rebuild the in-memory zones index of every process on next lookup
+    """
+    transaction.on_commit(bump_zones_version)
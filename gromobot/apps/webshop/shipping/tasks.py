@@ -1,6 +1,8 @@
 import json
+from apps.webshop.shipping.zones import parse_coords
 from celery import shared_task
 from django.conf import settings
+from django.db.models import Q
 from core.loading import get_model
 
 ShippingZona = get_model("shipping", "ShippingZona")
@@ -15,13 +17,6 @@ def update_shipping_zones_jsons_task():
     user_zones_list = []
     admin_zones_list = []
 
-    # Вспомогательная функция для преобразования строк координат в список кортежей
-    def parse_coords(coord_string):
-        return [
-            tuple(map(float, crd.replace("]", "").replace("[", "").split(",")))
-            for crd in coord_string.split("],")
-        ]
-
     # Вспомогательная функция для создания JSON объектов зоны
     def create_feature(zona, coords, is_admin=False):
         properties = {
@@ -65,3 +60,46 @@ def update_shipping_zones_jsons_task():
     ) as admin_file:
         json.dump(user_json, user_file)
         json.dump(admin_json, admin_file)
+
+
+@shared_task
+def geocode_user_addresses_task(chunk_size=100):
+    """
+    Backfill coordinates of saved user addresses. Geocoder responses go
+    through the geocode cache, so repeated addresses cost one request.
+    """
+    from apps.webshop.shipping.maps import Map
+    from apps.webshop.shipping.exceptions import MapError
+
+    UserAddress = get_model("address", "UserAddress")
+
+    map = Map()
+    addresses = (
+        UserAddress.objects.filter(line1__isnull=False)
+        .exclude(line1="")
+        .filter(Q(coords_lat__isnull=True) | Q(coords_long__isnull=True))
+        .only("id", "line1", "coords_lat", "coords_long")
+    )
+
+    updated = 0
+    batch = []
+    for address in addresses.iterator(chunk_size=chunk_size):
+        try:
+            coords = map.coordinates(map.geocode(address=address.line1))
+        except MapError:
+            continue
+        if not coords:
+            continue
+
+        address.coords_lat, address.coords_long = coords[0], coords[1]
+        batch.append(address)
+        if len(batch) >= chunk_size:
+            updated += len(batch)
+            UserAddress.objects.bulk_update(batch, ["coords_lat", "coords_long"])
+            batch = []
+
+    if batch:
+        updated += len(batch)
+        UserAddress.objects.bulk_update(batch, ["coords_lat", "coords_long"])
+
+    return updated
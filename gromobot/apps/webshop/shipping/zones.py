@@ -1,54 +1,118 @@
-from decimal import Decimal as D
+import threading
+import time
 
 from core.loading import get_model
+from django.conf import settings
+from django.core.cache import cache
+from shapely import STRtree
 from shapely.geometry import Point, Polygon
+from shapely.prepared import prep
 
 ShippingZona = get_model("shipping", "ShippingZona")
 
+ZONES_VERSION_KEY = "shipping_zones_version"
+
+
+def bump_zones_version():
+    """Invalidate the zone index of every process."""
+    cache.set(ZONES_VERSION_KEY, time.time_ns(), None)
+
+
+def get_zones_version():
+    return cache.get_or_set(ZONES_VERSION_KEY, 0, None)
+
+
+def parse_coords(coord_string):
+    """
+    Parse "[[55.730719,37.583146],[55.719093,37.677903]]" into a list
+    of (lat, long) tuples.
+    """
+    return [
+        tuple(map(float, crd.replace("]", "").replace("[", "").split(",")))
+        for crd in coord_string.replace("][", "],[").split("],")
+    ]
+
+
+class ZonesIndex:
+    """
+    In-memory spatial index of the visible shipping zones.
+
+    Polygons are prepared and packed into an STRtree once, so a lookup is
+    a tree query plus a prepared ``contains`` check. The index also keeps
+    the zone rows, so charge and min order lookups don't hit the DB.
+    """
+
+    def __init__(self, zones, version):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.zones = {zona.id: zona for zona in zones}
+        self.zone_ids = list(self.zones)
+        polygons = [Polygon(parse_coords(zona.coords)) for zona in self.zones.values()]
+        self.prepared = [prep(polygon) for polygon in polygons]
+        self.tree = STRtree(polygons)
+
+    def is_stale(self, version):
+        return (
+            self.version != version
+            or time.monotonic() - self.built_at >= settings.SHIPPING_ZONES_MAX_AGE
+        )
+
+    def get_zona_id(self, coords):
+        point = Point(float(coords[0]), float(coords[1]))
+        for idx in sorted(self.tree.query(point)):
+            if self.prepared[idx].contains(point):
+                return self.zone_ids[idx]
+        return 0
+
+    def get_available_zona(self, zona_id):
+        try:
+            zona = self.zones.get(int(zona_id))
+        except (TypeError, ValueError):
+            return None
+        if zona is None or not zona.isAvailable:
+            return None
+        return zona
+
 
 class ZonesUtils:
 
-    _zones = None
-    _available_zones = None
-    _zones_polygon = None
+    _index = None
+    _lock = threading.Lock()
 
     def zones(self):
-        if self._zones is None:
-            self._zones = ShippingZona.objects.filter(isHide=False)
-        return self._zones
+        return ShippingZona.objects.filter(isHide=False)
 
     def available_zones(self):
         """Return list of available shipping zones."""
-        if self._available_zones is None:
-            self._available_zones = ShippingZona.objects.filter(
-                isHide=False, isAvailable=True
-            )
-        return self._available_zones
+        return ShippingZona.objects.filter(isHide=False, isAvailable=True)
+
+    @classmethod
+    def index(cls):
+        """
+        Return the process-wide zone index, rebuilding it when the zones
+        version in the cache has changed or the index is older than
+        ``SHIPPING_ZONES_MAX_AGE`` seconds.
+        """
+        version = get_zones_version()
+        index = cls._index
+        if index is None or index.is_stale(version):
+            with cls._lock:
+                index = cls._index
+                if index is None or index.is_stale(version):
+                    zones = ShippingZona.objects.filter(isHide=False)
+                    index = cls._index = ZonesIndex(zones, version)
+        return index
 
     def zones_polygon(self):
-        if self._zones_polygon is None:
-            self._zones_polygon = {
-                zona.id: Polygon(
-                    [
-                        (D(coord.split(",")[0]), D(coord.split(",")[1]))
-                        for coord in zona.coords.replace("][", "],[").split("],")
-                    ]
-                )
-                for zona in self.zones()
-            }
-
-        return self._zones_polygon
+        index = self.index()
+        return {
+            zona_id: prepared.context
+            for zona_id, prepared in zip(index.zone_ids, index.prepared)
+        }
 
     def get_zona_id(self, coords) -> int:
         """Получает координы обекта, возвращает id зоны доставки, либо 0, если адрес вне зоны доставки"""
-        polygon_zones = self.zones_polygon()
-        coords_point = Point(coords[0], coords[1])
-
-        for zonaId, zona in polygon_zones.items():
-            if coords_point.within(zona):
-                return zonaId
-
-        return 0
+        return self.index().get_zona_id(coords)
 
     # helpers calculate
 
@@ -75,7 +139,4 @@ class ZonesUtils:
 
     # Общий метод для получения зоны
     def _get_zona(self, zona_id):
-        try:
-            return self.available_zones().get(number=zona_id)
-        except ShippingZona.DoesNotExist:
-            return None
+        return self.index().get_available_zona(zona_id)
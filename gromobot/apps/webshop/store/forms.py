@@ -1,8 +1,5 @@
-from core.loading import get_model
+from apps.webshop.store.registry import StoreRegistry
 from django import forms
-from django.core.cache import cache
-
-Store = get_model("store", "Store")
 
 
 class StoreSelectForm(forms.Form):
@@ -17,11 +14,7 @@ class StoreSelectForm(forms.Form):
         self.set_initail_stores()
 
     def set_initail_stores(self):
-        self.stores = cache.get_or_set(
-            "stores",
-            lambda: Store.objects.prefetch_related("address", "users").all(),
-            7200,
-        )
+        self.stores = StoreRegistry.all()
         self.fields["store_id"].choices = [
             (store.id, store.name) for store in self.stores if store.is_active
         ]
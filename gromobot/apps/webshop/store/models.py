@@ -5,7 +5,7 @@ from core.compat import AUTH_USER_MODEL
 from core.models.fields import AutoSlugField
 from core.utils import get_default_currency
 from django.db import models, router
-from django.db.models import F, signals
+from django.db.models import Case, F, IntegerField, Value, When, signals
 from django.db.models.functions import Coalesce, Least
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -366,6 +366,101 @@ class StockRecord(models.Model):
 
     allocate.alters_data = True
 
+    @classmethod
+    def bulk_allocate(cls, allocations):
+        """
+        Record stock allocations for several stockrecords at once.
+
+        ``allocations`` maps stockrecords to the quantity to allocate. Only
+        stockrecords tracking stock are touched, with a single conditional
+        UPDATE, after which the usual save signals are sent for each of them.
+        """
+        cls._bulk_adjust(
+            allocations,
+            lambda delta: {"num_allocated": Coalesce(F("num_allocated"), 0) + delta},
+        )
+
+    bulk_allocate.alters_data = True
+
+    @classmethod
+    def bulk_consume_allocations(cls, consumptions):
+        """
+        Consume previous allocations of several stockrecords at once.
+
+        ``consumptions`` maps stockrecords to the quantity to consume. If any
+        of the consumptions isn't possible, nothing is changed.
+        """
+        for stockrecord, quantity in consumptions.items():
+            if (
+                stockrecord.can_track_allocations
+                and not stockrecord.is_allocation_consumption_possible(quantity)
+            ):
+                raise InvalidStockAdjustment("Неверный запрос товарного запаса")
+        cls._bulk_adjust(
+            consumptions,
+            lambda delta: {
+                "num_allocated": Coalesce(F("num_allocated"), 0) - delta,
+                "num_in_stock": Coalesce(F("num_in_stock"), 0) - delta,
+            },
+        )
+
+    bulk_consume_allocations.alters_data = True
+
+    @classmethod
+    def bulk_cancel_allocations(cls, cancellations):
+        """
+        Cancel allocations of several stockrecords at once.
+        """
+        cls._bulk_adjust(
+            cancellations,
+            lambda delta: {
+                "num_allocated": Coalesce(F("num_allocated"), 0)
+                - Least(Coalesce(F("num_allocated"), 0), delta),
+            },
+        )
+
+    bulk_cancel_allocations.alters_data = True
+
+    @classmethod
+    def _bulk_adjust(cls, quantities, get_updates):
+        """
+        Apply the stock changes returned by ``get_updates`` for the per
+        stockrecord quantity expression with one UPDATE, refresh the changed
+        fields and send the save signals.
+        """
+        quantities = {
+            stockrecord: quantity
+            for stockrecord, quantity in quantities.items()
+            if stockrecord.can_track_allocations
+        }
+        if not quantities:
+            return
+
+        for stockrecord in quantities:
+            stockrecord.pre_save_signal()
+
+        delta = Case(
+            *[
+                When(pk=stockrecord.pk, then=Value(quantity))
+                for stockrecord, quantity in quantities.items()
+            ],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        updates = get_updates(delta)
+        pks = [stockrecord.pk for stockrecord in quantities]
+        cls.objects.filter(pk__in=pks).update(**updates)
+
+        # Make sure the current objects are up-to-date
+        refreshed = {
+            row["pk"]: row
+            for row in cls.objects.filter(pk__in=pks).values("pk", *updates)
+        }
+        for stockrecord in quantities:
+            for field in updates:
+                setattr(stockrecord, field, refreshed[stockrecord.pk][field])
+            stockrecord.post_save_signal()
+
     def is_allocation_consumption_possible(self, quantity):
         """
         Test if a proposed stock consumption is permitted
@@ -1,7 +1,14 @@
-from core.loading import get_model
-from django.db.models.signals import post_save
+from apps.evotor.signals import update_evotor_stockrecord
+from apps.webshop.store.registry import bump_stores_version
+from core.loading import get_class, get_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
+StockSnapshot = get_class("webshop.store.snapshot", "StockSnapshot")
+
+Store = get_model("store", "Store")
+StoreAddress = get_model("store", "StoreAddress")
 StockAlert = get_model("store", "StockAlert")
 StockRecord = get_model("store", "StockRecord")
 
@@ -24,3 +31,45 @@ def update_stock_alerts(sender, instance, created, **kwargs):
         StockAlert.objects.create(stockrecord=stockrecord)
     elif not stockrecord.is_below_threshold and alert:
         alert.close()
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=StockRecord)
+@receiver(post_delete, sender=StockRecord)
+def invalidate_stock_snapshot(sender, instance, **kwargs):
+    """
+    Bump the store's stock snapshot on every stockrecord write. Allocations
+    send post_save manually, so they are covered as well.
+    """
+    if kwargs.get("raw", False):
+        return
+    StockSnapshot(instance.store_id).bump()
+
+
+# pylint: disable=unused-argument
+@receiver(update_evotor_stockrecord)
+def invalidate_product_stock_snapshots(sender, product_id, **kwargs):
+    """
+    Stockrecords synced with Evotor may be written in bulk, so bump every
+    store holding the product.
+    """
+    store_ids = StockRecord.objects.filter(
+        product_id=product_id
+    ).values_list("store_id", flat=True)
+    for store_id in store_ids:
+        StockSnapshot(store_id).bump()
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=Store)
+@receiver(post_delete, sender=Store)
+@receiver(post_save, sender=StoreAddress)
+@receiver(post_delete, sender=StoreAddress)
+@receiver(m2m_changed, sender=Store.users.through)
+def invalidate_store_registry(sender, **kwargs):
+    """
+    Reload the in-process store registry of every process on next lookup
+    """
+    if kwargs.get("raw", False):
+        return
+    transaction.on_commit(bump_stores_version)
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from core.loading import get_model
+from django.conf import settings
+from django.core.cache import cache
+
+Store = get_model("store", "Store")
+
+STORES_VERSION_KEY = "stores_version"
+
+
+def bump_stores_version():
+    """Invalidate the store registry of every process."""
+    cache.set(STORES_VERSION_KEY, time.time_ns(), None)
+
+
+def get_stores_version():
+    return cache.get_or_set(STORES_VERSION_KEY, 0, None)
+
+
+class StoreRegistry:
+    """
+    Process-wide registry of stores with their addresses and staff.
+
+    Stores change rarely and are looked up on almost every request, so
+    they are loaded once per process and reloaded when the stores version
+    in the cache has changed. The registry is also reloaded after
+    ``STORE_REGISTRY_MAX_AGE`` seconds, as the version only reaches other
+    processes through a shared cache.
+    """
+
+    _stores = None
+    _version = None
+    _loaded_at = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def is_stale(cls, version):
+        return (
+            cls._stores is None
+            or cls._version != version
+            or time.monotonic() - cls._loaded_at >= settings.STORE_REGISTRY_MAX_AGE
+        )
+
+    @classmethod
+    def stores(cls):
+        version = get_stores_version()
+        stores = cls._stores
+        if cls.is_stale(version):
+            with cls._lock:
+                stores = cls._stores
+                if cls.is_stale(version):
+                    stores = {
+                        store.id: store
+                        for store in Store.objects.select_related(
+                            "address"
+                        ).prefetch_related("users")
+                    }
+                    cls._stores, cls._version = stores, version
+                    cls._loaded_at = time.monotonic()
+        return stores
+
+    @classmethod
+    def get(cls, store_id):
+        try:
+            return cls.stores().get(int(store_id))
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def all(cls):
+        return list(cls.stores().values())
+
+    @classmethod
+    def active(cls):
+        return [store for store in cls.stores().values() if store.is_active]
@@ -0,0 +1,123 @@
+import time
+
+from core.loading import get_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+StockRecord = get_model("store", "StockRecord")
+
+
+class StockSnapshot:
+    """
+    Versioned per-store snapshot of stockrecord prices and stock levels.
+
+    The snapshot is kept in the configured cache backend under a key that
+    contains the store's current version. Any stockrecord change bumps the
+    version, so the next reader rebuilds the snapshot from the database and
+    stale entries simply expire.
+    """
+
+    version_key_template = "stock_snapshot_version_%s"
+    snapshot_key_template = "stock_snapshot_%s_%s"
+    timeout = 3600
+
+    fields = (
+        "id",
+        "product_id",
+        "store_id",
+        "evotor_code",
+        "price_currency",
+        "price",
+        "old_price",
+        "num_in_stock",
+        "num_allocated",
+        "is_public",
+        "date_updated",
+    )
+
+    def __init__(self, store_id):
+        self.store_id = store_id
+
+    @property
+    def version_key(self):
+        return self.version_key_template % self.store_id
+
+    def get_version(self):
+        return cache.get_or_set(self.version_key, 1, None)
+
+    def bump(self):
+        """
+        Invalidate the snapshot once the current transaction commits, so
+        readers never rebuild it from uncommitted data.
+        """
+        transaction.on_commit(self._bump)
+
+    def _bump(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, time.time_ns(), None)
+
+    def get(self):
+        """
+        Return a dict with two mappings:
+
+        - ``stockrecords``: product id -> stockrecord field values
+        - ``children``: parent product id -> list of child product ids
+        """
+        snapshot_key = self.snapshot_key_template % (self.store_id, self.get_version())
+        snapshot = cache.get(snapshot_key)
+        if snapshot is None:
+            snapshot = self.build()
+            cache.set(snapshot_key, snapshot, self.timeout)
+        return snapshot
+
+    def build(self):
+        rows = (
+            StockRecord.objects.filter(store_id=self.store_id)
+            .annotate(
+                track_stock=Coalesce(
+                    F("product__product_class__track_stock"),
+                    F("product__parent__product_class__track_stock"),
+                    Value(False),
+                ),
+                parent_id=F("product__parent_id"),
+            )
+            .values(*self.fields, "track_stock", "parent_id")
+        )
+
+        stockrecords, children = {}, {}
+        for row in rows:
+            parent_id = row.pop("parent_id")
+            stockrecords[row["product_id"]] = row
+            if parent_id:
+                children.setdefault(parent_id, []).append(row["product_id"])
+
+        return {"stockrecords": stockrecords, "children": children}
+
+    def get_stockrecords(self, product_ids):
+        """
+        Return a dict mapping product ids to in-memory ``StockRecord``
+        instances built from the snapshot. Children are listed under
+        their parent's id.
+        """
+        snapshot = self.get()
+        grouped = {}
+        for product_id in product_ids:
+            child_ids = snapshot["children"].get(product_id, [product_id])
+            for child_id in child_ids:
+                row = snapshot["stockrecords"].get(child_id)
+                if row is not None:
+                    grouped.setdefault(product_id, []).append(self.to_stockrecord(row))
+        return grouped
+
+    def to_stockrecord(self, row):
+        row = dict(row)
+        track_stock = row.pop("track_stock")
+        stockrecord = StockRecord.from_db(
+            None, list(row.keys()), list(row.values())
+        )
+        stockrecord.track_stock = track_stock
+        return stockrecord
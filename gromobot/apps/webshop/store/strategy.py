@@ -2,7 +2,7 @@ from collections import namedtuple
 from decimal import Decimal as D
 
 from core.loading import get_class, get_model
-from django.db.models import F, Q, Value
+from django.db.models import Exists, F, OuterRef, Q, Value
 from django.db.models.functions import Coalesce
 
 Unavailable = get_class("webshop.store.availability", "Unavailable")
@@ -11,12 +11,29 @@ StockRequiredAvailability = get_class("webshop.store.availability", "StockRequir
 UnavailablePrice = get_class("webshop.store.prices", "Unavailable")
 FixedPrice = get_class("webshop.store.prices", "FixedPrice")
 
+StockSnapshot = get_class("webshop.store.snapshot", "StockSnapshot")
+
 StockRecord = get_model("store", "StockRecord")
 PurchaseInfo = namedtuple(
     "PurchaseInfo", ["price", "availability", "stockrecord", "stockrecords"]
 )
 
 
+class StockRecordList(list):
+    """
+    An in-memory list of stockrecords returned by the bulk purchase info API.
+
+    It mimics the parts of the queryset interface templates rely on, so
+    ``session.stockrecords.latest`` keeps working without hitting the DB.
+    """
+
+    def latest(self, field_name="date_updated"):
+        return max(self, key=lambda sr: getattr(sr, field_name), default=None)
+
+    def exists(self):
+        return bool(self)
+
+
 class Selector(object):
     """
     Responsible for returning the appropriate strategy class for a given
@@ -84,7 +101,8 @@ class Base(object):
 
     def fetch_for_products(self, products):
         """
-        Given a products, return a ``PurchaseInfo`` instancies.
+        Given a list of products, return a dict of ``PurchaseInfo`` instances
+        keyed by product id.
 
         The ``PurchaseInfo`` class is a named tuple with attributes:
 
@@ -92,8 +110,7 @@ class Base(object):
         - ``availability``: an availability policy object.
         - ``stockrecord``: the stockrecord that is being used
 
-        If a stockrecord is passed, return the appropriate ``PurchaseInfo``
-        instance for that product and stockrecord is returned.
+        Parent products are resolved the same way as ``fetch_for_parent``.
         """
         raise NotImplementedError(
             "A strategy class must define a fetch_for_products method "
@@ -161,6 +178,55 @@ class Structured(Base):
             stockrecords=stockrecords,
         )
 
+    def fetch_for_products(self, products):
+        """
+        Return the ``PurchaseInfo`` instances for a page of products.
+        Stockrecords come from the store's stock snapshot and the results are
+        remembered, so ``get_prefetched_purchase_info`` can serve them without
+        queries.
+        """
+        products = [product for product in products if product]
+        stockrecords = self.products_stockrecords(products)
+
+        purchase_infos = {}
+        for product in products:
+            product_stockrecords = StockRecordList(stockrecords.get(product.id, ()))
+            if product.is_parent:
+                purchase_infos[product.id] = PurchaseInfo(
+                    price=self.parent_min_pricing_policy(product_stockrecords),
+                    availability=self.parent_availability_policy(
+                        product, product_stockrecords
+                    ),
+                    stockrecord=None,
+                    stockrecords=product_stockrecords,
+                )
+            else:
+                stockrecord = next(iter(product_stockrecords), None)
+                purchase_infos[product.id] = PurchaseInfo(
+                    price=self.pricing_policy(stockrecord),
+                    availability=self.availability_policy(product, stockrecord),
+                    stockrecord=stockrecord,
+                    stockrecords=product_stockrecords,
+                )
+
+        if not hasattr(self, "_prefetched_purchase_infos"):
+            self._prefetched_purchase_infos = {}
+        self._prefetched_purchase_infos.update(purchase_infos)
+        return purchase_infos
+
+    def get_prefetched_purchase_info(self, product):
+        """
+        Return the ``PurchaseInfo`` loaded by a previous ``fetch_for_products``
+        call or None if the product was not part of it.
+        """
+        return getattr(self, "_prefetched_purchase_infos", {}).get(product.id)
+
+    def fetch_for_line(self, line, stockrecord=None):
+        purchase_info = self.get_prefetched_purchase_info(line.product)
+        if purchase_info is not None:
+            return purchase_info
+        return super().fetch_for_line(line, stockrecord)
+
     def fetch_for_parent(self, product):
         # Select children and associated stockrecords
         stockrecords = self.available_stockrecords(product)
@@ -228,6 +294,18 @@ class Structured(Base):
             "A structured strategy class must define a " "'product_stockrecords' method"
         )
 
+    def available_stockrecords(self, product):
+        raise NotImplementedError(
+            "A structured strategy class must define a "
+            "'available_stockrecords' method"
+        )
+
+    def products_stockrecords(self, products):
+        raise NotImplementedError(
+            "A structured strategy class must define a "
+            "'products_stockrecords' method"
+        )
+
     def is_available(self, product):
         raise NotImplementedError(
             "A structured strategy class must define a " "'is_available' method"
@@ -256,10 +334,64 @@ class UseStoreStockRecord:
 
         return StockRecord.objects.filter(base_query)
 
+    def available_stockrecords(self, product):
+        return self.product_stockrecords(product).filter(store_id=self.get_store_id())
+
+    def products_stockrecords(self, products):
+        """
+        Return a dict mapping product ids to the available stockrecords of the
+        current store. Stockrecords of children are listed under their parent.
+        Everything is read from the store's stock snapshot.
+        """
+        return self.stockrecords_for_ids([product.id for product in products])
+
+    def stockrecords_for_ids(self, product_ids):
+        """
+        Same as ``products_stockrecords`` for bare product ids, e.g. search
+        results which aren't loaded from the database.
+        """
+        grouped = StockSnapshot(self.get_store_id()).get_stockrecords(product_ids)
+        for product_id, stockrecords in grouped.items():
+            grouped[product_id] = [
+                sr
+                for sr in stockrecords
+                if sr.is_public and (not sr.track_stock or sr.net_stock_level > 0)
+            ]
+        return grouped
+
     def is_available(self, product):
         if not hasattr(self, "_cached_availability"):
-            self._cached_availability = self.product_stockrecords(product).exists()
-        return self._cached_availability
+            self._cached_availability = {}
+        if product.id not in self._cached_availability:
+            self._cached_availability[product.id] = self.product_stockrecords(
+                product
+            ).exists()
+        return self._cached_availability[product.id]
+
+    def annotate_availability(self, queryset, name="is_available"):
+        """
+        Annotate a product queryset with whether any public stockrecord of
+        the product (or of its children) can be bought. This is the bulk
+        counterpart of ``is_available``.
+        """
+        stockrecords = (
+            StockRecord.objects.filter(
+                Q(product_id=OuterRef("pk")) | Q(product__parent_id=OuterRef("pk")),
+                is_public=True,
+            )
+            .annotate(
+                track_stock=Coalesce(
+                    F("product__product_class__track_stock"),
+                    F("product__parent__product_class__track_stock"),
+                    Value(False),
+                )
+            )
+            .filter(
+                Q(track_stock=False)
+                | Q(num_in_stock__gt=Coalesce(F("num_allocated"), Value(0)))
+            )
+        )
+        return queryset.annotate(**{name: Exists(stockrecords)})
 
 
 class StockRequired(object):
@@ -272,7 +404,11 @@ class StockRequired(object):
     def availability_policy(self, product, stockrecord):
         if not stockrecord or not stockrecord.is_public:
             return Unavailable()
-        if not product.get_product_class().track_stock:
+        # Stockrecords loaded in bulk carry the product class flag with them
+        track_stock = getattr(stockrecord, "track_stock", None)
+        if track_stock is None:
+            track_stock = product.get_product_class().track_stock
+        if not track_stock:
             return Available()
         else:
             return StockRequiredAvailability(stockrecord.net_stock_level)
@@ -331,7 +467,11 @@ class PricingPolicy(object):
         if not stockrecords:
             return UnavailablePrice()
 
-        stockrecord = stockrecords.order_by("price").first()
+        stockrecord = min(
+            (sr for sr in stockrecords if sr.price is not None),
+            key=lambda sr: sr.price,
+            default=None,
+        )
         if stockrecord:
             return FixedPrice(
                 currency=stockrecord.price_currency,
@@ -0,0 +1,49 @@
+import logging
+
+from apps.webshop.catalogue.cards import bump_catalogue_version
+from celery import shared_task
+from core.models.img.pipeline import ImagePipeline, ImageVariants
+from django.apps import apps
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger("apps.thumbnail")
+
+
+@shared_task
+def process_image_task(model_label, pk, field_name):
+    """
+    Оптимизирует загруженное изображение и создает его миниатюры.
+    """
+    instance = apps.get_model(model_label)._default_manager.filter(pk=pk).first()
+    if instance is None or not getattr(instance, field_name):
+        return
+    try:
+        if ImagePipeline().process(instance, field_name):
+            # The file and thumbnails are switched without signals
+            bump_catalogue_version()
+    except Exception as e:
+        logger.error(f"{e} при обработке изображения {model_label}:{pk}")
+
+
+@shared_task
+def generate_image_variants_task(name, sizes):
+    """
+    Создает миниатюры изображения, запрошенные шаблоном до их создания.
+    """
+    try:
+        # Cards keep the original URL until they expire, bumping the
+        # catalogue here would flush every card after each lazy thumbnail
+        ImageVariants.generate(name, sizes)
+    except Exception as e:
+        logger.error(f"{e} при создании миниатюр изображения {name}")
+
+
+@shared_task
+def delete_image_file_task(name):
+    """
+    Удаляет исходный файл изображения после его оптимизации.
+    """
+    try:
+        default_storage.delete(name)
+    except Exception as e:
+        logger.error(f"{e} при удалении изображения {name}")
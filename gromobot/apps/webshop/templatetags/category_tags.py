@@ -1,9 +1,9 @@
-from core.loading import get_model
+from core.loading import get_class, get_model
 from django import template
-from django.core.cache import cache
 
 register = template.Library()
 Category = get_model("catalogue", "category")
+CategoryTree = get_class("catalogue.tree", "CategoryTree")
 
 
 class PassThrough(object):
@@ -75,71 +75,65 @@ def get_annotated_list(depth=None, parent=None):
     """
     # 'depth' is the backwards-compatible name for the template tag,
     # 'max_depth' is the better variable name.
+    max_depth = depth
+    tree = CategoryTree.get()
 
-    categories = cache.get("categories")
-
-    if not categories:
-        max_depth = depth
-
-        annotated_categories = []
-        tree_slug = ""
-
-        start_depth, prev_depth = (None, None)
-        if parent:
-            categories = parent.get_descendants()
-            tree_slug = parent.get_full_slug()
-            if max_depth is not None:
-                max_depth += parent.get_depth()
-        else:
-            categories = Category.get_tree()
-
+    annotated_categories = []
+    start_depth, prev_depth = (None, None)
+    if parent:
+        categories = tree.descendants(parent)
         if max_depth is not None:
-            categories = categories.filter(depth__lte=max_depth)
+            max_depth += parent.get_depth()
+    else:
+        categories = [node for node in tree.categories if node.is_browsable]
 
-        categories = categories.browsable()
+    if max_depth is not None:
+        categories = [node for node in categories if node.depth <= max_depth]
 
-        info = CheapCategoryInfo(parent, url="")
+    info = CheapCategoryInfo(parent, url="")
 
-        for node in categories:
-            node_depth = node.get_depth()
-            if start_depth is None:
-                start_depth = node_depth
+    for node in categories:
+        node_depth = node.depth
+        if start_depth is None:
+            start_depth = node_depth
 
-            # Update previous node's info
-            if prev_depth is None or node_depth > prev_depth:
-                info["has_children"] = True
-                if info.category is not None:
-                    tree_slug = info.category.get_full_slug(tree_slug)
+        # Update previous node's info
+        if prev_depth is None or node_depth > prev_depth:
+            info["has_children"] = True
 
-            if prev_depth is not None and node_depth < prev_depth:
-                depth_difference = prev_depth - node_depth
-                info["num_to_close"] = list(range(0, depth_difference))
-                tree_slugs = tree_slug.rsplit(node._slug_separator, depth_difference)
-                if tree_slugs:
-                    tree_slug = tree_slugs[0]
-                else:
-                    tree_slug = node.slug
+        if prev_depth is not None and node_depth < prev_depth:
+            info["num_to_close"] = list(range(0, prev_depth - node_depth))
 
-            info = CheapCategoryInfo(
-                node,
-                url=node._get_absolute_url(tree_slug),
-                num_to_close=[],
-                level=node_depth - start_depth,
-                primary_image=node.primary_image,
-            )
-            annotated_categories.append(info)
+        info = CheapCategoryInfo(
+            node,
+            url=node._url,
+            num_to_close=[],
+            level=node_depth - start_depth,
+            primary_image=node.primary_image,
+        )
+        annotated_categories.append(info)
 
-            prev_depth = node_depth
+        prev_depth = node_depth
 
-        if prev_depth is not None:
-            # close last leaf
-            info["num_to_close"] = list(range(0, prev_depth - start_depth))
-            info["has_children"] = prev_depth > prev_depth
+    if prev_depth is not None:
+        # close last leaf
+        info["num_to_close"] = list(range(0, prev_depth - start_depth))
+        info["has_children"] = False
 
-        cache.set("categories", annotated_categories, 3600)
-        categories = annotated_categories
+    return annotated_categories
 
-    return categories
+
+def annotate_categories(categories, level):
+    return [
+        CheapCategoryInfo(
+            node,
+            url=node._url,
+            num_to_close=[],
+            level=level,
+            primary_image=node.primary_image,
+        )
+        for node in categories
+    ]
 
 
 @register.simple_tag(name="root_categories")
@@ -147,28 +141,7 @@ def get_categories_list():
     """
     Gets only root categories.
     """
-    categories = cache.get("root_categories")
-
-    if not categories:
-        # Получаем корневые категории (только те, у которых глубина равна 1)
-        categories = Category.objects.filter(depth=1).browsable()
-
-        annotated_categories = []
-
-        for node in categories:
-            info = CheapCategoryInfo(
-                node,
-                url=node._get_absolute_url(),
-                num_to_close=[],
-                level=0,
-                primary_image=node.primary_image,
-            )
-            annotated_categories.append(info)
-
-        cache.set("root_categories", annotated_categories, 3600)
-        categories = annotated_categories
-
-    return categories
+    return annotate_categories(CategoryTree.get().roots(), level=0)
 
 
 @register.simple_tag(name="subcategory_tree")
@@ -176,25 +149,4 @@ def get_child_categories(parent):
     """
     Gets only child categories of a specified parent category.
     """
-    cache_key = f"child_categories_{parent.pk}"
-    categories = cache.get(cache_key)
-
-    if not categories:
-        categories = parent.get_children().browsable()
-
-        annotated_categories = []
-
-        for node in categories:
-            info = CheapCategoryInfo(
-                node,
-                url=node._get_absolute_url(),
-                num_to_close=[],
-                level=1,
-                primary_image=node.primary_image,
-            )
-            annotated_categories.append(info)
-
-        cache.set(cache_key, annotated_categories, 3600)
-        categories = annotated_categories
-
-    return categories
+    return annotate_categories(CategoryTree.get().children(parent), level=1)
@@ -1,9 +1,11 @@
 import logging
 import re
 
+from core.models.img.pipeline import ImageVariants
 from core.thumbnails import get_thumbnailer
 from django import template
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db.models.fields.files import ImageFieldFile
 from django.utils.encoding import smart_str
 from django.utils.html import escape
@@ -13,6 +15,40 @@ kw_pat = re.compile(r"^(?P<key>[\w]+)=(?P<value>.+)$")
 logger = logging.getLogger("apps.thumbnail")
 
 
+class ThumbnailURL:
+    """
+    Stands in for a thumbnail in templates, only its URL is known.
+    """
+
+    def __init__(self, url):
+        self.url = url
+
+    def __str__(self):
+        return self.url
+
+
+def get_thumbnail(source, size, **options):
+    """
+    Return the pre-generated thumbnail of *source* from ``ImageVariants``.
+    For a thumbnail that isn't generated yet the original image is returned
+    and, with Celery, the thumbnail is queued, so rendering never waits for
+    the thumbnailer.
+    Only thumbnails with other options than the pre-generated ones are
+    generated in place.
+    """
+    if options != ImageVariants.options:
+        return get_thumbnailer().generate_thumbnail(source, size=size, **options)
+
+    name = getattr(source, "name", source)
+    if not name:
+        return None
+    url = ImageVariants.get(name).get(size)
+    if url is None:
+        ImageVariants.request(name, size)
+        url = source.url if hasattr(source, "url") else default_storage.url(name)
+    return ThumbnailURL(url)
+
+
 # pylint: disable=unused-argument
 def do_dynamic_image_url(parser, token):
     tokens = token.split_contents()
@@ -124,8 +160,7 @@ class ThumbnailNode(template.Node):
             value = self.no_resolve.get(str(expr), expr.resolve(context))
             options[key] = value
 
-        thumbnailer = get_thumbnailer()
-        thumbnail = thumbnailer.generate_thumbnail(source, **options)
+        thumbnail = get_thumbnail(source, **options)
 
         if self.context_name is None:
             return escape(thumbnail.url)
@@ -143,9 +178,10 @@ class ThumbnailUrlNode(template.Node):
     def __init__(self, url, size, upscale):
         self.source_var = url
         self.size_var = size
+        self.upscale = upscale
 
     def get_thumbnail_options(self):
-        return {"size": self.size_var}
+        return {"size": self.size_var, "upscale": self.upscale}
 
     def render(self):
         try:
@@ -160,8 +196,7 @@ class ThumbnailUrlNode(template.Node):
     def _render(self):
         source = self.source_var
         options = self.get_thumbnail_options()
-        thumbnailer = get_thumbnailer()
-        return thumbnailer.generate_thumbnail(source, **options)
+        return get_thumbnail(source, **options)
 
 
 @register.simple_tag
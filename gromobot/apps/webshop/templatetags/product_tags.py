@@ -1,12 +1,25 @@
 import random
 
+from apps.webshop.catalogue.cards import ProductCards
 from django import template
-
-# from django.template.loader import select_template
+from django.template.loader import get_template
 
 register = template.Library()
 
 
+@register.simple_tag
+def prefetch_product_cards(request, products):
+    """
+    Load the cached cards of a page of products (or search results) in one
+    go. Returns the products whose cards have to be rendered, e.g. to
+    prefetch their purchase info.
+    """
+    products = [getattr(product, "object", product) for product in products]
+    return ProductCards.for_request(request).prefetch(
+        [product for product in products if product]
+    )
+
+
 @register.simple_tag(takes_context=True)
 def render_product(context, product):
     """
@@ -27,7 +40,7 @@ def render_product(context, product):
     #     "webshop/catalogue/partials/product.html",
     # ]
     # template_ = select_template(names)
-    template_ = "catalogue/partials/product.html"
+    request = context.get("request")
     context = context.flatten()
 
     # Ensure the passed product is in the context as 'product'
@@ -35,4 +48,7 @@ def render_product(context, product):
     range_start = 10 ** (5)
     range_finish = (10**6) - 1
     context["unique_number"] = random.randint(range_start, range_finish)
-    return template_.render(context)
+
+    if not hasattr(request, "store"):
+        return get_template(ProductCards.template_name).render(context)
+    return ProductCards.for_request(request).render(context, product)
@@ -3,8 +3,25 @@ from django import template
 register = template.Library()
 
 
+@register.simple_tag
+def prefetch_purchase_info(request, products):
+    """
+    Load purchase info for a whole page of products (or search results)
+    in one go, so the following ``purchase_info_for_product`` calls
+    don't query the database.
+    """
+    request.strategy.fetch_for_products(
+        [getattr(product, "object", product) for product in products]
+    )
+    return ""
+
+
 @register.simple_tag
 def purchase_info_for_product(request, product):
+    purchase_info = request.strategy.get_prefetched_purchase_info(product)
+    if purchase_info is not None:
+        return purchase_info
+
     if product.is_parent:
         return request.strategy.fetch_for_parent(product)
 
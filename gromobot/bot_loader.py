@@ -1,10 +1,27 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.bot import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.fsm.storage.redis import RedisStorage
 from django.conf import settings
 
+BOT_DEFAULTS = DefaultBotProperties(parse_mode=ParseMode.HTML)
+
+
+def create_session(**kwargs):
+    """
+    aiohttp session of a bot, pointed at ``TELEGRAM_API_URL`` so the bots
+    can be run against a local Bot API server.
+    """
+    return AiohttpSession(
+        api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL),
+        timeout=settings.TELEGRAM_REQUEST_TIMEOUT,
+        **kwargs,
+    )
+
+
 staff_bot = None
 customer_bot = None
 support_bot = None
@@ -16,7 +33,8 @@ support_dp = None
 if settings.TELEGRAM_STAFF_BOT_TOKEN:
     staff_bot = Bot(
         token=settings.TELEGRAM_STAFF_BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        session=create_session(),
+        default=BOT_DEFAULTS,
     )
     if settings.CELERY:
         staff_storage = RedisStorage.from_url(settings.TELEGRAM_STAFF_BROKER_URL)
@@ -28,7 +46,8 @@ if settings.TELEGRAM_STAFF_BOT_TOKEN:
 if settings.TELEGRAM_CUSTOMER_BOT_TOKEN:
     customer_bot = Bot(
         token=settings.TELEGRAM_CUSTOMER_BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        session=create_session(),
+        default=BOT_DEFAULTS,
     )
     if settings.CELERY:
         customer_storage = RedisStorage.from_url(settings.TELEGRAM_CUSTOMER_BROKER_URL)
@@ -40,7 +59,8 @@ if settings.TELEGRAM_CUSTOMER_BOT_TOKEN:
 if settings.TELEGRAM_SUPPORT_BOT_TOKEN:
     support_bot = Bot(
         token=settings.TELEGRAM_SUPPORT_BOT_TOKEN,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        session=create_session(),
+        default=BOT_DEFAULTS,
     )
     if settings.CELERY:
         support_storage = RedisStorage.from_url(settings.TELEGRAM_SUPPORT_BROKER_URL)
@@ -9,6 +9,8 @@ DEFAULT_COOKIE_LIFETIME = 7 * 24 * 60 * 60
 
 # Store cookies settings
 STORE_COOKIE_LIFETIME = 7 * 24 * 60 * 60
+# Магазины перечитываются из базы не реже чем раз в 5 минут
+STORE_REGISTRY_MAX_AGE = 5 * 60
 
 # Basket settings
 BASKET_COOKIE_LIFETIME = 7 * 24 * 60 * 60
@@ -47,17 +49,89 @@ MISSING_IMAGE_URL = "image_not_found.jpg"
 # Pagination settings
 OFFERS_PER_PAGE = 40
 PRODUCTS_PER_PAGE = 100
+# Снимок дерева категорий хранится под версией, которая меняется при изменении дерева,
+# и перечитывается из базы не реже чем раз в 15 минут
+CATEGORY_TREE_TIMEOUT = 15 * 60
+# Количество товаров в одном запросе при пересчете путей страниц товаров
+PRODUCT_URL_PATHS_BATCH_SIZE = 1000
+# Карточки товаров кешируются под версиями каталога и остатков магазина
+PRODUCT_CARD_CACHE_TIMEOUT = 60 * 60
 REVIEWS_PER_PAGE = 30
 NOTIFICATIONS_PER_PAGE = 30
+NOTIFICATIONS_UNREAD_TIMEOUT = 24 * 60 * 60
 EMAILS_PER_PAGE = 30
 ORDERS_PER_PAGE = 30
 ADDRESSES_PER_PAGE = 30
 STOCK_ALERTS_PER_PAGE = 30
 
 EVOTOR_ITEMS_PER_PAGE = 40
+EVOTOR_SNAPSHOT_TIMEOUT = 15 * 60
+EVOTOR_REQUEST_TIMEOUT = (3.05, 30)
+# Количество объектов в одной массовой задаче Эвотор
+EVOTOR_BULK_SIZE = 1000
+EVOTOR_BULK_WORKERS = 4
+EVOTOR_BULK_POLL_INTERVAL = 10
+EVOTOR_BULK_POLL_ATTEMPTS = 60
+EVOTOR_BULK_HISTORY = 3
 DASHBOARD_ITEMS_PER_PAGE = 40
+DASHBOARD_STAFF_CONTEXT_TIMEOUT = 6 * 60 * 60
+DASHBOARD_COUNTERS_TIMEOUT = 3 * 60
+# Push активных заказов в панель управления (SSE, нужен ASGI сервер)
+DASHBOARD_ORDER_EVENTS = False
+DASHBOARD_ORDER_EVENTS_REDIS_URL = "redis://127.0.0.1:6379/1"
+DASHBOARD_ORDER_EVENTS_CHANNEL = "dashboard_orders"
+DASHBOARD_ORDER_EVENTS_KEEPALIVE = 15
+DASHBOARD_ORDER_EVENTS_RETRY = 5000
+# Поток закрывается через 10 минут, браузер переподключается сам
+DASHBOARD_ORDER_EVENTS_MAX_AGE = 10 * 60
+# Выгрузка заказов в CSV
+ORDERS_EXPORT_CHUNK_SIZE = 500
+ORDERS_EXPORT_DIR = "exports/orders"
+# Фоновое формирование отчетов
+REPORTS_CHUNK_SIZE = 500
+REPORTS_EXPORT_DIR = "exports/reports"
+REPORTS_JOBS_HISTORY = 10
+# Окно и интервал (в минутах) периодического пересчета статистики заказов
+ORDER_ROLLUPS_REFRESH_HOURS = 3
+ORDER_ROLLUPS_REFRESH_INTERVAL = 10
+# Буфер счетчиков аналитики и интервал (в минутах) его сохранения в базу
+ANALYTICS_REDIS_URL = "redis://127.0.0.1:6379/1"
+ANALYTICS_FLUSH_INTERVAL = 5
 DASHBOARD_PAYMENTS_PER_PAGE = 40
 
+# Search
+SEARCH_INDEX_BATCH_SIZE = 100
+SEARCH_SUGGESTIONS_CACHE_TIMEOUT = 60
+SEARCH_SUGGESTIONS_WAIT_TIMEOUT = 2
+
+# Maps
+MAP_REQUEST_TIMEOUT = (3.05, 10)
+GEOCODE_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+# Ответы геокодера без результата кешируются ненадолго
+GEOCODE_EMPTY_CACHE_TIMEOUT = 10 * 60
+GEOCODE_CACHE_SIZE = 1000
+# Индекс зон доставки перестраивается не реже чем раз в 5 минут
+SHIPPING_ZONES_MAX_AGE = 5 * 60
+
+# Telegram
+TELEGRAM_API_URL = "https://api.telegram.org"
+TELEGRAM_REQUEST_TIMEOUT = 30
+# Одновременные запросы и общий лимит сообщений в секунду при рассылке
+TELEGRAM_DELIVERY_CONCURRENCY = 10
+TELEGRAM_DELIVERY_RATE = 25
+# Пауза между частями сообщения в один чат, в секундах
+TELEGRAM_DELIVERY_CHAT_INTERVAL = 1
+TELEGRAM_DELIVERY_RETRIES = 3
+
+# Web push
+WEBPUSH_WORKERS = 8
+WEBPUSH_POOL_CONNECTIONS = 10
+WEBPUSH_REQUEST_TIMEOUT = 10
+WEBPUSH_TTL = 0
+# Подписанные VAPID заголовки живут 12 часов и обновляются за 10 минут до конца
+WEBPUSH_VAPID_TTL = 12 * 60 * 60
+WEBPUSH_VAPID_MARGIN = 10 * 60
+
 # Accounts
 ACCOUNTS_REDIRECT_URL = "customer:profile-view"
 
@@ -375,6 +449,31 @@ DASHBOARD_DEFAULT_ACCESS_FUNCTION = "apps.webshop.dashboard.nav.default_access_f
 
 # Search facets
 THUMBNAILER = "core.thumbnails.SorlThumbnail"
+# Размеры миниатюр, которые создаются заранее после загрузки изображения
+IMAGE_THUMBNAIL_SIZES = {
+    "catalogue.productimage": (
+        "x600",
+        "x900",
+        "x550",
+        "440x400",
+        "x155",
+        "100x100",
+        "90x90",
+        "80x80",
+        "50x50",
+    ),
+    "catalogue.additional": ("x150", "80x80"),
+    "catalogue.category": ("80x80",),
+    "catalogue.productattribute": (),
+    "action.action": (),
+    "action.promocategory": (),
+}
+# Записи миниатюр читаются из базы через кеш
+IMAGE_VARIANTS_CACHE_TIMEOUT = 60 * 60
+# Повторная постановка миниатюры в очередь из шаблона не чаще раза в 10 минут
+IMAGE_VARIANTS_PENDING_TIMEOUT = 10 * 60
+# Сколько хранится исходный файл после оптимизации (на него могут ссылаться кеши)
+IMAGE_ORIGINAL_RETENTION = 2 * 60 * 60
 URL_SCHEMA = "http"
 SAVE_SENT_EMAILS_TO_DB = True
 
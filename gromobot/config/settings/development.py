@@ -101,6 +101,10 @@ CACHES = {
         "BACKEND": "django.core.cache.backends.dummy.DummyCache",
     }
 }
+# DummyCache не хранит версии, поэтому данные в памяти процесса не кешируются
+STORE_REGISTRY_MAX_AGE = 0
+CATEGORY_TREE_TIMEOUT = 0
+SHIPPING_ZONES_MAX_AGE = 0
 
 # CACHES = {
 #     'default': {
@@ -27,6 +27,8 @@ INTERNAL_IPS = ["127.0.0.1", "::1"]
 # =============
 
 MEDIA_URL = "media/"
+# Выгрузки и отчеты с данными клиентов хранятся вне MEDIA_ROOT
+EXPORTS_ROOT = location("private/exports")
 
 # =============
 # STATIC
@@ -190,7 +192,7 @@ MESSAGE_TAGS = {messages.ERROR: "danger"}
 # SEARCH
 # ====================
 
-HAYSTACK_SIGNAL_PROCESSOR = "haystack.signals.RealtimeSignalProcessor"
+HAYSTACK_SIGNAL_PROCESSOR = "apps.webshop.search.signal_processors.QueuedSignalProcessor"
 HAYSTACK_CONNECTIONS = {
     "default": {
         "ENGINE": "haystack.backends.whoosh_backend.WhooshEngine",
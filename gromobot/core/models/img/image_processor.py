@@ -9,6 +9,9 @@ class ImageProcessor(object):
 
     allowed_extensions = {".jpeg", ".jpg", ".png", ".webp", ".gif", ".tiff", ".bmp"}
     preferred_format = "WEBP"
+    max_file_size = 2 * 1024 * 1024
+    # Качество WEBP, из которого подбирается наибольшее подходящее по размеру
+    qualities = range(50, 101, 5)
 
     def optimize_image(self, image_file):
         try:
@@ -27,7 +30,7 @@ class ImageProcessor(object):
         # Проверяем формат
         if image.format == self.preferred_format:
             # Проверяем размер файла
-            if image_file.size <= 2 * 1024 * 1024:
+            if image_file.size <= self.max_file_size:
                 # Проверяем разрешение
                 if image.width <= 1080 and image.height <= 1080:
                     return False  # Изображение уже в нужном формате и параметрах
@@ -45,22 +48,32 @@ class ImageProcessor(object):
         image.thumbnail(max_size, Image.LANCZOS)
         return image
 
-    def _compress_image(self, image, image_file):
-        """Сжимает изображение и сохраняет в формате WEBP"""
-
-        # Сжатие до 2MB
-        quality = 100
+    def _encode(self, image, quality):
         output = BytesIO()
+        image.save(output, format="WEBP", quality=quality, optimize=True)
+        return output
 
-        while True:
-            output.seek(0)
-            output.truncate()
-            image.save(output, format="WEBP", quality=quality, optimize=True)
-
-            if output.tell() <= 2 * 1024 * 1024 or quality <= 50:
-                break
-
-            quality -= 5  # Уменьшаем качество
+    def _compress_image(self, image, image_file):
+        """
+        Сжимает изображение и сохраняет в формате WEBP с наибольшим
+        качеством, при котором файл не больше 2MB. Качество подбирается
+        бинарным поиском, поэтому нужно не больше пяти кодирований.
+        """
+        # Большинство изображений укладывается в размер с лучшим качеством
+        output = self._encode(image, self.qualities[-1])
+        if output.tell() > self.max_file_size:
+            best = None
+            low, high = 0, len(self.qualities) - 2
+            while low <= high:
+                middle = (low + high) // 2
+                output = self._encode(image, self.qualities[middle])
+                if output.tell() <= self.max_file_size:
+                    best = output
+                    low = middle + 1
+                else:
+                    high = middle - 1
+            # Если не подошло даже худшее качество, последним было именно оно
+            output = best or output
 
         output.seek(0)
 
@@ -0,0 +1,216 @@
+import hashlib
+import logging
+import os
+
+from core.loading import get_model
+from core.models.img.image_processor import ImageProcessor
+from core.thumbnails import get_thumbnailer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger("apps.thumbnail")
+
+
+class ImageVariants:
+    """
+    URLs of the pre-generated thumbnails of an image file.
+
+    The record is stored in the ``ImageVariant`` model per file name and
+    read through the cache, so templates look a thumbnail up instead of
+    asking the thumbnailer to check or generate it while rendering.
+    """
+
+    cache_key_template = "image_variants_%s"
+    pending_key_template = "image_variants_pending_%s_%s"
+    # Options every template passes to the thumbnail tags
+    options = {"upscale": False}
+
+    @staticmethod
+    def get_model():
+        return get_model("catalogue", "ImageVariant")
+
+    @classmethod
+    def get_cache_key(cls, name):
+        return cls.cache_key_template % hashlib.md5(name.encode()).hexdigest()
+
+    @classmethod
+    def get(cls, name):
+        """Return a dict mapping sizes to thumbnail URLs"""
+        key = cls.get_cache_key(name)
+        variants = cache.get(key)
+        if variants is None:
+            record = cls.get_model().objects.filter(name=name).first()
+            if record is None:
+                # Not cached, so a record created by another process is
+                # seen on the next render
+                return {}
+            variants = record.variants
+            cache.set(key, variants, settings.IMAGE_VARIANTS_CACHE_TIMEOUT)
+        return variants
+
+    @classmethod
+    def generate(cls, source, sizes):
+        """
+        Generate the thumbnails of *source*, a file name or a file, and add
+        their URLs to the record.
+        """
+        name = getattr(source, "name", source)
+        thumbnailer = get_thumbnailer()
+        generated = {}
+        for size in sizes:
+            thumbnail = thumbnailer.generate_thumbnail(
+                source, size=size, **cls.options
+            )
+            generated[size] = thumbnail.url
+        with transaction.atomic():
+            record, _ = (
+                cls.get_model().objects.select_for_update().get_or_create(name=name)
+            )
+            record.variants.update(generated)
+            record.save(update_fields=["variants", "date_updated"])
+        cache.set(
+            cls.get_cache_key(name),
+            record.variants,
+            settings.IMAGE_VARIANTS_CACHE_TIMEOUT,
+        )
+        return record.variants
+
+    @classmethod
+    def delete(cls, name):
+        cls.get_model().objects.filter(name=name).delete()
+        cache.delete(cls.get_cache_key(name))
+
+    @classmethod
+    def request(cls, name, size):
+        """
+        Queue the generation of a thumbnail requested by a template before it
+        was recorded, at most once per ``IMAGE_VARIANTS_PENDING_TIMEOUT``.
+        Without Celery nothing is generated while rendering, such images are
+        covered by the ``generate_image_variants`` command.
+        """
+        from apps.webshop.tasks import generate_image_variants_task
+
+        if not settings.CELERY:
+            return
+        digest = hashlib.md5(name.encode()).hexdigest()
+        key = cls.pending_key_template % (digest, size)
+        if cache.add(key, True, settings.IMAGE_VARIANTS_PENDING_TIMEOUT):
+            generate_image_variants_task.delay(name, [size])
+
+
+class ImagePipeline:
+    """
+    Background processing of uploaded images.
+
+    Models save the uploaded file as is. After the commit the file is
+    converted and compressed by ``ImageProcessor`` in a Celery task, the
+    field is switched to the optimized file with an UPDATE (so no save
+    signals run again) and the thumbnail sizes used by the templates of the
+    model are generated and recorded in ``ImageVariants``.
+    """
+
+    @staticmethod
+    def is_uploaded(field_file):
+        """Whether *field_file* holds a new upload which isn't stored yet"""
+        return bool(field_file) and not field_file._committed
+
+    @staticmethod
+    def get_sizes(model):
+        return settings.IMAGE_THUMBNAIL_SIZES.get(model._meta.label_lower, ())
+
+    def generate_missing(self, model):
+        """
+        Generate the thumbnails of the stored images of *model* which aren't
+        recorded yet, e.g. images uploaded before the pipeline existed.
+        Yields the names of the processed files, failures are logged.
+        """
+        sizes = self.get_sizes(model)
+        if not sizes:
+            return
+        for field_name in getattr(model, "image_fields", ()):
+            names = (
+                model._default_manager.exclude(**{field_name: ""})
+                .exclude(**{f"{field_name}__isnull": True})
+                .order_by()
+                .values_list(field_name, flat=True)
+                .distinct()
+            )
+            for name in names.iterator():
+                variants = ImageVariants.get(name)
+                missing = [size for size in sizes if size not in variants]
+                if not missing:
+                    continue
+                try:
+                    ImageVariants.generate(name, missing)
+                except Exception as e:
+                    logger.error(f"{e} при создании миниатюр изображения {name}")
+                    continue
+                yield name
+
+    @classmethod
+    def schedule(cls, instance, field_name):
+        from apps.webshop.tasks import process_image_task
+
+        args = (instance._meta.label_lower, instance.pk, field_name)
+        if settings.CELERY:
+            transaction.on_commit(lambda: process_image_task.delay(*args))
+        else:
+            transaction.on_commit(lambda: process_image_task(*args))
+
+    def process(self, instance, field_name):
+        """
+        Optimize the image in *field_name* of *instance* and generate its
+        thumbnails. Returns the name of the processed file.
+        """
+        model = type(instance)
+        field_file = getattr(instance, field_name)
+        original_name = field_file.name
+        optimized = ImageProcessor().optimize_image(field_file)
+
+        if optimized is not field_file:
+            field_file.save(os.path.basename(optimized.name), optimized, save=False)
+            # The image may have been replaced while it was processed
+            updated = model._default_manager.filter(
+                pk=instance.pk, **{field_name: original_name}
+            ).update(**{field_name: field_file.name})
+            if not updated:
+                field_file.storage.delete(field_file.name)
+                return None
+            self.delete_original(field_file.storage, original_name)
+
+        ImageVariants.generate(field_file, self.get_sizes(model))
+        return field_file.name
+
+    def delete_original(self, storage, name):
+        """
+        Delete the uploaded original. Pages rendered before the processing
+        may still link it, so with Celery it is kept for a while.
+        """
+        from apps.webshop.tasks import delete_image_file_task
+
+        if settings.CELERY:
+            delete_image_file_task.apply_async(
+                (name,), countdown=settings.IMAGE_ORIGINAL_RETENTION
+            )
+        else:
+            storage.delete(name)
+
+
+class ImagePipelineMixin:
+    """
+    Hands the new uploads of ``image_fields`` to the ``ImagePipeline`` after
+    the instance is saved.
+    """
+
+    image_fields = ()
+
+    def save(self, *args, **kwargs):
+        uploaded = [
+            name
+            for name in self.image_fields
+            if ImagePipeline.is_uploaded(getattr(self, name))
+        ]
+        super().save(*args, **kwargs)
+        for name in uploaded:
+            ImagePipeline.schedule(self, name)
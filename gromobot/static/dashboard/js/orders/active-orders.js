@@ -1,4 +1,5 @@
 let intervalId; // Объявляем переменную для идентификатора таймера
+let eventSource;
 let tableContainer = document.querySelector('[data-id="active-orders"]');
 let activeNavbar = document.querySelector('[data-id="active-navbar"]');
 let activeNavbarNum = activeNavbar.querySelector('div');
@@ -7,6 +8,28 @@ let navbarActiveOrders = document.querySelector('[data-id="Активные за
 let orderNum = parseInt(document.querySelector('caption[data-num]').getAttribute('data-num'), 10);
 const audio = document.getElementById('order-sound');
 
+const setOrderNum = (num) => {
+    orderNum = num;
+    activeNavbarNum.innerHTML = orderNum;
+    if (orderNum > 0) {
+        navbarOrders.innerHTML = orderNum;
+        navbarActiveOrders.innerHTML = orderNum;
+        activeNavbar.classList.remove("d-none");
+    } else {
+        navbarOrders.innerHTML = "";
+        navbarActiveOrders.innerHTML = "";
+        activeNavbar.classList.add("d-none");
+    }
+};
+
+const initActiveTable = () => {
+    if (orderModal) {
+        orderModal();
+    }
+    dashboard.orders.initTable();
+    badgeChanged(tableContainer.querySelectorAll('span[data-id="order-badge"]'));
+};
+
 const updateActiveTable = (force = false) => {
     fetch(`${active_orders_lookup_url}?order_num=${orderNum}&force=${force}`, {
         method: 'GET',
@@ -19,36 +42,79 @@ const updateActiveTable = (force = false) => {
             if (data.update || force) {
                 if (tableContainer && data.html) {
                     let oldOrderNum = orderNum;
-                    orderNum = parseInt(data.num_orders, 10);
                     tableContainer.innerHTML = data.html;
-                    activeNavbarNum.innerHTML = orderNum;
-                    if (orderNum > 0) {
-                        navbarOrders.innerHTML = orderNum;
-                        navbarActiveOrders.innerHTML = orderNum;
-                        activeNavbar.classList.remove("d-none");
-                    } else {
-                        navbarOrders.innerHTML = "";
-                        navbarActiveOrders.innerHTML = "";
-                        activeNavbar.classList.add("d-none");
-                    }
+                    setOrderNum(parseInt(data.num_orders, 10));
                     if (audio && !force && oldOrderNum < orderNum) {
                         audio.play();
                     }
-                    if (orderModal) {
-                        orderModal();
-                    }
-                    dashboard.orders.initTable();
-                    badgeChanged(tableContainer.querySelectorAll('span[data-id="order-badge"]'));
+                    initActiveTable();
                 }
             }
         })
         .catch(error => console.error('Error updating table:', error));
 };
 
-// Устанавливаем таймер и сохраняем его идентификатор
-intervalId = setInterval(updateActiveTable, 5000);
+// Применяет изменение одного заказа, пришедшее с сервера
+const applyOrderEvent = (data) => {
+    let tbody = tableContainer ? tableContainer.querySelector('tbody') : null;
+    if (!tbody) {
+        // Таблица еще не отрисована (нет заказов)
+        updateActiveTable(true);
+        return;
+    }
+    let row = tbody.querySelector(`tr[data-number="${data.number}"]`);
+    if (data.active) {
+        let template = document.createElement('tbody');
+        template.innerHTML = data.html;
+        let newRow = template.firstElementChild;
+        if (row) {
+            row.replaceWith(newRow);
+        } else {
+            tbody.querySelectorAll('.empty-tr').forEach(el => el.remove());
+            tbody.appendChild(newRow);
+            if (audio && data.event === 'placed') {
+                audio.play();
+            }
+        }
+    } else if (row) {
+        row.remove();
+    }
+    setOrderNum(tbody.querySelectorAll('tr[data-number]').length);
+    initActiveTable();
+};
+
+const startPolling = () => {
+    if (!intervalId) {
+        intervalId = setInterval(updateActiveTable, 5000);
+    }
+};
+
+if (typeof active_orders_events_url !== 'undefined' && window.EventSource) {
+    eventSource = new EventSource(active_orders_events_url);
+    let connected = false;
+    eventSource.addEventListener('order', (event) => applyOrderEvent(JSON.parse(event.data)));
+    eventSource.onopen = () => {
+        // После переподключения обновляем таблицу целиком: события за время
+        // разрыва не доставляются
+        if (connected) {
+            updateActiveTable(true);
+        }
+        connected = true;
+    };
+    eventSource.onerror = () => {
+        // Если поток недоступен, возвращаемся к периодическому опросу
+        if (eventSource.readyState === EventSource.CLOSED) {
+            startPolling();
+        }
+    };
+} else {
+    startPolling();
+}
 
-// При выгрузке страницы очищаем таймер
+// При выгрузке страницы очищаем таймер и закрываем поток
 window.addEventListener('beforeunload', () => {
     clearInterval(intervalId); // Очищаем интервал
+    if (eventSource) {
+        eventSource.close();
+    }
 });
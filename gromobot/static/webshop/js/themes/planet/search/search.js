@@ -10,6 +10,8 @@ if (searchInput) {
         this.minimum_length = parseInt(options.minimum_length || 3);
         this.form_elem = null;
         this.query_box = null;
+        this.timer = null;
+        this.controller = null;
     }
     
     Autocomplete.prototype.setup = function () {
@@ -19,11 +21,14 @@ if (searchInput) {
         if (this.query_box) {
             this.query_box.addEventListener('keyup', function () {
                 searchResult.innerHTML = '';
+                clearTimeout(self.timer);
                 var query = self.query_box.value;
                 if (query.length < self.minimum_length) {
                     return;
                 }
-                self.fetch(query);
+                self.timer = setTimeout(function () {
+                    self.fetch(query);
+                }, self.delay);
             });
         }
     }
@@ -32,9 +37,15 @@ if (searchInput) {
         var self = this;
         searchResult.innerHTML = '';
         searchResult.classList.add('search__loading');
+
+        if (this.controller) {
+            this.controller.abort();
+        }
+        this.controller = new AbortController();
     
         fetch(this.url, {
             method: 'POST',
+            signal: this.controller.signal,
             headers: {
                 'X-Requested-With': 'XMLHttpRequest',
                 'Content-Type': 'application/x-www-form-urlencoded',
@@ -48,14 +59,49 @@ if (searchInput) {
                 self.show_results(data);
             })
             .catch(error => {
+                if (error.name === 'AbortError') {
+                    return;
+                }
                 console.error('Error:', error);
                 searchResult.classList.remove('search__loading');
             });
     }
     
     Autocomplete.prototype.show_results = function (data) {
-        searchResult.innerHTML = data.results;
-        findNewForms();
+        searchResult.innerHTML = '';
+        if (!data.results.length) {
+            var empty = document.createElement('p');
+            empty.className = 'py-2';
+            empty.textContent = 'Ничего не найдено';
+            searchResult.appendChild(empty);
+            return;
+        }
+        data.results.forEach(function (item) {
+            var link = document.createElement('a');
+            link.href = item.url;
+            link.className = 'search__item d-flex align-center' + (item.is_available ? '' : ' unavailable');
+            if (item.image) {
+                var img = document.createElement('img');
+                img.src = item.image;
+                img.alt = item.name;
+                img.loading = 'lazy';
+                img.className = 'search__image';
+                link.appendChild(img);
+            }
+            var name = document.createElement('span');
+            name.className = 'search__name grow-1';
+            name.textContent = item.name;
+            link.appendChild(name);
+            var price = document.createElement('span');
+            price.className = 'search__price no-wrap';
+            if (!item.is_available || !item.price) {
+                price.textContent = 'Временно недоступно';
+            } else {
+                price.textContent = (item.is_parent ? 'от ' : '') + item.price;
+            }
+            link.appendChild(price);
+            searchResult.appendChild(link);
+        });
     }
     
     document.addEventListener('DOMContentLoaded', function () {